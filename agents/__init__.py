@@ -1,9 +1,23 @@
 """
 Agent modules for KALMAN.
+
+Agents are imported on first access so that importing one light module (e.g.
+agents.nlp_agent) does not pull in pandas and CatBoost.
 """
 
-from .crawler_agent import CrawlerAgent
-from .preprocessing_agent import PreprocessingAgent
-from .ml_execution_agent import MLExecutionAgent
+import importlib
+
+_AGENTS = {
+    'CrawlerAgent': '.crawler_agent',
+    'PreprocessingAgent': '.preprocessing_agent',
+    'MLExecutionAgent': '.ml_execution_agent',
+    'SourceScheduler': '.source_scheduler'
+}
+
+__all__ = ['CrawlerAgent', 'PreprocessingAgent', 'MLExecutionAgent', 'SourceScheduler']
+
 
-__all__ = ['CrawlerAgent', 'PreprocessingAgent', 'MLExecutionAgent']
+def __getattr__(name):
+    if name in _AGENTS:
+        return getattr(importlib.import_module(_AGENTS[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
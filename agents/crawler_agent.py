@@ -2,45 +2,172 @@
 Generic crawler agent that adapts behavior based on JSON instructions.
 """
 
+import asyncio
+import contextlib
 import logging
-from typing import Dict, Any, Optional
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Dict, Any, List, Optional
 from utils.cache_manager import CacheManager
-from utils.api_client import APIClient
+from utils.api_client import APIClient, AsyncAPIClient
+from utils.instruction_plan import SourcePlan, Template
+from utils.singleflight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Failed and empty upstream responses are cached this long (seconds), so a
+# broken or data-less source isn't hit again on every request
+NEGATIVE_CACHE_TTL_S = float(os.getenv("NEGATIVE_CACHE_TTL_S", "300"))
+
+# Background refreshes of stale entries (stale-while-revalidate)
+CACHE_REFRESH_WORKERS = int(os.getenv("CACHE_REFRESH_WORKERS", "4"))
+
+# Sources fetched at once per crawler (crawler "max_concurrency") and how long
+# each may take, retries included (source "timeout_seconds")
+CRAWLER_MAX_CONCURRENCY = int(os.getenv("CRAWLER_MAX_CONCURRENCY", "4"))
+SOURCE_TIMEOUT_S = float(os.getenv("SOURCE_TIMEOUT_S", "20"))
+
+# Worker threads execute() fetches sources on, shared by every crawler
+CRAWLER_SOURCE_WORKERS = int(os.getenv("CRAWLER_SOURCE_WORKERS", "32"))
+
+DAY_S = 86400.0
+
+
+class SourceFetchError(Exception):
+    """A source with fallback_strategy "fail_request" could not be fetched."""
+
+
+class _Refresher:
+    """Shared pool for background refreshes, one in flight per cache key."""
+    
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._in_flight = set()
+        self._lock = threading.Lock()
+    
+    def submit(self, key: tuple, fn, *args) -> bool:
+        """Run fn(*args) in the background unless key is already refreshing."""
+        with self._lock:
+            if key in self._in_flight:
+                return False
+            self._in_flight.add(key)
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="cache-refresh")
+        
+        future = self._pool.submit(fn, *args)
+        future.add_done_callback(lambda _: self._done(key))
+        return True
+    
+    def _done(self, key: tuple):
+        with self._lock:
+            self._in_flight.discard(key)
+
+
+_refresher = _Refresher(CACHE_REFRESH_WORKERS)
+
+_source_pool: Optional[ThreadPoolExecutor] = None
+_source_pool_lock = threading.Lock()
+
+
+def _get_source_pool() -> ThreadPoolExecutor:
+    """Process-wide pool for execute()'s source fetches."""
+    global _source_pool
+    with _source_pool_lock:
+        if _source_pool is None:
+            _source_pool = ThreadPoolExecutor(max_workers=CRAWLER_SOURCE_WORKERS,
+                                              thread_name_prefix="crawler-source")
+        return _source_pool
+
+# Upstream fetches in flight, shared by every crawler in the process: a
+# popular key that misses is fetched once while other callers wait for it
+_inflight = SingleFlight()
+
+# Strong references to async background refreshes until they finish
+_background_tasks = set()
+
 
 class CrawlerAgent:
     """
     Generic crawler that fetches data based on instruction configuration.
     
+    execute() fetches its sources on worker threads; aexecute() is the
+    asyncio equivalent and makes its HTTP calls through the process-wide
+    AsyncAPIClient.
+    
     Key Features:
-    - Cache-first strategy
+    - Sources fetched concurrently, at most "max_concurrency" at once, each
+      within its "timeout_seconds" (a timeout is handled by the source's
+      fallback_strategy; the fetch still finishes and is cached)
+    - Cache-first strategy (batched across inputs in execute_many)
+    - Stale-while-revalidate: expired entries are served at once and
+      refreshed in the background (per source "stale_while_revalidate",
+      default true)
+    - Concurrent misses for the same key share one upstream fetch
+    - Per-host rate limits from each source's "rate_limit"
+      ({"requests_per_second": ..., "burst": ...})
+    - Negative caching of failed and empty responses for
+      NEGATIVE_CACHE_TTL_S (per source "negative_cache_ttl_seconds")
     - Automatic retry logic
     - Schema validation
-    - Error handling with fallbacks
+    - Error handling with fallbacks, per source "fallback_strategy":
+        use_cached_if_available - serve the stale entry if there is one
+        return_null - return a null result instead of an error
+        fail_request - raise SourceFetchError and fail the whole request
     """
     
-    def __init__(self, config: Dict[str, Any], cache_manager: Optional[CacheManager] = None):
+    NEGATIVE_KEY_SUFFIX = "#failed"
+    
+    # user_input keys SourceScheduler fills for dependent sources
+    DERIVED_KEY = "derived"
+    UPSTREAM_KEY = "upstream"
+    
+    def __init__(self, config: Dict[str, Any], cache_manager: Optional[CacheManager] = None,
+                 api_client: Optional[APIClient] = None,
+                 async_client: Optional[AsyncAPIClient] = None):
         """
         Initialize crawler agent.
         
         Args:
             config: Crawler configuration from instruction JSON
             cache_manager: Cache manager instance (creates new if None)
+            api_client: HTTP client for execute() (process-wide one if None)
+            async_client: HTTP client for aexecute() (process-wide one if None)
         """
         self.config = config
         self.name = config.get("name", "UnnamedCrawler")
         self.data_sources = config.get("data_sources", [])
+        self.max_concurrency = max(int(config.get("max_concurrency", CRAWLER_MAX_CONCURRENCY)), 1)
         
         # Initialize cache manager
         self.cache = cache_manager or CacheManager()
         
-        # Initialize API client
-        self.api_client = APIClient()
+        # Shared API clients: connections outlive this crawler
+        self.api_client = api_client or APIClient.shared()
+        self.async_client = async_client or AsyncAPIClient.shared()
+        self._configure_rate_limits()
         
         logger.info(f"Initialized {self.name}")
     
+    def _configure_rate_limits(self):
+        """Register the sources' rate limits with the clients' limiters."""
+        # Usually both clients share the process-wide limiter
+        limiters = {id(limiter): limiter for limiter in
+                    (getattr(self.api_client, "rate_limiter", None),
+                     getattr(self.async_client, "rate_limiter", None))
+                    if limiter is not None}
+        
+        for source_config in self.data_sources:
+            limit = source_config.get("rate_limit")
+            if not limit or not source_config.get("url"):
+                continue
+            for limiter in limiters.values():
+                limiter.configure(source_config["url"], limit["requests_per_second"],
+                                  limit.get("burst"))
+    
     def execute(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
         """
         Execute crawler - fetch data from all configured sources.
@@ -50,31 +177,220 @@ class CrawlerAgent:
             
         Returns:
             Dictionary with data from all sources
+            
+        Raises:
+            SourceFetchError: A fail_request source could not be fetched
+        """
+        logger.info(f"Executing {self.name}")
+        
+        # Like aexecute: at most max_concurrency sources hold a slot, and a
+        # source that times out gives its slot up (it finishes and is
+        # cached in the background)
+        pool = _get_source_pool()
+        queued = list(enumerate(self.data_sources))
+        running: Dict[Future, tuple] = {}
+        outcomes: List[Any] = [None] * len(self.data_sources)
+        
+        while queued or running:
+            while queued and len(running) < self.max_concurrency:
+                i, source_config = queued.pop(0)
+                timeout = self._source_timeout(source_config)
+                future = pool.submit(self._fetch_source, source_config, user_input)
+                running[future] = (i, source_config, timeout, time.monotonic() + timeout)
+            
+            next_deadline = min(deadline for *_, deadline in running.values())
+            done, _ = wait(running, timeout=max(next_deadline - time.monotonic(), 0),
+                           return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            
+            for future, (i, source_config, timeout, deadline) in list(running.items()):
+                if future in done:
+                    del running[future]
+                    try:
+                        outcomes[i] = future.result()
+                    except Exception as e:
+                        outcomes[i] = e
+                elif now >= deadline:
+                    del running[future]
+                    future.add_done_callback(self._finish_late)
+                    try:
+                        outcomes[i] = self._timed_out(source_config, timeout)
+                    except Exception as e:
+                        outcomes[i] = e
+        
+        return self._collect(outcomes)
+    
+    async def aexecute(self, user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async execute(): same results and error handling, without threads.
+        
+        Args:
+            user_input: User input parameters (postcode, business type, etc.)
+            
+        Returns:
+            Dictionary with data from all sources
+            
+        Raises:
+            SourceFetchError: A fail_request source could not be fetched
         """
         logger.info(f"Executing {self.name}")
         
+        slots = asyncio.Semaphore(self.max_concurrency)
+        outcomes = await asyncio.gather(*(self.afetch(source_config, user_input, slots)
+                                          for source_config in self.data_sources),
+                                        return_exceptions=True)
+        return self._collect(outcomes)
+    
+    async def afetch(self, source_config: Dict[str, Any], user_input: Dict[str, Any],
+                     slots: Optional[asyncio.Semaphore] = None) -> Dict[str, Any]:
+        """
+        Fetch one source within its timeout, applying its fallback_strategy.
+        
+        Args:
+            source_config: Source configuration
+            user_input: User input parameters, plus "derived" values and
+                "upstream" results when run by SourceScheduler
+            slots: This crawler's concurrency limit, if any
+            
+        Returns:
+            Data from source, cache or fallback
+            
+        Raises:
+            SourceFetchError: Fetch failed and fallback_strategy is fail_request
+        """
+        async with slots or contextlib.nullcontext():
+            timeout = self._source_timeout(source_config)
+            task = asyncio.ensure_future(self._afetch_source(source_config, user_input))
+            try:
+                return await asyncio.wait_for(asyncio.shield(task), timeout)
+            except asyncio.TimeoutError:
+                _background_tasks.add(task)
+                task.add_done_callback(self._finish_late)
+                return self._timed_out(source_config, timeout)
+    
+    def _collect(self, outcomes: List[Any]) -> Dict[str, Any]:
+        """
+        Aggregate per-source outcomes (data or exception) in source order.
+        
+        Raises:
+            SourceFetchError: From a fail_request source
+        """
         results = {
             "crawler_name": self.name,
             "sources": {}
         }
         
-        for source_config in self.data_sources:
+        for source_config, outcome in zip(self.data_sources, outcomes):
             source_name = source_config.get("name")
             
-            try:
-                data = self._fetch_source(source_config, user_input)
-                results["sources"][source_name] = data
-                logger.info(f"✓ Fetched data from {source_name}")
-                
-            except Exception as e:
-                logger.error(f"✗ Failed to fetch {source_name}: {e}")
+            if isinstance(outcome, SourceFetchError):
+                raise outcome
+            if isinstance(outcome, BaseException):
+                logger.error(f"✗ Failed to fetch {source_name}: {outcome}")
                 results["sources"][source_name] = {
-                    "error": str(e),
+                    "error": str(outcome),
                     "status": "failed"
                 }
+            else:
+                results["sources"][source_name] = outcome
+                logger.info(f"✓ Fetched data from {source_name}")
         
         return results
     
+    def _source_timeout(self, source_config: Dict[str, Any]) -> float:
+        return float(source_config.get("timeout_seconds", SOURCE_TIMEOUT_S))
+    
+    def _timed_out(self, source_config: Dict[str, Any], timeout: float) -> Dict[str, Any]:
+        """Apply the fallback_strategy to a source that ran past its timeout."""
+        error = f"timed out after {timeout:g}s"
+        logger.warning(f"{source_config.get('name')} {error}, still fetching in background")
+        return self._fallback(source_config, None, error)
+    
+    @staticmethod
+    def _finish_late(task):
+        """Retrieve the outcome of a source that outlived its timeout (Task or Future)."""
+        _background_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Late source fetch failed: {task.exception()}")
+    
+    async def _afetch_source(self, source_config: Dict[str, Any],
+                             user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Async _fetch_source. Cache reads and writes run in worker threads:
+        a read can decode a large payload or flush batched access times
+        (a write that may wait on busy_timeout). So do static table lookups,
+        which may load or index a CSV on first use.
+        """
+        if source_config.get("source"):
+            return await asyncio.to_thread(self._reuse_upstream, source_config, user_input)
+        if source_config.get("type") == "csv_static":
+            return await asyncio.to_thread(self._fetch_csv_static, source_config, user_input)
+        
+        source_name = source_config.get("name")
+        ttl_days = source_config.get("cache_ttl_days", 30)
+        cache_key = self._generate_cache_key(source_config, user_input)
+        
+        entry = await asyncio.to_thread(self.cache.get_entry, source_name, cache_key, ttl_days)
+        if entry is not None and entry[1]:
+            logger.info(f"Cache hit for {source_name}")
+            return entry[0]
+        stale = entry[0] if entry is not None else None
+        flight_key = self._flight_key(source_name, cache_key)
+        
+        if stale is not None and source_config.get("stale_while_revalidate", True):
+            logger.info(f"Serving stale {source_name}, refreshing in background")
+            task = asyncio.ensure_future(self._arefresh(flight_key, source_config, user_input, cache_key))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+            return stale
+        
+        failure = await asyncio.to_thread(self.cache.get, source_name, cache_key + self.NEGATIVE_KEY_SUFFIX,
+                                          self._negative_ttl_days(source_config))
+        if failure is not None:
+            logger.info(f"Negative cache hit for {source_name}")
+            return self._fallback(source_config, stale, failure["error"])
+        
+        logger.info(f"Cache miss for {source_name}, fetching...")
+        try:
+            return await _inflight.do_async(flight_key, self._afetch_and_store,
+                                            source_config, user_input, cache_key)
+        except Exception as e:
+            return self._fallback(source_config, stale, str(e))
+    
+    async def _afetch_and_store(self, source_config: Dict[str, Any], user_input: Dict[str, Any],
+                                cache_key: str) -> Dict[str, Any]:
+        """Async _fetch_and_store."""
+        try:
+            data = await self._afetch_uncached(source_config, user_input)
+        except Exception as e:
+            await asyncio.to_thread(self._store_failure, source_config, cache_key, e)
+            raise
+        
+        await asyncio.to_thread(self._store, source_config, cache_key, data)
+        return data
+    
+    async def _arefresh(self, flight_key: tuple, source_config: Dict[str, Any],
+                        user_input: Dict[str, Any], cache_key: str):
+        """Async background refresh of a stale entry."""
+        try:
+            await _inflight.do_async(flight_key, self._afetch_and_store,
+                                     source_config, user_input, cache_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {source_config.get('name')} failed: {e}")
+    
+    async def _afetch_uncached(self, source_config: Dict[str, Any],
+                               user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Async _fetch_uncached; non-HTTP sources run as before."""
+        if source_config.get("type") == "rest_api":
+            url, params, headers = self._build_request(source_config, user_input)
+            response = await self.async_client.get(url, params=params, headers=headers)
+            return {
+                "status": "success",
+                "data": response,
+                "source": source_config.get("name")
+            }
+        return self._fetch_uncached(source_config, user_input)
+    
     def _fetch_source(self, source_config: Dict[str, Any], 
                      user_input: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -87,57 +403,312 @@ class CrawlerAgent:
         Returns:
             Data from source
         """
+        # Built from another source's result or an indexed local table:
+        # cheaper than a cache lookup, so never cached
+        if source_config.get("source"):
+            return self._reuse_upstream(source_config, user_input)
+        if source_config.get("type") == "csv_static":
+            return self._fetch_csv_static(source_config, user_input)
+        
         source_name = source_config.get("name")
-        source_type = source_config.get("type")
         ttl_days = source_config.get("cache_ttl_days", 30)
         
         # Generate cache key
         cache_key = self._generate_cache_key(source_config, user_input)
         
-        # Check cache first
-        cached_data = self.cache.get(source_name, cache_key, ttl_days)
-        if cached_data:
+        # Check cache first (expired entries come back flagged as stale)
+        entry = self.cache.get_entry(source_name, cache_key, ttl_days)
+        if entry is not None and entry[1]:
             logger.info(f"Cache hit for {source_name}")
-            return cached_data
+            return entry[0]
+        
+        return self._resolve_miss(source_config, user_input, cache_key,
+                                  entry[0] if entry is not None else None)
+    
+    def _resolve_miss(self, source_config: Dict[str, Any], user_input: Dict[str, Any],
+                      cache_key: str, stale: Optional[Dict[str, Any]],
+                      pending_writes: Optional[Dict[str, Any]] = None,
+                      failures: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Serve a cache miss: stale-while-revalidate, negative cache, fetch, fallback.
+        
+        Args:
+            source_config: Source configuration
+            user_input: User input parameters
+            cache_key: Cache key for this source and input
+            stale: Expired cached data, if any
+            pending_writes: Collect successful writes here (for set_many)
+                instead of writing them one by one
+            failures: Negative cache entries already looked up in bulk
+                (for get_many), instead of looking this key up
+            
+        Returns:
+            Data from source, cache or fallback
+            
+        Raises:
+            SourceFetchError: Fetch failed and fallback_strategy is fail_request
+        """
+        source_name = source_config.get("name")
+        
+        if stale is not None and source_config.get("stale_while_revalidate", True):
+            logger.info(f"Serving stale {source_name}, refreshing in background")
+            _refresher.submit((self.cache.db_path, source_name, cache_key), self._refresh,
+                              source_config, user_input, cache_key)
+            return stale
+        
+        # Recently failed: don't hit the source again until the entry expires
+        failure_key = cache_key + self.NEGATIVE_KEY_SUFFIX
+        if failures is not None:
+            failure = failures.get(failure_key)
+        else:
+            failure = self.cache.get(source_name, failure_key, self._negative_ttl_days(source_config))
+        if failure is not None:
+            logger.info(f"Negative cache hit for {source_name}")
+            return self._fallback(source_config, stale, failure["error"])
         
-        # Cache miss - fetch from source
         logger.info(f"Cache miss for {source_name}, fetching...")
+        fetched_here = []
+        
+        def fetch():
+            fetched_here.append(True)
+            return self._fetch_and_store(source_config, user_input, cache_key,
+                                         write=pending_writes is None)
+        
+        try:
+            data = _inflight.do(self._flight_key(source_name, cache_key), fetch)
+        except Exception as e:
+            return self._fallback(source_config, stale, str(e))
+        
+        # Whoever ran the fetch owns the deferred write
+        if fetched_here and pending_writes is not None:
+            self._store(source_config, cache_key, data, pending_writes)
+        return data
+    
+    def _flight_key(self, source_name: str, cache_key: str) -> tuple:
+        return (self.cache.db_path, source_name, cache_key)
+    
+    def _fetch_and_store(self, source_config: Dict[str, Any], user_input: Dict[str, Any],
+                         cache_key: str, write: bool = True) -> Dict[str, Any]:
+        """Fetch from the source and cache the outcome (failures always)."""
+        try:
+            data = self._fetch_uncached(source_config, user_input)
+        except Exception as e:
+            self._store_failure(source_config, cache_key, e)
+            raise
+        
+        if write:
+            self._store(source_config, cache_key, data)
+        return data
+    
+    def _refresh(self, source_config: Dict[str, Any], user_input: Dict[str, Any], cache_key: str):
+        """Background refresh of a stale entry."""
+        try:
+            _inflight.do(self._flight_key(source_config.get("name"), cache_key),
+                         self._fetch_and_store, source_config, user_input, cache_key)
+        except Exception as e:
+            logger.warning(f"Background refresh of {source_config.get('name')} failed: {e}")
+    
+    def _store(self, source_config: Dict[str, Any], cache_key: str, data: Dict[str, Any],
+               pending_writes: Optional[Dict[str, Any]] = None):
+        """Cache a fetched result; empty results only for the negative TTL."""
+        source_name = source_config.get("name")
+        
+        if self._is_empty(data):
+            self.cache.set(source_name, cache_key, data, self._negative_ttl_days(source_config))
+        elif pending_writes is not None:
+            pending_writes[cache_key] = data
+        else:
+            self.cache.set(source_name, cache_key, data, source_config.get("cache_ttl_days", 30))
+    
+    def _store_failure(self, source_config: Dict[str, Any], cache_key: str, error: Exception):
+        """Negative-cache a failed fetch (next to, not over, any stale entry)."""
+        self.cache.set(source_config.get("name"), cache_key + self.NEGATIVE_KEY_SUFFIX,
+                       {"error": str(error)}, self._negative_ttl_days(source_config))
+    
+    def _fallback(self, source_config: Dict[str, Any], stale: Optional[Dict[str, Any]],
+                  error: str) -> Dict[str, Any]:
+        """Apply the source's fallback_strategy to a failed fetch."""
+        source_name = source_config.get("name")
+        strategy = source_config.get("fallback_strategy")
+        
+        if strategy == "use_cached_if_available" and stale is not None:
+            logger.warning(f"{source_name} failed ({error}), using expired cache")
+            return stale
+        if strategy == "return_null":
+            logger.warning(f"{source_name} failed ({error}), returning null")
+            return {"status": "null", "data": None, "source": source_name, "error": error}
+        if strategy == "fail_request":
+            raise SourceFetchError(f"{source_name} unavailable: {error}")
+        raise RuntimeError(error)
+    
+    def _negative_ttl_days(self, source_config: Dict[str, Any]) -> float:
+        return source_config.get("negative_cache_ttl_seconds", NEGATIVE_CACHE_TTL_S) / DAY_S
+    
+    @staticmethod
+    def _is_empty(data: Dict[str, Any]) -> bool:
+        """True for REST responses with no payload (e.g. no EPC certificates yet)."""
+        if data.get("status") != "success":
+            return False
+        
+        response = data.get("data")
+        if not response:
+            return True
+        if isinstance(response, dict):
+            payload_keys = [k for k in ("result", "results", "rows", "items") if k in response]
+            return bool(payload_keys) and not any(response[k] for k in payload_keys)
+        return False
+    
+    def _fetch_uncached(self, source_config: Dict[str, Any],
+                        user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch from the source itself, bypassing the cache."""
+        source_type = source_config.get("type")
         
         if source_type == "rest_api":
-            data = self._fetch_rest_api(source_config, user_input)
+            return self._fetch_rest_api(source_config, user_input)
         elif source_type == "bulk_csv":
-            data = self._fetch_bulk_csv(source_config, user_input)
+            return self._fetch_bulk_csv(source_config, user_input)
         elif source_type == "csv_static":
-            data = self._fetch_csv_static(source_config, user_input)
+            return self._fetch_csv_static(source_config, user_input)
         else:
             raise ValueError(f"Unknown source type: {source_type}")
+    
+    def execute_many(self, user_inputs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Execute crawler for many inputs (e.g. a portfolio of postcodes).
         
-        # Cache the result
-        self.cache.set(source_name, cache_key, data, ttl_days)
+        Cache lookups and writes are batched per source: one
+        get_many_entries over every input's key (stale rows included), one
+        get_many for the negative cache of the misses, fetches for the
+        distinct missing keys only, and one set_many for what was fetched. Misses follow the same stale,
+        negative cache and fallback rules as execute().
         
-        return data
+        Args:
+            user_inputs: User input parameters, one dict per property
+            
+        Returns:
+            One result per input, shaped like execute()'s
+        """
+        logger.info(f"Executing {self.name} for {len(user_inputs)} inputs")
+        
+        results = [{"crawler_name": self.name, "sources": {}} for _ in user_inputs]
+        
+        for source_config in self.data_sources:
+            source_name = source_config.get("name")
+            
+            # Upstream references and static tables: resolved per input, never cached
+            if source_config.get("source") or source_config.get("type") == "csv_static":
+                for result, user_input in zip(results, user_inputs):
+                    result["sources"][source_name] = self._resolve_uncached(source_config, user_input)
+                continue
+            
+            ttl_days = source_config.get("cache_ttl_days", 30)
+            keys = [self._generate_cache_key(source_config, user_input) for user_input in user_inputs]
+            
+            # One bulk lookup for fresh and stale rows, one for recent failures
+            entries = self.cache.get_many_entries(source_name, keys, ttl_days)
+            cached = {key: data for key, (data, is_fresh) in entries.items() if is_fresh}
+            swr = source_config.get("stale_while_revalidate", True)
+            unchecked = [key + self.NEGATIVE_KEY_SUFFIX for key in dict.fromkeys(keys)
+                         if key not in cached and not (swr and key in entries)]
+            failures = self.cache.get_many(source_name, unchecked, self._negative_ttl_days(source_config)) \
+                if unchecked else {}
+            
+            # Resolve each missing key once, even if several inputs share it
+            fetched = {}
+            failed = {}
+            pending_writes = {}
+            for key, user_input in zip(keys, user_inputs):
+                if key in cached or key in fetched or key in failed:
+                    continue
+                entry = entries.get(key)
+                try:
+                    fetched[key] = self._resolve_miss(source_config, user_input, key,
+                                                      entry[0] if entry is not None else None,
+                                                      pending_writes, failures)
+                except SourceFetchError:
+                    raise
+                except Exception as e:
+                    logger.error(f"✗ Failed to fetch {source_name} for {key}: {e}")
+                    failed[key] = {"error": str(e), "status": "failed"}
+            
+            self.cache.set_many(source_name, pending_writes, ttl_days)
+            logger.info(f"✓ {source_name}: {len(cached)} cached, {len(fetched)} fetched, "
+                        f"{len(failed)} failed")
+            
+            for result, key in zip(results, keys):
+                if key in cached:
+                    result["sources"][source_name] = cached[key]
+                elif key in fetched:
+                    result["sources"][source_name] = fetched[key]
+                else:
+                    result["sources"][source_name] = failed[key]
+        
+        return results
+    
+    def _resolve_uncached(self, source_config: Dict[str, Any],
+                          user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        _fetch_source for a source that is never cached, with failures
+        reported the way execute_many reports them.
+        
+        Raises:
+            SourceFetchError: Fetch failed and fallback_strategy is fail_request
+        """
+        try:
+            return self._fetch_source(source_config, user_input)
+        except SourceFetchError:
+            raise
+        except Exception as e:
+            logger.error(f"✗ Failed to fetch {source_config.get('name')}: {e}")
+            return {"error": str(e), "status": "failed"}
     
     def _fetch_rest_api(self, source_config: Dict[str, Any], 
                        user_input: Dict[str, Any]) -> Dict[str, Any]:
         """Fetch data from REST API."""
-        url_template = source_config.get("url")
-        params_mapping = source_config.get("params_mapping", {})
+        url, params, headers = self._build_request(source_config, user_input)
+        
+        # Make API call
+        response = self.api_client.get(url, params=params, headers=headers)
+        
+        return {
+            "status": "success",
+            "data": response,
+            "source": source_config.get("name")
+        }
+    
+    def _build_request(self, source_config: Dict[str, Any], user_input: Dict[str, Any]) -> tuple:
+        """URL, query parameters and headers for a REST source."""
+        # Templates are pre-parsed when the instructions are loaded
+        plan = SourcePlan.of(source_config)
         
         # Build URL with user input
-        url = self._interpolate_template(url_template, user_input)
+        url = plan.url.render(user_input) if plan.url is not None else None
         
         # Build query parameters
-        params = {}
-        for key, value_template in params_mapping.items():
-            params[key] = self._interpolate_template(value_template, user_input)
+        params = {key: template.render(user_input) for key, template in plan.params}
         
-        # Make API call
-        response = self.api_client.get(url, params=params)
+        headers = dict(plan.headers) if plan.headers is not None else None
+        return url, params, headers
+    
+    def _reuse_upstream(self, source_config: Dict[str, Any],
+                        user_input: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Result of a source declared as "source": "<crawler>.<source>" (e.g.
+        comparable_sales over land_registry_ppd), from the upstream result
+        SourceScheduler passed in, with its interpolated filter attached.
+        """
+        upstream_name = source_config["source"]
+        upstream = user_input.get(self.UPSTREAM_KEY, {}).get(upstream_name)
+        if not upstream or upstream.get("status") != "success":
+            raise RuntimeError(f"Upstream {upstream_name} not available")
         
         return {
             "status": "success",
-            "data": response,
-            "source": source_config.get("name")
+            "data": upstream.get("data"),
+            "source": source_config.get("name"),
+            "upstream": upstream_name,
+            "filter": {key: template.render(user_input)
+                       for key, template in SourcePlan.of(source_config).filter}
         }
     
     def _fetch_bulk_csv(self, source_config: Dict[str, Any], 
@@ -152,11 +723,30 @@ class CrawlerAgent:
     
     def _fetch_csv_static(self, source_config: Dict[str, Any], 
                          user_input: Dict[str, Any]) -> Dict[str, Any]:
-        """Fetch data from static CSV file."""
-        # Placeholder - will implement in training pipeline
+        """
+        Filter a static CSV (converted once to a memory-mapped Arrow table).
+        
+        The "filter" clause runs against the table's indexes: equality and
+        lists on column names, "<column>_from"/"<column>_to" ranges and
+        "<column>_contains" substrings. Clauses that name no column (e.g.
+        within_radius_km) are returned as unapplied_filters.
+        """
+        from utils.static_table import StaticTableStore, STATIC_MAX_ROWS
+        
+        table = StaticTableStore.shared().get(source_config["file_path"])
+        filters = {key: template.render(user_input)
+                   for key, template in SourcePlan.of(source_config).filter}
+        rows, unapplied = table.select(filters)
+        
+        max_rows = source_config.get("max_rows", STATIC_MAX_ROWS)
         return {
-            "status": "not_implemented",
-            "message": "Static CSV fetching implemented in training pipeline",
+            "status": "success",
+            "data": {
+                "rows": table.records(rows[:max_rows], list(source_config.get("output_fields", []))),
+                "row_count": len(rows),
+                "truncated": len(rows) > max_rows,
+                "unapplied_filters": unapplied
+            },
             "source": source_config.get("name")
         }
     
@@ -178,24 +768,9 @@ class CrawlerAgent:
     
     def _interpolate_template(self, template: str, user_input: Dict[str, Any]) -> str:
         """
-        Replace template placeholders with user input values.
+        Replace template placeholders with user input and derived values.
         
-        Example: "{user_input.postcode}" -> "SW1A 1AA"
+        Example: "{user_input.postcode}" -> "SW1A 1AA",
+                 "{derived.latitude}" -> "51.501"
         """
-        if not isinstance(template, str):
-            return template
-        
-        result = template
-        
-        # Replace {user_input.key} patterns
-        for key, value in user_input.items():
-            placeholder = f"{{user_input.{key}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, str(value))
-        
-        return result
-    
-    def __del__(self):
-        """Cleanup when agent is destroyed."""
-        if hasattr(self, 'api_client'):
-            self.api_client.close()
+        return Template.of(template).render(user_input)
@@ -0,0 +1,125 @@
+"""
+Cache of LLM explanations keyed by normalized prediction context.
+"""
+
+import asyncio
+import math
+from typing import Dict, List, Optional
+
+from utils.lru_cache import LRUCache
+from utils.cache_manager import CacheManager
+
+
+class ExplanationCache:
+    """
+    Reuses LLM explanations for predictions with the same context.
+    
+    The explanation prompt only depends on a few low-cardinality fields, so the
+    key is (sector, town, type, tenure, price bucket, area median bucket, top
+    factors). Prices are bucketed on a log scale, and the cached text has its
+    quoted price rewritten to the new prediction on a hit.
+    
+    An in-process LRU is always used; a CacheManager adds persistence across
+    restarts. Async callers use aget/aset, which do the SQLite I/O on a
+    worker thread.
+    """
+    
+    SOURCE = "llm_explanation"
+    
+    def __init__(self, max_entries: int = 5000, ttl_seconds: float = 7 * 86400,
+                 price_bucket_pct: float = 2.5,
+                 cache_manager: Optional[CacheManager] = None):
+        """
+        Initialize explanation cache.
+        
+        Args:
+            max_entries: In-memory LRU size
+            ttl_seconds: Explanation lifetime
+            price_bucket_pct: Width of price buckets in percent
+            cache_manager: Optional SQLite cache for persistence
+        """
+        self.memory = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.cache_manager = cache_manager
+        self._log_step = math.log1p(price_bucket_pct / 100)
+    
+    def _bucket(self, price: float) -> int:
+        """Log-scale price bucket."""
+        return round(math.log(max(price, 1.0)) / self._log_step)
+    
+    def make_key(self, features: Dict, prediction: float, top_features: List) -> str:
+        """Normalized context key for a prediction."""
+        return "|".join([
+            str(features.get('postcode_sector', '')).upper(),
+            str(features.get('town_city', '')).upper(),
+            str(features.get('property_type', '')),
+            str(features.get('duration', '')),
+            str(self._bucket(prediction)),
+            str(self._bucket(features.get('sector_median_price', 0) or 0)),
+            ",".join(f[0] for f in top_features[:3])
+        ])
+    
+    def get(self, features: Dict, prediction: float, top_features: List) -> Optional[str]:
+        """
+        Look up an explanation for this context.
+        
+        Returns:
+            Explanation with the price updated to this prediction, or None
+        """
+        key = self.make_key(features, prediction, top_features)
+        entry = self.memory.get(key)
+        
+        if entry is None and self.cache_manager is not None:
+            entry = self.cache_manager.get(self.SOURCE, key, ttl_days=self._ttl_days())
+            if entry is not None:
+                self.memory.set(key, entry)
+        
+        return self._reprice(entry, prediction)
+    
+    async def aget(self, features: Dict, prediction: float, top_features: List) -> Optional[str]:
+        """get without blocking the event loop on the persistent tier."""
+        key = self.make_key(features, prediction, top_features)
+        entry = self.memory.get(key)
+        
+        if entry is None and self.cache_manager is not None:
+            entry = await asyncio.to_thread(
+                self.cache_manager.get, self.SOURCE, key, ttl_days=self._ttl_days()
+            )
+            if entry is not None:
+                self.memory.set(key, entry)
+        
+        return self._reprice(entry, prediction)
+    
+    def set(self, features: Dict, prediction: float, top_features: List, text: str):
+        """Store a freshly generated explanation."""
+        key = self.make_key(features, prediction, top_features)
+        entry = {"text": text, "prediction": float(prediction)}
+        
+        self.memory.set(key, entry)
+        if self.cache_manager is not None:
+            self.cache_manager.set(self.SOURCE, key, entry, ttl_days=self._ttl_days())
+    
+    async def aset(self, features: Dict, prediction: float, top_features: List, text: str):
+        """set without blocking the event loop on the persistent tier."""
+        key = self.make_key(features, prediction, top_features)
+        entry = {"text": text, "prediction": float(prediction)}
+        
+        self.memory.set(key, entry)
+        if self.cache_manager is not None:
+            await asyncio.to_thread(
+                self.cache_manager.set, self.SOURCE, key, entry, ttl_days=self._ttl_days()
+            )
+    
+    def _reprice(self, entry: Optional[dict], prediction: float) -> Optional[str]:
+        """Cached text with its quoted price rewritten to this prediction."""
+        if entry is None:
+            return None
+        
+        return entry["text"].replace(f"£{entry['prediction']:,.0f}", f"£{prediction:,.0f}")
+    
+    def _ttl_days(self) -> int:
+        return max(1, math.ceil(self.ttl_seconds / 86400))
+    
+    def stats(self) -> dict:
+        """In-memory hit/miss counters."""
+        return self.memory.stats()
@@ -0,0 +1,189 @@
+"""
+Serving-side feature store for the house model's lookup features.
+"""
+
+import json
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# Sectors are keyed by the outward code's area and district as in training
+# (scripts/clean_and_save.py): "SW1A 1AA" -> "SW1"
+SECTOR_PATTERN = re.compile(r"^([A-Z]{1,2}\d{1,2})")
+
+
+def postcode_sector(postcode: Optional[str]) -> str:
+    """Training-time sector key of a postcode ("UNKNOWN" if it has none)."""
+    match = SECTOR_PATTERN.match((postcode or "").strip().upper())
+    return match.group(1) if match else "UNKNOWN"
+
+
+def save_feature_store(df: "pd.DataFrame", path: str, model_version: str):
+    """
+    Write the lookup tables computed during training.
+    
+    Layout is a directory of flat .npy columns (memory-mappable) plus a
+    meta.json holding the key vocabularies:
+        sector_town.npy, sector_county.npy  int32 codes into towns/counties
+        sector_median.npy                   float64, per sector
+        town_median.npy                     float64, per town
+        type_median.npy                     float64, per property type
+    
+    Args:
+        df: Training frame after feature engineering (postcode_sector, town_city,
+            county, property_type, price, *_median columns)
+        path: Output directory
+        model_version: Model these tables were trained with
+    """
+    out = Path(path)
+    out.mkdir(parents=True, exist_ok=True)
+    
+    sector_median = df.groupby('postcode_sector')['price'].median()
+    town_median = df.groupby('town_city')['price'].median()
+    type_median = df.groupby('property_type')['price'].median()
+    
+    # Most common town/county per sector
+    def mode_by_sector(col: str) -> "pd.Series":
+        counts = df.groupby(['postcode_sector', col]).size()
+        return counts.sort_values(ascending=False).reset_index(level=1) \
+            .groupby(level=0)[col].first()
+    
+    sectors = sector_median.index.astype(str).tolist()
+    towns = town_median.index.astype(str).tolist()
+    counties = sorted(df['county'].astype(str).unique().tolist())
+    
+    town_code = {t: i for i, t in enumerate(towns)}
+    county_code = {c: i for i, c in enumerate(counties)}
+    
+    sector_town = mode_by_sector('town_city').reindex(sector_median.index)
+    sector_county = mode_by_sector('county').reindex(sector_median.index)
+    
+    np.save(out / "sector_town.npy", sector_town.map(town_code).to_numpy(dtype=np.int32))
+    np.save(out / "sector_county.npy", sector_county.map(county_code).to_numpy(dtype=np.int32))
+    np.save(out / "sector_median.npy", sector_median.to_numpy(dtype=np.float64))
+    np.save(out / "town_median.npy", town_median.to_numpy(dtype=np.float64))
+    np.save(out / "type_median.npy", type_median.to_numpy(dtype=np.float64))
+    
+    with open(out / "meta.json", 'w') as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "model_version": model_version,
+            "built_at": datetime.now().isoformat(),
+            "sectors": sectors,
+            "towns": towns,
+            "counties": counties,
+            "property_types": type_median.index.astype(str).tolist(),
+            # Same fallbacks training used for missing values
+            "defaults": {
+                "sector_median_price": float(df['sector_median_price'].median()),
+                "town_median_price": float(df['town_median_price'].median()),
+                "property_type_median": float(df['property_type_median'].median())
+            }
+        }, f)
+
+
+class FeatureStore:
+    """
+    Array-index lookups of sector geography and median prices.
+    
+    Vocabularies are turned into dicts once at load; each lookup is then a
+    dict hit plus a read from a memory-mapped column.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Load a feature store written by save_feature_store.
+        
+        Args:
+            path: Feature store directory
+        """
+        root = Path(path)
+        with open(root / "meta.json", 'r') as f:
+            self.meta = json.load(f)
+        
+        if self.meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported feature store format {self.meta['format_version']} in {path}")
+        
+        self.model_version = self.meta["model_version"]
+        self.towns = self.meta["towns"]
+        self.counties = self.meta["counties"]
+        self.defaults = self.meta["defaults"]
+        
+        self.sector_town = np.load(root / "sector_town.npy", mmap_mode="r")
+        self.sector_county = np.load(root / "sector_county.npy", mmap_mode="r")
+        self.sector_median = np.load(root / "sector_median.npy", mmap_mode="r")
+        self.town_median = np.load(root / "town_median.npy", mmap_mode="r")
+        self.type_median = np.load(root / "type_median.npy", mmap_mode="r")
+        
+        self._sector = {s: i for i, s in enumerate(self.meta["sectors"])}
+        self._type = {t: i for i, t in enumerate(self.meta["property_types"])}
+        
+        logger.info(f"Loaded feature store for {len(self._sector):,} sectors ({self.model_version})")
+    
+    def enrich(self, features: Dict) -> Dict:
+        """
+        Fill geography and median features from postcode_sector and property_type.
+        
+        Unknown sectors get 'UNKNOWN' geography and the training-time defaults.
+        
+        Args:
+            features: Feature dict with at least postcode_sector and property_type
+        
+        Returns:
+            The same dict, updated in place
+        """
+        i = self._sector.get(features.get("postcode_sector"))
+        
+        if i is None:
+            features["town_city"] = "UNKNOWN"
+            features["county"] = "UNKNOWN"
+            features["sector_median_price"] = self.defaults["sector_median_price"]
+            features["town_median_price"] = self.defaults["town_median_price"]
+        else:
+            town = int(self.sector_town[i])
+            features["town_city"] = self.towns[town]
+            features["county"] = self.counties[int(self.sector_county[i])]
+            features["sector_median_price"] = float(self.sector_median[i])
+            features["town_median_price"] = float(self.town_median[town])
+        
+        t = self._type.get(features.get("property_type"))
+        features["property_type_median"] = (
+            float(self.type_median[t]) if t is not None else self.defaults["property_type_median"]
+        )
+        
+        return features
+    
+    def geography(self) -> "pd.DataFrame":
+        """One row per sector (index) with town, county and both medians."""
+        import pandas as pd
+        
+        town_idx = np.asarray(self.sector_town)
+        return pd.DataFrame({
+            "town_city": np.array(self.towns, dtype=object)[town_idx],
+            "county": np.array(self.counties, dtype=object)[np.asarray(self.sector_county)],
+            "sector_median_price": np.asarray(self.sector_median),
+            "town_median_price": np.asarray(self.town_median)[town_idx]
+        }, index=pd.Index(self.meta["sectors"], name="postcode_sector"))
+    
+    def type_medians(self) -> Dict[str, float]:
+        """Median price per property type code."""
+        return {t: float(self.type_median[i]) for t, i in self._type.items()}
+
+
+def load_feature_store(path: str) -> Optional[FeatureStore]:
+    """Load a feature store if it exists, else None."""
+    if not (Path(path) / "meta.json").exists():
+        logger.warning(f"No feature store at {path}")
+        return None
+    return FeatureStore(path)
@@ -2,23 +2,52 @@
 ML Execution Agent with REAL LLM (Ollama + Llama 3).
 """
 
-import pandas as pd
-from catboost import CatBoostRegressor
+import asyncio
 import json
-import requests
-from typing import Dict, List
+import logging
+import numpy as np
+from typing import AsyncIterator, Dict, List, Optional
+from agents.explanation_cache import ExplanationCache
+from agents.prediction_grid import PredictionGrid
+from agents.tree_evaluator import load_tree_model
+from utils.lru_cache import LRUCache
+from utils.llm_client import LLMClient
+from utils.llm_gateway import LLMGateway
+
+logger = logging.getLogger(__name__)
+
 
 class MLExecutionAgent:
     """Handles model loading, prediction, and LLM-powered explanations."""
     
-    def __init__(self, model_path: str = "models/house_2024_improved_v1.cbm"):
+    def __init__(self, model_path: str = "models/house_2024_improved_v1.cbm",
+                 explanation_cache: Optional[ExplanationCache] = None,
+                 engine: str = "catboost",
+                 llm_client: Optional[LLMClient] = None,
+                 llm_gateway: Optional[LLMGateway] = None):
         self.model_path = model_path
         self.model = None
+        self.engine = engine
+        self.tree_model = None
         self.metadata = None
-        self.ollama_url = "http://localhost:11434/api/generate"
+        self.llm_gateway = llm_gateway or LLMGateway(llm_client)
+        self.llm = self.llm_gateway.client
+        self.explanation_cache = explanation_cache or ExplanationCache()
+        self.grid = None
+        
+        # Model introspection, computed once per loaded model
+        self.feature_importance = {}
+        self.top_features = []
+        self.top_factors = []
+        
+        # Per-prediction SHAP attribution, built lazily on first use
+        self._shap_explainer = None
+        self._shap_cache = LRUCache(max_entries=10000)
         
     def load_model(self):
         """Load trained model."""
+        from catboost import CatBoostRegressor  # heavy; imported on first load
+        
         print(f"Loading model from {self.model_path}...")
         self.model = CatBoostRegressor()
         self.model.load_model(self.model_path)
@@ -27,38 +56,200 @@ class MLExecutionAgent:
         with open(metadata_path, 'r') as f:
             self.metadata = json.load(f)
         
+        feature_names = self.metadata['features']
+        importance = self.model.get_feature_importance()
+        self.feature_importance = {f: float(i) for f, i in zip(feature_names, importance)}
+        self.top_features = sorted(
+            self.feature_importance.items(),
+            key=lambda x: abs(x[1]),
+            reverse=True
+        )[:5]
+        self.top_factors = [{"feature": f, "importance": i} for f, i in self.top_features]
+        
+        self._shap_explainer = None
+        self._shap_cache.clear()
+        
+        # NumPy evaluator for live scoring; CatBoost stays loaded for SHAP and fallback
+        self.tree_model = None
+        if self.engine == "numpy":
+            self.tree_model = load_tree_model(self.model_path.replace('.cbm', '_trees'))
+            if self.tree_model is None:
+                logger.warning("No compiled trees (scripts/compile_tree_model.py), using CatBoost")
+        
         print(f"✅ Model loaded (R² {self.metadata['metrics']['r2_score']:.4f})")
+    
+    def load_grid(self, grid_path: str):
+        """
+        Serve from a precomputed prediction grid, falling back to the model.
+        
+        Args:
+            grid_path: Grid path without extension (see scripts/build_prediction_grid.py)
+        """
+        self.grid = PredictionGrid(grid_path)
         
     def predict(self, features: Dict) -> Dict:
-        """Make prediction with LLM explanation."""
+        """Make a single prediction (explain with aexplain or astream_explanation)."""
+        return self.predict_batch([features])[0]
+    
+    def predict_batch(self, features_list: List[Dict]) -> List[Dict]:
+        """
+        Predict many properties with a single vectorized model call.
+        
+        Args:
+            features_list: One feature dict per property
+            
+        Returns:
+            One result dict per input, in input order, with no explanation
+        """
         
         if self.model is None:
             self.load_model()
         
-        df = pd.DataFrame([features])
-        prediction = self.model.predict(df)[0]
+        if not features_list:
+            return []
         
-        feature_importance = self.model.get_feature_importance()
         feature_names = self.metadata['features']
+        predictions = np.empty(len(features_list))
+        missing = list(range(len(features_list)))
         
-        top_features = sorted(
-            zip(feature_names, feature_importance),
-            key=lambda x: abs(x[1]),
-            reverse=True
-        )[:5]
+        if self.grid is not None:
+            missing = []
+            for i, features in enumerate(features_list):
+                value = self.grid.lookup(features)
+                if value is None:
+                    missing.append(i)
+                else:
+                    predictions[i] = value
         
-        explanation = self._generate_llm_explanation(features, prediction, top_features)
+        # Live model only for combinations the grid doesn't cover
+        if missing and self.tree_model is not None:
+            predictions[missing] = self.tree_model.predict([features_list[i] for i in missing])
+        elif missing:
+            import pandas as pd
+            df = pd.DataFrame([features_list[i] for i in missing], columns=feature_names)
+            predictions[missing] = self.model.predict(df)
         
-        return {
-            "prediction": float(prediction),
-            "confidence_low": float(prediction * 0.85),
-            "confidence_high": float(prediction * 1.15),
-            "explanation": explanation,
-            "top_factors": [{"feature": f, "importance": float(i)} for f, i in top_features]
-        }
+        results = []
+        for prediction in predictions:
+            results.append({
+                "prediction": float(prediction),
+                "confidence_low": float(prediction * 0.85),
+                "confidence_high": float(prediction * 1.15),
+                "explanation": None,
+                "top_factors": self.top_factors
+            })
+        
+        return results
+    
+    def shap_values(self, features_list: List[Dict]) -> List[Dict[str, float]]:
+        """
+        Per-prediction SHAP attribution, computed in one batch and cached.
+        
+        Args:
+            features_list: One feature dict per property
+            
+        Returns:
+            One {feature: contribution} dict per input; contributions plus the
+            model's expected value sum to the prediction
+        """
+        
+        if self.model is None:
+            self.load_model()
+        
+        if self._shap_explainer is None:
+            import shap
+            self._shap_explainer = shap.TreeExplainer(self.model)
+        
+        feature_names = self.metadata['features']
+        keys = [tuple(features.get(f) for f in feature_names) for features in features_list]
+        values = [self._shap_cache.get(key) for key in keys]
+        missing = [i for i, v in enumerate(values) if v is None]
+        
+        if missing:
+            import pandas as pd
+            df = pd.DataFrame([features_list[i] for i in missing], columns=feature_names)
+            rows = self._shap_explainer.shap_values(df)
+            
+            for i, row in zip(missing, rows):
+                values[i] = {f: float(v) for f, v in zip(feature_names, row)}
+                self._shap_cache.set(keys[i], values[i])
+        
+        return values
+    
+    def template_explanation(self, features: Dict, result: Dict) -> str:
+        """Instant template explanation (no LLM call)."""
+        return self._fallback_explanation(
+            features, result["prediction"], features.get('sector_median_price', 0)
+        )
     
-    def _generate_llm_explanation(self, features: Dict, prediction: float, top_features: List) -> str:
-        """Generate explanation using Ollama Llama 3."""
+    async def astream_explanation(self, features: Dict, result: Dict) -> AsyncIterator[str]:
+        """
+        Stream the LLM explanation token by token through the LLM gateway.
+        
+        Yields the cached text in one chunk on a hit, the template if the LLM
+        is busy or fails before producing anything, and caches completed
+        generations.
+        """
+        prediction = result["prediction"]
+        top_features = [(f["feature"], f["importance"]) for f in result["top_factors"]]
+        
+        cached = await self.explanation_cache.aget(features, prediction, top_features)
+        if cached is not None:
+            yield cached
+            return
+        
+        prompt = self._build_explanation_prompt(features, prediction, top_features)
+        tokens = []
+        
+        try:
+            async for token in self.llm_gateway.stream(prompt):
+                tokens.append(token)
+                yield token
+            await self.explanation_cache.aset(features, prediction, top_features, "".join(tokens).strip())
+        except Exception as e:
+            logger.warning(f"LLM stream error: {e}, using fallback")
+            if not tokens:
+                yield self.template_explanation(features, result)
+    
+    async def aexplain(self, features: Dict, result: Dict,
+                       budget_s: Optional[float] = None) -> Optional[str]:
+        """
+        LLM explanation within a latency budget, without blocking the event loop.
+        
+        A generation that overruns the budget keeps going in the background and
+        is cached when it completes, so the next similar request gets it.
+        
+        Args:
+            features: Model features of the prediction
+            result: Prediction result
+            budget_s: Latency budget (gateway default if None)
+        
+        Returns:
+            Cached or freshly generated text, or None if the LLM is busy, failed
+            or ran over budget (callers fall back to template_explanation)
+        """
+        prediction = result["prediction"]
+        top_features = [(f["feature"], f["importance"]) for f in result["top_factors"]]
+        
+        cached = await self.explanation_cache.aget(features, prediction, top_features)
+        if cached is not None:
+            return cached
+        
+        # Late results arrive in a loop callback, so the store goes to a worker thread
+        loop = asyncio.get_running_loop()
+        
+        def cache_late(text: str):
+            loop.run_in_executor(None, self.explanation_cache.set, features, prediction, top_features, text)
+        
+        prompt = self._build_explanation_prompt(features, prediction, top_features)
+        explanation = await self.llm_gateway.generate(prompt, budget_s=budget_s, on_late_result=cache_late)
+        
+        if explanation is not None:
+            await self.explanation_cache.aset(features, prediction, top_features, explanation)
+        return explanation
+    
+    def _build_explanation_prompt(self, features: Dict, prediction: float, top_features: List) -> str:
+        """Build the Llama 3 prompt for a prediction."""
         
         property_type_map = {
             'D': 'detached house',
@@ -74,7 +265,7 @@ class MLExecutionAgent:
         
         top_factor_names = [f[0] for f in top_features[:3]]
         
-        prompt = f"""You are a UK property expert explaining house price predictions to homeowners.
+        return f"""You are a UK property expert explaining house price predictions to homeowners.
 
 Property Details:
 - Type: {prop_type}
@@ -89,26 +280,6 @@ Write a brief, friendly 2-3 sentence explanation for the homeowner about:
 3. The main factor affecting the value
 
 Use plain English, no jargon. Be conversational and helpful."""
-
-        try:
-            response = requests.post(
-                self.ollama_url,
-                json={
-                    "model": "llama3.2:3b",
-                    "prompt": prompt,
-                    "stream": False
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                return response.json()["response"].strip()
-            else:
-                return self._fallback_explanation(features, prediction, sector_median)
-                
-        except Exception as e:
-            print(f"⚠️ LLM error: {e}, using fallback")
-            return self._fallback_explanation(features, prediction, sector_median)
     
     def _fallback_explanation(self, features: Dict, prediction: float, sector_median: float) -> str:
         """Fallback template if LLM fails."""
@@ -127,6 +298,14 @@ Use plain English, no jargon. Be conversational and helpful."""
         return explanation
 
 
+async def _explain(agent: MLExecutionAgent, features: Dict) -> Dict:
+    """Predict off the loop, then explain through the gateway."""
+    result = await asyncio.to_thread(agent.predict, features)
+    text = await agent.aexplain(features, result)
+    result["explanation"] = text or agent.template_explanation(features, result)
+    return result
+
+
 def test_agent():
     """Test with LLM."""
     
@@ -154,7 +333,7 @@ def test_agent():
     print("\n🤖 Generating prediction with LLM explanation...")
     print("(This may take 10-20 seconds for first request)\n")
     
-    result = agent.predict(test_property)
+    result = asyncio.run(_explain(agent, test_property))
     
     print(f"💰 Prediction: £{result['prediction']:,.0f}")
     print(f"📊 Range: £{result['confidence_low']:,.0f} - £{result['confidence_high']:,.0f}")
@@ -0,0 +1,158 @@
+"""
+Precomputed prediction table over the house model's finite input grid.
+"""
+
+import json
+import logging
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+import numpy as np
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+PROPERTY_TYPES = ["D", "S", "T", "F"]
+TENURES = ["F", "L"]
+MONTHS = list(range(1, 13))
+NEW_BUILD = [0, 1]
+
+
+def build_grid(model, feature_names: List[str], geography: "pd.DataFrame",
+               type_medians: Dict[str, float], chunk_size: int = 500) -> np.ndarray:
+    """
+    Evaluate the model over every (sector, type, tenure, month, new build) cell.
+    
+    Args:
+        model: Loaded CatBoostRegressor
+        feature_names: Model feature order
+        geography: One row per postcode sector (index) with town_city, county,
+            sector_median_price and town_median_price columns
+        type_medians: Median price per property type code
+        chunk_size: Sectors evaluated per model call
+    
+    Returns:
+        float32 array of shape (sectors, types, tenures, months, new_build)
+    """
+    import pandas as pd
+    
+    cell_shape = (len(PROPERTY_TYPES), len(TENURES), len(MONTHS), len(NEW_BUILD))
+    cells_per_sector = int(np.prod(cell_shape))
+    
+    # One sector's worth of cells, in C order of the grid axes
+    t, d, m, n = np.meshgrid(
+        np.arange(len(PROPERTY_TYPES)), np.arange(len(TENURES)),
+        np.arange(len(MONTHS)), np.arange(len(NEW_BUILD)), indexing="ij"
+    )
+    cells = pd.DataFrame({
+        "property_type": np.array(PROPERTY_TYPES)[t.ravel()],
+        "duration": np.array(TENURES)[d.ravel()],
+        "month": np.array(MONTHS)[m.ravel()],
+        "is_new_build": np.array(NEW_BUILD)[n.ravel()],
+    })
+    cells["quarter"] = (cells["month"] - 1) // 3 + 1
+    cells["is_freehold"] = (cells["duration"] == "F").astype(int)
+    cells["property_type_median"] = cells["property_type"].map(type_medians).astype(float)
+    
+    grid = np.empty((len(geography),) + cell_shape, dtype=np.float32)
+    
+    for start in range(0, len(geography), chunk_size):
+        chunk = geography.iloc[start:start + chunk_size]
+        
+        df = cells.loc[np.tile(cells.index, len(chunk))].reset_index(drop=True)
+        sector_rows = np.repeat(np.arange(len(chunk)), cells_per_sector)
+        df["postcode_sector"] = chunk.index.values[sector_rows]
+        for col in ["town_city", "county", "sector_median_price", "town_median_price"]:
+            df[col] = chunk[col].values[sector_rows]
+        
+        predictions = model.predict(df[feature_names])
+        grid[start:start + len(chunk)] = predictions.reshape((len(chunk),) + cell_shape)
+        
+        logger.info(f"Grid: {min(start + chunk_size, len(geography)):,}/{len(geography):,} sectors")
+    
+    return grid
+
+
+def save_grid(grid: np.ndarray, sectors: List[str], path: str, model_version: str):
+    """
+    Write the grid as a raw .npy (memory-mappable) plus a JSON index.
+    
+    Args:
+        grid: Output of build_grid
+        sectors: Sector names in grid row order
+        path: Output path without extension
+        model_version: Model the grid was computed from
+    """
+    np.save(f"{path}.npy", grid)
+    
+    with open(f"{path}.json", 'w') as f:
+        json.dump({
+            "model_version": model_version,
+            "built_at": datetime.now().isoformat(),
+            "axes": {
+                "property_type": PROPERTY_TYPES,
+                "duration": TENURES,
+                "month": MONTHS,
+                "is_new_build": NEW_BUILD
+            },
+            "sectors": list(sectors)
+        }, f)
+
+
+class PredictionGrid:
+    """
+    O(1) lookups into a precomputed prediction table.
+    
+    Cells were evaluated with each sector's own town, county and medians, so
+    only sector, type, tenure, month and new-build flag are read from a request.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Load a grid written by save_grid.
+        
+        Args:
+            path: Grid path without extension
+        """
+        with open(f"{path}.json", 'r') as f:
+            self.index = json.load(f)
+        
+        self.values = np.load(f"{path}.npy", mmap_mode="r")
+        self.model_version = self.index["model_version"]
+        
+        self._sector = {s: i for i, s in enumerate(self.index["sectors"])}
+        self._type = {v: i for i, v in enumerate(self.index["axes"]["property_type"])}
+        self._tenure = {v: i for i, v in enumerate(self.index["axes"]["duration"])}
+        
+        self.hits = 0
+        self.misses = 0
+        
+        logger.info(f"Loaded prediction grid for {len(self._sector):,} sectors ({self.model_version})")
+    
+    def lookup(self, features: Dict) -> Optional[float]:
+        """
+        Look up one prediction.
+        
+        Returns:
+            Precomputed prediction, or None if the combination is not in the grid
+        """
+        try:
+            cell = (
+                self._sector[features["postcode_sector"]],
+                self._type[features["property_type"]],
+                self._tenure[features["duration"]],
+                int(features["month"]) - 1,
+                int(features["is_new_build"])
+            )
+        except (KeyError, TypeError, ValueError):
+            self.misses += 1
+            return None
+        
+        if not (0 <= cell[3] < len(MONTHS) and cell[4] in (0, 1)):
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        return float(self.values[cell])
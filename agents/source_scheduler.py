@@ -0,0 +1,266 @@
+"""
+Dependency-aware scheduling of a model's data sources across its crawlers.
+"""
+
+import asyncio
+import calendar
+import logging
+import re
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from agents.crawler_agent import CrawlerAgent, SourceFetchError
+from utils.cache_manager import CacheManager
+from utils.instruction_plan import SourcePlan
+
+logger = logging.getLogger(__name__)
+
+MONTHS_AGO_PATTERN = re.compile(r"date_minus_(\d+)_months$")
+
+
+def computed_value(name: str, today: date) -> Optional[str]:
+    """
+    Derived values that come from the calendar rather than a source.
+    
+    Args:
+        name: Derived name, e.g. "date_last_month" or "date_minus_12_months"
+        today: Reference date
+    
+    Returns:
+        "YYYY-MM" for date_last_month, an ISO date for date_minus_N_months,
+        None for anything else
+    """
+    if name == "date_last_month":
+        return (today.replace(day=1) - timedelta(days=1)).strftime("%Y-%m")
+    
+    match = MONTHS_AGO_PATTERN.match(name)
+    if match:
+        year, month = divmod(today.year * 12 + today.month - 1 - int(match.group(1)), 12)
+        day = min(today.day, calendar.monthrange(year, month + 1)[1])
+        return date(year, month + 1, day).isoformat()
+    
+    return None
+
+
+def find_field(payload: Any, field: str) -> Any:
+    """
+    First scalar value named field in a JSON payload, breadth first (lists
+    contribute their first item), e.g. latitude in postcodes.io's
+    {"result": {"latitude": ...}}.
+    """
+    queue = [payload]
+    while queue:
+        node = queue.pop(0)
+        if isinstance(node, dict):
+            value = node.get(field)
+            if value is not None and not isinstance(value, (dict, list)):
+                return value
+            queue.extend(node.values())
+        elif isinstance(node, list) and node:
+            queue.append(node[0])
+    return None
+
+
+class SourceNode:
+    """One data source in the DAG, identified as "<crawler_id>.<name>"."""
+    
+    def __init__(self, crawler_id: str, config: Dict[str, Any]):
+        self.crawler_id = crawler_id
+        self.config = config
+        self.name = config.get("name")
+        self.id = f"{crawler_id}.{self.name}"
+        
+        # {derived.X} placeholders anywhere in the source definition
+        self.derived = SourcePlan.of(config).derived
+        self.upstream = config.get("source")
+        self.providers: Dict[str, str] = {}
+        self.deps = set()
+
+
+class SourceScheduler:
+    """
+    Runs the sources of all of a model's crawlers as one dependency DAG.
+    
+    Edges come from the instruction JSON: a source using {derived.X} waits
+    for the source whose output_fields provide X (e.g. police_uk_crime for
+    postcodes_io's latitude), and a source with "source": "crawler_1.x"
+    waits for x and reuses its result instead of fetching again. Calendar
+    values such as {derived.date_minus_12_months} need no source.
+    
+    Every source starts as soon as its inputs resolve, so a request takes
+    as long as the longest dependency chain rather than the sum of all
+    calls. Sources keep their crawler's concurrency limit, timeouts,
+    caching and fallbacks, and results come back per crawler, shaped like
+    CrawlerAgent.execute()'s.
+    """
+    
+    def __init__(self, crawler_configs: List[Dict[str, Any]],
+                 cache_manager: Optional[CacheManager] = None,
+                 crawler_ids: Optional[List[str]] = None):
+        """
+        Initialize scheduler.
+        
+        Args:
+            crawler_configs: Crawler configurations from instruction JSON
+            cache_manager: Cache shared by the crawlers
+            crawler_ids: Names used in "source" references (default
+                crawler_1, crawler_2, ... in order)
+        
+        Raises:
+            ValueError: Unknown "source" reference or a dependency cycle
+        """
+        crawler_ids = crawler_ids or [f"crawler_{i}" for i in range(1, len(crawler_configs) + 1)]
+        self.crawlers = {crawler_id: CrawlerAgent(config, cache_manager)
+                         for crawler_id, config in zip(crawler_ids, crawler_configs)}
+        
+        self.nodes: Dict[str, SourceNode] = {}
+        for crawler_id, crawler in self.crawlers.items():
+            for source_config in crawler.data_sources:
+                node = SourceNode(crawler_id, source_config)
+                self.nodes[node.id] = node
+        
+        self._link()
+        self.order = self._topological_order()
+    
+    def _link(self):
+        """Resolve each node's upstream reference and derived value providers."""
+        by_name = {node.name: node.id for node in self.nodes.values()}
+        providers: Dict[str, List[str]] = {}
+        for node in self.nodes.values():
+            for field in node.config.get("output_fields", []):
+                providers.setdefault(field, []).append(node.id)
+        
+        for node in self.nodes.values():
+            if node.upstream:
+                upstream = node.upstream if node.upstream in self.nodes else by_name.get(node.upstream)
+                if upstream is None:
+                    raise ValueError(f"{node.id}: unknown source '{node.upstream}'")
+                node.upstream = upstream
+                node.deps.add(upstream)
+            
+            for name in node.derived:
+                if computed_value(name, date.today()) is not None:
+                    continue
+                
+                candidates = [p for p in providers.get(name, []) if p != node.id]
+                if not candidates:
+                    logger.warning(f"{node.id}: no source provides derived.{name}")
+                    continue
+                
+                # Prefer a provider that needs no derived values itself
+                provider = min(candidates, key=lambda p: bool(self.nodes[p].derived))
+                node.providers[name] = provider
+                node.deps.add(provider)
+    
+    def _topological_order(self) -> List[str]:
+        """Node ids, dependencies first (instruction order otherwise)."""
+        remaining = {node_id: set(node.deps) for node_id, node in self.nodes.items()}
+        order = []
+        while remaining:
+            ready = [node_id for node_id, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle among sources: {', '.join(remaining)}")
+            for node_id in ready:
+                del remaining[node_id]
+                order.append(node_id)
+            for deps in remaining.values():
+                deps.difference_update(ready)
+        return order
+    
+    def dependencies(self) -> Dict[str, List[str]]:
+        """Each source's direct dependencies."""
+        return {node_id: sorted(node.deps) for node_id, node in self.nodes.items()}
+    
+    def critical_path(self) -> List[str]:
+        """Longest dependency chain, first source first."""
+        longest: Dict[str, List[str]] = {}
+        for node_id in self.order:
+            chains = [longest[dep] for dep in self.nodes[node_id].deps]
+            longest[node_id] = max(chains, key=len, default=[]) + [node_id]
+        return max(longest.values(), key=len, default=[])
+    
+    async def run(self, user_input: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Fetch every source, each as soon as its dependencies finish.
+        
+        Args:
+            user_input: User input parameters
+        
+        Returns:
+            One result per crawler, shaped like CrawlerAgent.execute()'s
+        
+        Raises:
+            SourceFetchError: A fail_request source could not be fetched
+        """
+        logger.info(f"Scheduling {len(self.nodes)} sources, critical path: "
+                    f"{' -> '.join(self.critical_path())}")
+        
+        today = date.today()
+        slots = {crawler_id: asyncio.Semaphore(crawler.max_concurrency)
+                 for crawler_id, crawler in self.crawlers.items()}
+        tasks: Dict[str, asyncio.Task] = {}
+        
+        async def run_node(node: SourceNode) -> Dict[str, Any]:
+            if node.deps:
+                await asyncio.wait([tasks[dep] for dep in node.deps])
+            crawler = self.crawlers[node.crawler_id]
+            
+            derived = {}
+            for name in node.derived:
+                value = computed_value(name, today)
+                if value is None and name in node.providers:
+                    value = find_field(self._data(tasks[node.providers[name]]), name)
+                if value is not None:
+                    derived[name] = value
+            
+            missing = [name for name in node.derived if name not in derived]
+            if missing:
+                return crawler._fallback(node.config, None,
+                                         f"No value for derived {', '.join(missing)}")
+            
+            context = {**user_input, CrawlerAgent.DERIVED_KEY: derived}
+            if node.upstream:
+                upstream = tasks[node.upstream]
+                context[CrawlerAgent.UPSTREAM_KEY] = {
+                    node.upstream: upstream.result() if self._succeeded(upstream) else None
+                }
+            return await crawler.afetch(node.config, context, slots[node.crawler_id])
+        
+        for node_id in self.order:
+            tasks[node_id] = asyncio.ensure_future(run_node(self.nodes[node_id]))
+        
+        # A fail_request source fails the request: stop waiting for the rest
+        pending = set(tasks.values())
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_EXCEPTION)
+            if any(not t.cancelled() and isinstance(t.exception(), SourceFetchError) for t in done):
+                for task in pending:
+                    task.cancel()
+                if pending:
+                    await asyncio.wait(pending)
+                break
+        
+        outcomes = {node_id: self._outcome(task) for node_id, task in tasks.items()}
+        return [crawler._collect([outcomes[f"{crawler_id}.{source_config.get('name')}"]
+                                  for source_config in crawler.data_sources])
+                for crawler_id, crawler in self.crawlers.items()]
+    
+    @staticmethod
+    def _succeeded(task: asyncio.Task) -> bool:
+        return not task.cancelled() and task.exception() is None
+    
+    def _data(self, task: asyncio.Task) -> Any:
+        """Payload of a successful source, for derived value lookups."""
+        if not self._succeeded(task):
+            return None
+        result = task.result()
+        if not isinstance(result, dict) or result.get("status") != "success":
+            return None
+        return result.get("data")
+    
+    @staticmethod
+    def _outcome(task: asyncio.Task) -> Any:
+        """Result or exception, as CrawlerAgent._collect expects."""
+        if task.cancelled():
+            return asyncio.CancelledError("Request failed before this source finished")
+        return task.exception() or task.result()
@@ -0,0 +1,468 @@
+"""
+NumPy evaluator for CatBoost oblivious-tree models exported as JSON.
+"""
+
+import json
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+
+# CatBoost hashing constants
+CTR_HASH_MULT = np.uint64(0x4906ba494954cb65)
+EMPTY_BUCKET = 0xFFFFFFFFFFFFFFFF
+UNKNOWN_CAT_HASH = 0x7FFFFFFF
+
+# Split kinds, in CatBoost's split_index order
+FLOAT_SPLIT, ONE_HOT_SPLIT, CTR_SPLIT = 0, 1, 2
+
+_PROJECTION_ORDER = {"cat_feature_value": 0, "float_feature": 1, "cat_feature_exact_value": 2}
+
+
+def _signed32(value: int) -> int:
+    """Reinterpret an unsigned 32-bit categorical hash as signed."""
+    value = int(value) & 0xFFFFFFFF
+    return value - (1 << 32) if value >= 1 << 31 else value
+
+
+def _combine(acc: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """CatBoost CalcHash(a, b) on uint64 arrays (array ops wrap silently)."""
+    return CTR_HASH_MULT * (acc + CTR_HASH_MULT * values)
+
+
+def export_catboost_json(model, path: str, pool):
+    """
+    Export a CatBoost model to JSON.
+    
+    CatBoost only writes string -> hash entries for categorical values present in
+    the pool, so pass the training pool (or one covering every known category).
+    Values outside it are scored as unseen categories.
+    
+    Args:
+        model: Trained CatBoostRegressor
+        path: Output .json path
+        pool: catboost.Pool with the model's categorical features
+    """
+    model.save_model(path, format="json", pool=pool)
+
+
+def compile_tree_model(json_path: str, out_dir: str, feature_names: List[str], model_version: str):
+    """
+    Flatten a CatBoost JSON export into memory-mappable arrays.
+    
+    Layout mirrors the feature store: a directory of .npy arrays plus meta.json.
+        split_kind/feature/border.npy   one entry per binary split (split_index)
+        tree_splits.npy                 int32 (trees, max_depth), padded with the
+                                        index of an always-false split
+        leaf_offsets.npy, leaf_values.npy
+        ctr_keys/hashes/counts.npy      all CTR tables merged into one sorted
+                                        lookup (see _save_ctr_tables)
+    
+    Args:
+        json_path: Output of export_catboost_json
+        out_dir: Output directory
+        feature_names: Model feature order (as in the model metadata)
+        model_version: Model these arrays were compiled from
+    """
+    with open(json_path, 'r') as f:
+        model = json.load(f)
+    
+    info = model["features_info"]
+    float_features = info.get("float_features", [])
+    cat_features = info.get("categorical_features", [])
+    ctrs = info.get("ctrs", [])
+    
+    # Enumerate binary splits the way CatBoost numbers them
+    kinds, features, borders = [], [], []
+    for feature in float_features:
+        for border in feature["borders"]:
+            kinds.append(FLOAT_SPLIT)
+            features.append(feature["feature_index"])
+            borders.append(border)
+    for feature in cat_features:
+        for value in feature.get("values", []):
+            kinds.append(ONE_HOT_SPLIT)
+            features.append(feature["feature_index"])
+            borders.append(value)
+    for i, ctr in enumerate(ctrs):
+        for border in ctr["borders"]:
+            kinds.append(CTR_SPLIT)
+            features.append(i)
+            borders.append(border)
+    
+    # Trailing always-false split used to pad shallow trees
+    never = len(kinds)
+    kinds.append(FLOAT_SPLIT)
+    features.append(-1)
+    borders.append(np.inf)
+    
+    trees = model["oblivious_trees"]
+    max_depth = max((len(t.get("splits") or []) for t in trees), default=0)
+    tree_splits = np.full((len(trees), max_depth), never, dtype=np.int32)
+    leaf_offsets = np.empty(len(trees), dtype=np.int64)
+    leaf_values = []
+    
+    for t, tree in enumerate(trees):
+        for d, split in enumerate(tree.get("splits") or []):
+            index = split["split_index"]
+            _check_split(split, kinds[index], features[index], borders[index])
+            tree_splits[t, d] = index
+        leaf_offsets[t] = len(leaf_values)
+        leaf_values.extend(tree["leaf_values"])
+    
+    out = Path(out_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    
+    np.save(out / "split_kind.npy", np.array(kinds, dtype=np.int8))
+    np.save(out / "split_feature.npy", np.array(features, dtype=np.int32))
+    np.save(out / "split_border.npy", np.array(borders, dtype=np.float64))
+    np.save(out / "tree_splits.npy", tree_splits)
+    np.save(out / "leaf_offsets.npy", leaf_offsets)
+    np.save(out / "leaf_values.npy", np.array(leaf_values, dtype=np.float64))
+    
+    # CTR tables, deduplicated (several CTRs share one table and projection)
+    tables = {}
+    projections, table_keys, table_counts = [], [], []
+    ctr_meta = []
+    for ctr in ctrs:
+        table_key = json.dumps(ctr["identifier"], sort_keys=True)
+        if table_key not in tables:
+            tables[table_key] = len(tables)
+            data = model["ctr_data"][ctr["identifier"]]
+            stride = data["hash_stride"]
+            hash_map = data["hash_map"]
+            
+            keys = np.array([int(h) for h in hash_map[::stride]], dtype=np.uint64)
+            counts = np.array(
+                [hash_map[i + 1:i + stride] for i in range(0, len(hash_map), stride)],
+                dtype=np.float64
+            ).reshape(len(keys), stride - 1)
+            
+            keep = keys != np.uint64(EMPTY_BUCKET)
+            table_keys.append(keys[keep])
+            table_counts.append(counts[keep])
+            projections.append(
+                sorted(ctr["elements"], key=lambda e: _PROJECTION_ORDER[e["combination_element"]])
+            )
+        
+        data = model["ctr_data"][ctr["identifier"]]
+        ctr_meta.append({
+            "table": tables[table_key],
+            "type": ctr["ctr_type"],
+            "target_border_idx": ctr.get("target_border_idx", 0),
+            "prior_numerator": ctr["prior_numerator"],
+            "prior_denominator": ctr["prior_denomerator"],
+            "shift": ctr["shift"],
+            "scale": ctr["scale"],
+            "counter_denominator": data.get("counter_denominator", 0)
+        })
+    
+    _save_ctr_tables(out, table_keys, table_counts)
+    
+    scale, bias = model.get("scale_and_bias", [1.0, [0.0]])
+    
+    with open(out / "meta.json", 'w') as f:
+        json.dump({
+            "format_version": FORMAT_VERSION,
+            "model_version": model_version,
+            "built_at": datetime.now().isoformat(),
+            "feature_names": list(feature_names),
+            "float_features": [
+                {"index": ff["flat_feature_index"], "nan": ff.get("nan_value_treatment", "AsIs")}
+                for ff in float_features
+            ],
+            "cat_features": [cf["flat_feature_index"] for cf in cat_features],
+            "cat_hashes": {e["value"]: _signed32(e["hash"]) for e in info.get("cat_features_hash", [])},
+            "projections": projections,
+            "ctrs": ctr_meta,
+            "scale": scale,
+            "bias": bias[0] if isinstance(bias, list) else bias
+        }, f)
+    
+    logger.info(f"Compiled {len(trees):,} trees, {len(kinds) - 1:,} splits, {len(tables)} CTR tables to {out_dir}")
+
+
+def _mapped(path: Path) -> np.ndarray:
+    """Memory-map a .npy as a plain ndarray view (np.memmap indexing is slower)."""
+    return np.asarray(np.load(path, mmap_mode="r"))
+
+
+def _save_ctr_tables(out: Path, table_keys: List[np.ndarray], table_counts: List[np.ndarray]):
+    """
+    Merge all CTR tables into one sorted lookup array.
+    
+    The low bits of each hash are replaced by the table number so one
+    searchsorted serves every table; the full hash is kept alongside and
+    checked on lookup.
+    """
+    table_bits = np.uint64(max(1, int(np.ceil(np.log2(max(len(table_keys), 2))))))
+    low_mask = (np.uint64(1) << table_bits) - np.uint64(1)
+    width = max((c.shape[1] for c in table_counts), default=1)
+    
+    composite = [(k & ~low_mask) | np.uint64(t) for t, k in enumerate(table_keys)]
+    padded = [np.pad(c, ((0, 0), (0, width - c.shape[1]))) for c in table_counts]
+    
+    composite = np.concatenate(composite) if composite else np.empty(0, dtype=np.uint64)
+    hashes = np.concatenate(table_keys) if table_keys else np.empty(0, dtype=np.uint64)
+    counts = np.concatenate(padded) if padded else np.empty((0, width))
+    
+    order = np.argsort(composite, kind="stable")
+    composite, hashes, counts = composite[order], hashes[order], counts[order]
+    if np.any(composite[1:] == composite[:-1]):
+        raise ValueError("CTR hash collision after table tagging; cannot compile model")
+    
+    np.save(out / "ctr_keys.npy", composite)
+    np.save(out / "ctr_hashes.npy", hashes)
+    np.save(out / "ctr_counts.npy", counts)
+
+
+def _check_split(split: Dict, kind: int, feature: int, border: float):
+    """Make sure a tree split agrees with our split_index enumeration."""
+    split_type = split["split_type"]
+    if split_type == "FloatFeature":
+        ok = kind == FLOAT_SPLIT and feature == split["float_feature_index"] and border == split["border"]
+    elif split_type == "OneHotFeature":
+        ok = kind == ONE_HOT_SPLIT and feature == split["cat_feature_index"] and border == split["value"]
+    elif split_type == "OnlineCtr":
+        ok = kind == CTR_SPLIT and border == split["border"]
+    else:
+        raise ValueError(f"Unsupported split type {split_type}")
+    
+    if not ok:
+        raise ValueError(f"Split {split['split_index']} does not match the exported features")
+
+
+class ObliviousTreeModel:
+    """
+    Vectorized CatBoost scoring without pandas or the CatBoost runtime.
+    
+    Every binary split is evaluated once per row (float borders, one-hot values,
+    CTR borders), giving a boolean matrix in split_index order; each tree's leaf
+    index is then a dot product of its split bits with powers of two. Arrays
+    are memory-mapped, so worker processes share one copy via the page cache.
+    """
+    
+    def __init__(self, path: str):
+        """
+        Load arrays written by compile_tree_model.
+        
+        Args:
+            path: Compiled model directory
+        """
+        root = Path(path)
+        with open(root / "meta.json", 'r') as f:
+            self.meta = json.load(f)
+        
+        if self.meta["format_version"] != FORMAT_VERSION:
+            raise ValueError(f"Unsupported tree model format {self.meta['format_version']} in {path}")
+        
+        self.model_version = self.meta["model_version"]
+        self.feature_names = self.meta["feature_names"]
+        self.scale = float(self.meta["scale"])
+        self.bias = float(self.meta["bias"])
+        self.cat_hashes = self.meta["cat_hashes"]
+        
+        kind = np.load(root / "split_kind.npy")
+        feature = np.load(root / "split_feature.npy")
+        border = np.load(root / "split_border.npy")
+        self.tree_splits = _mapped(root / "tree_splits.npy")
+        self.leaf_offsets = _mapped(root / "leaf_offsets.npy")
+        self.leaf_values = _mapped(root / "leaf_values.npy")
+        self.ctr_keys = _mapped(root / "ctr_keys.npy")
+        self.ctr_hashes = _mapped(root / "ctr_hashes.npy")
+        self.ctr_counts = _mapped(root / "ctr_counts.npy")
+        
+        # Splits are stored float, one-hot, CTR, then the padding split
+        floats = np.flatnonzero(kind == FLOAT_SPLIT)[:-1]
+        one_hot = np.flatnonzero(kind == ONE_HOT_SPLIT)
+        ctr = np.flatnonzero(kind == CTR_SPLIT)
+        self._float_cols = feature[floats]
+        self._float_borders = border[floats].astype(np.float32)
+        self._one_hot_cols = feature[one_hot]
+        self._one_hot_values = border[one_hot].astype(np.int64)
+        self._ctr_cols = feature[ctr]
+        self._ctr_borders = border[ctr].astype(np.float32)
+        
+        self._float_index = [self.feature_names[f["index"]] for f in self.meta["float_features"]]
+        self._cat_index = [self.feature_names[i] for i in self.meta["cat_features"]]
+        self._nan_fill = np.array([
+            {"Min": -np.inf, "Max": np.inf}.get(f["nan"], np.nan) for f in self.meta["float_features"]
+        ], dtype=np.float32)
+        self._powers = np.left_shift(1, np.arange(self.tree_splits.shape[1], dtype=np.int64))
+        
+        self._prepare_ctrs()
+        
+        logger.info(f"Loaded {len(self.leaf_offsets):,} oblivious trees ({self.model_version})")
+    
+    def _prepare_ctrs(self):
+        """Turn CTR projections and formulas into per-slot index arrays."""
+        projections = self.meta.get("projections", [])
+        ctrs = self.meta["ctrs"]
+        
+        n_tables = len(projections)
+        table_bits = np.uint64(max(1, int(np.ceil(np.log2(max(n_tables, 2))))))
+        self._low_mask = (np.uint64(1) << table_bits) - np.uint64(1)
+        self._table_ids = np.arange(n_tables, dtype=np.uint64)
+        
+        # Projection slot j of every table, grouped by element kind
+        self._slots = []
+        for j in range(max((len(p) for p in projections), default=0)):
+            slot = {"valid": np.array([j < len(p) for p in projections])}
+            for name in _PROJECTION_ORDER:
+                tables = [t for t, p in enumerate(projections)
+                          if j < len(p) and p[j]["combination_element"] == name]
+                elements = [projections[t][j] for t in tables]
+                cols = [e.get("cat_feature_index", e.get("float_feature_index")) for e in elements]
+                extra = [e.get("border", e.get("value", 0)) for e in elements]
+                slot[name] = (
+                    np.array(tables, dtype=np.int64),
+                    np.array(cols, dtype=np.int64),
+                    np.array(extra, dtype=np.float32 if name == "float_feature" else np.int64)
+                )
+            self._slots.append(slot)
+        
+        # calc(good, total) with good/total as weighted sums over the count columns
+        width = self.ctr_counts.shape[1] if self.ctr_counts.ndim == 2 else 1
+        self._ctr_table = np.array([c["table"] for c in ctrs], dtype=np.int64)
+        self._good_weights = np.zeros((len(ctrs), width))
+        self._total_weights = np.zeros((len(ctrs), width))
+        self._total_const = np.zeros(len(ctrs))
+        
+        for i, c in enumerate(ctrs):
+            border_idx = c["target_border_idx"]
+            if c["type"] in ("Counter", "FeatureFreq"):
+                self._good_weights[i, 0] = 1
+                self._total_const[i] = c["counter_denominator"]
+            elif c["type"] in ("BinarizedTargetMeanValue", "FloatTargetMeanValue"):
+                self._good_weights[i, 0] = 1
+                self._total_weights[i, 1] = 1
+            elif c["type"] == "Buckets":
+                self._good_weights[i, border_idx] = 1
+                self._total_weights[i] = 1
+            else:
+                # Borders: share of targets above the border
+                self._good_weights[i, border_idx + 1:] = 1
+                self._total_weights[i] = 1
+        
+        self._prior_num = np.array([c["prior_numerator"] for c in ctrs])
+        self._prior_denom = np.array([c["prior_denominator"] for c in ctrs])
+        self._ctr_shift = np.array([c["shift"] for c in ctrs])
+        self._ctr_scale = np.array([c["scale"] for c in ctrs])
+    
+    def encode(self, features_list: List[Dict]):
+        """
+        Convert feature dicts to CatBoost's float and categorical-hash layout.
+        
+        Categories missing from the export's vocabulary score as unseen values.
+        
+        Returns:
+            (floats, cat_hashes) arrays for predict_arrays
+        """
+        floats = np.array(
+            [[row.get(name, np.nan) for name in self._float_index] for row in features_list],
+            dtype=np.float32
+        ).reshape(len(features_list), len(self._float_index))
+        
+        hashes = self.cat_hashes
+        cats = np.array(
+            [[hashes.get(str(row.get(name)), UNKNOWN_CAT_HASH) for name in self._cat_index]
+             for row in features_list],
+            dtype=np.int64
+        ).reshape(len(features_list), len(self._cat_index))
+        
+        return floats, cats
+    
+    def predict(self, features_list: List[Dict]) -> np.ndarray:
+        """
+        Score feature dicts.
+        
+        Args:
+            features_list: One feature dict per row, keyed by model feature name
+        
+        Returns:
+            float64 array of predictions
+        """
+        return self.predict_arrays(*self.encode(features_list))
+    
+    def predict_arrays(self, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        """
+        Score pre-encoded rows.
+        
+        Args:
+            floats: (rows, float features) in CatBoost float feature order
+            cat_hashes: (rows, cat features) signed 32-bit CatBoost hashes
+        
+        Returns:
+            float64 array of predictions
+        """
+        nan = np.isnan(floats)
+        if nan.any():
+            floats = np.where(nan, self._nan_fill, floats)
+        
+        parts = [
+            floats[:, self._float_cols] > self._float_borders,
+            cat_hashes[:, self._one_hot_cols] == self._one_hot_values
+        ]
+        if len(self._ctr_cols):
+            parts.append(self._ctr_values(floats, cat_hashes)[:, self._ctr_cols] > self._ctr_borders)
+        parts.append(np.zeros((len(floats), 1), dtype=bool))
+        bits = np.concatenate(parts, axis=1)
+        
+        leaf_index = bits[:, self.tree_splits] @ self._powers
+        raw = self.leaf_values[leaf_index + self.leaf_offsets].sum(axis=1)
+        
+        return self.scale * raw + self.bias
+    
+    def _ctr_values(self, floats: np.ndarray, cat_hashes: np.ndarray) -> np.ndarray:
+        """Compute every CTR feature from its projection hash and counter table."""
+        rows = len(floats)
+        cats64 = cat_hashes.astype(np.int64).view(np.uint64)
+        
+        acc = np.zeros((rows, len(self._table_ids)), dtype=np.uint64)
+        for slot in self._slots:
+            values = np.zeros_like(acc)
+            
+            tables, cols, _ = slot["cat_feature_value"]
+            if len(tables):
+                values[:, tables] = cats64[:, cols]
+            tables, cols, borders = slot["float_feature"]
+            if len(tables):
+                values[:, tables] = floats[:, cols] > borders
+            tables, cols, exact = slot["cat_feature_exact_value"]
+            if len(tables):
+                values[:, tables] = cat_hashes[:, cols] == exact
+            
+            acc = np.where(slot["valid"], _combine(acc, values), acc)
+        
+        # One searchsorted across all tables; see _save_ctr_tables
+        composite = (acc & ~self._low_mask) | self._table_ids
+        found = np.zeros(acc.shape, dtype=bool)
+        pos = np.zeros(acc.shape, dtype=np.int64)
+        if len(self.ctr_keys):
+            pos = np.minimum(np.searchsorted(self.ctr_keys, composite), len(self.ctr_keys) - 1)
+            found = (self.ctr_keys[pos] == composite) & (self.ctr_hashes[pos] == acc)
+        
+        counts = self.ctr_counts[pos[:, self._ctr_table]] if len(self.ctr_keys) else \
+            np.zeros((rows, len(self._ctr_table), self._good_weights.shape[1]))
+        found = found[:, self._ctr_table]
+        
+        # Unseen projections score as calc(0, 0), i.e. the prior
+        good = np.einsum("rcw,cw->rc", counts, self._good_weights) * found
+        total = (np.einsum("rcw,cw->rc", counts, self._total_weights) + self._total_const) * found
+        
+        ctr = (good + self._prior_num) / (total + self._prior_denom)
+        return ((ctr + self._ctr_shift) * self._ctr_scale).astype(np.float32)
+
+
+def load_tree_model(path: str) -> Optional[ObliviousTreeModel]:
+    """Load a compiled tree model if it exists, else None."""
+    if not (Path(path) / "meta.json").exists():
+        logger.warning(f"No compiled tree model at {path}")
+        return None
+    return ObliviousTreeModel(path)
@@ -0,0 +1,112 @@
+"""
+Dynamic micro-batching for single-item model calls.
+"""
+
+import asyncio
+import logging
+from typing import Any, Callable, List, Optional, Tuple
+from concurrent.futures import Executor
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item requests into one batched call.
+    
+    Requests are collected until either max_batch_size items are waiting or
+    max_wait_ms has passed since the first one arrived. The batch function then
+    runs once (in an executor, off the event loop) and each waiting coroutine
+    receives its own result.
+    """
+    
+    def __init__(self, batch_fn: Callable[[List[Any]], List[Any]],
+                 max_batch_size: int = 64, max_wait_ms: float = 3.0,
+                 executor: Optional[Executor] = None):
+        """
+        Initialize micro-batcher.
+        
+        Args:
+            batch_fn: Maps a list of items to a list of results (same order)
+            max_batch_size: Flush as soon as this many items are waiting
+            max_wait_ms: Maximum time the first item waits for company
+            executor: Executor for batch_fn (default loop executor if None)
+        """
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.executor = executor
+        
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        
+        self.batches_run = 0
+        self.items_run = 0
+    
+    async def submit(self, item: Any) -> Any:
+        """
+        Queue one item and wait for its result.
+        
+        Args:
+            item: Single input for batch_fn
+        
+        Returns:
+            The result batch_fn produced for this item
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Hand everything pending to a batch task."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        
+        if not self._pending:
+            return
+        
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run batch_fn once and fan results back to the waiters."""
+        items = [item for item, _ in batch]
+        loop = asyncio.get_running_loop()
+        
+        try:
+            results = await loop.run_in_executor(self.executor, self.batch_fn, items)
+            if len(results) != len(items):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(items)} items")
+        except Exception as e:
+            logger.error(f"Batch of {len(items)} failed: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self.batches_run += 1
+        self.items_run += len(items)
+        
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+    
+    def stats(self) -> dict:
+        """Batching counters."""
+        return {
+            "batches": self.batches_run,
+            "items": self.items_run,
+            "avg_batch_size": self.items_run / self.batches_run if self.batches_run else 0.0,
+            "pending": len(self._pending)
+        }
@@ -18,8 +18,8 @@ class ChatManager:
         self.conversations[conv_id] = []
         return conv_id
     
-    def add_message(self, conv_id: str, role: str, content: str, metadata: Dict = None):
-        """Add message to conversation."""
+    def add_message(self, conv_id: str, role: str, content: str, metadata: Dict = None) -> int:
+        """Add message to conversation and return its index."""
         if conv_id not in self.conversations:
             self.conversations[conv_id] = []
         
@@ -29,6 +29,14 @@ class ChatManager:
             "metadata": metadata or {},
             "timestamp": datetime.now().isoformat()
         })
+        
+        return len(self.conversations[conv_id]) - 1
+    
+    def update_message(self, conv_id: str, index: int, content: str):
+        """Replace the content of an earlier message (e.g. a streamed explanation)."""
+        conv = self.conversations.get(conv_id)
+        if conv and 0 <= index < len(conv):
+            conv[index]["content"] = content
     
     def get_conversation(self, conv_id: str) -> List[Dict]:
         """Get full conversation history."""
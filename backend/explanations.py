@@ -0,0 +1,146 @@
+"""
+Background LLM explanations delivered as token streams.
+"""
+
+import asyncio
+import time
+import uuid
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Dict, List, Optional
+
+from agents.ml_execution_agent import MLExecutionAgent
+
+logger = logging.getLogger(__name__)
+
+
+class ExplanationJob:
+    """
+    One explanation being generated in the background.
+    
+    Tokens are buffered so a client that connects late still receives the
+    whole text, and any number of clients can follow the same job.
+    """
+    
+    def __init__(self, job_id: str):
+        self.id = job_id
+        self.tokens: List[str] = []
+        self.done = False
+        self.created_at = time.time()
+        self._waiters: List[asyncio.Future] = []
+    
+    @property
+    def text(self) -> str:
+        """Explanation generated so far."""
+        return "".join(self.tokens).strip()
+    
+    def push(self, token: str):
+        """Append a token (event loop thread only)."""
+        self.tokens.append(token)
+        self._wake()
+    
+    def finish(self):
+        """Mark generation complete (event loop thread only)."""
+        self.done = True
+        self._wake()
+    
+    def _wake(self):
+        waiters, self._waiters = self._waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+    
+    async def follow(self) -> AsyncIterator[str]:
+        """Yield buffered tokens, then new ones as they arrive, until done."""
+        sent = 0
+        while True:
+            while sent < len(self.tokens):
+                yield self.tokens[sent]
+                sent += 1
+            
+            if self.done:
+                return
+            
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            await waiter
+
+
+class ExplanationStore:
+    """Starts explanation jobs and keeps recent ones for streaming clients."""
+    
+    def __init__(self, agent: Optional[MLExecutionAgent] = None, max_jobs: int = 1000,
+                 ttl_seconds: int = 600):
+        """
+        Initialize explanation store.
+        
+        Args:
+            agent: Default ML agent used to stream explanations
+            max_jobs: Oldest jobs are dropped beyond this many
+            ttl_seconds: Jobs older than this are dropped
+        """
+        self.agent = agent
+        self.max_jobs = max_jobs
+        self.ttl_seconds = ttl_seconds
+        self.jobs: "OrderedDict[str, ExplanationJob]" = OrderedDict()
+        self._tasks: set = set()
+    
+    def start(self, features: Dict, result: Dict,
+              on_done: Optional[Callable[[str], None]] = None,
+              agent: Optional[MLExecutionAgent] = None) -> str:
+        """
+        Start generating an explanation in the background.
+        
+        Must be called from the event loop.
+        
+        Args:
+            features: Model features of the prediction
+            result: Prediction result from MLExecutionAgent
+            on_done: Called with the final text once generation finishes
+            agent: Agent that produced the prediction (defaults to the store's)
+        
+        Returns:
+            Job ID to stream from
+        """
+        self._evict()
+        
+        job = ExplanationJob(str(uuid.uuid4()))
+        self.jobs[job.id] = job
+        
+        task = asyncio.get_running_loop().create_task(
+            self._produce(job, agent or self.agent, features, result, on_done)
+        )
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        
+        return job.id
+    
+    def get(self, job_id: str) -> Optional[ExplanationJob]:
+        """Look up a job by ID."""
+        return self.jobs.get(job_id)
+    
+    async def _produce(self, job: ExplanationJob, agent: MLExecutionAgent,
+                       features: Dict, result: Dict,
+                       on_done: Optional[Callable[[str], None]]):
+        """Forward tokens from the agent's async LLM stream into the job."""
+        try:
+            async for token in agent.astream_explanation(features, result):
+                job.push(token)
+        except Exception as e:
+            logger.error(f"Explanation {job.id} failed: {e}")
+            if not job.tokens:
+                job.push(agent.template_explanation(features, result))
+        finally:
+            job.finish()
+        
+        if on_done:
+            on_done(job.text)
+    
+    def _evict(self):
+        """Drop expired jobs and enforce max_jobs."""
+        cutoff = time.time() - self.ttl_seconds
+        while self.jobs:
+            oldest = next(iter(self.jobs.values()))
+            if oldest.created_at >= cutoff and len(self.jobs) < self.max_jobs:
+                break
+            self.jobs.popitem(last=False)
@@ -2,8 +2,11 @@
 FastAPI application entry point.
 """
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+import asyncio
 import logging
 
 # Configure logging
@@ -14,11 +17,35 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+
+async def _warm_up_service():
+    """Load the model off the event loop so the server binds immediately."""
+    from backend.prediction_service import prediction_service
+    try:
+        await asyncio.to_thread(prediction_service.warm_up)
+    except Exception as e:
+        logger.error(f"Prediction service warm-up failed: {e}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start model warm-up in the background; release pooled clients on shutdown."""
+    warm_up = asyncio.create_task(_warm_up_service())
+    yield
+    warm_up.cancel()
+    
+    from backend.prediction_service import prediction_service
+    from utils.api_client import AsyncAPIClient
+    await prediction_service.aclose()
+    await AsyncAPIClient.aclose_shared()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="KALMAN API",
     description="Knowledge Agents for Launch, Market & Asset Navigation",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -40,7 +67,9 @@ async def root():
         "status": "operational",
         "endpoints": {
             "health": "/health",
-            "predict": "/api/predict"
+            "ready": "/ready",
+            "predict": "/api/predict",
+            "predict_batch": "/api/predict/batch"
         }
     }
 
@@ -59,6 +88,14 @@ async def health_check():
     }
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the model is loaded and warmed, 503 until then."""
+    from backend.prediction_service import prediction_service
+    readiness = prediction_service.readiness()
+    return JSONResponse(readiness, status_code=200 if prediction_service.ready else 503)
+
+
 # Import routes
 from backend.routes import router as api_router
 app.include_router(api_router, prefix="/api")
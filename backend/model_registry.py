@@ -0,0 +1,454 @@
+"""
+Registry of house model versions with hot swapping, traffic splits and shadow scoring.
+"""
+
+import logging
+import random
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from agents.ml_execution_agent import MLExecutionAgent
+from agents.explanation_cache import ExplanationCache
+from agents.feature_store import load_feature_store
+from backend.batching import MicroBatcher
+from utils.llm_gateway import LLMGateway
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyStats:
+    """Rolling latency window plus lifetime counters for one model version."""
+    
+    def __init__(self, window: int = 2048):
+        """
+        Initialize latency stats.
+        
+        Args:
+            window: Number of recent calls kept for percentiles
+        """
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+        
+        self.calls = 0
+        self.items = 0
+        self.errors = 0
+    
+    def record(self, seconds: float, items: int = 1, error: bool = False):
+        """Record one model call."""
+        with self._lock:
+            self.calls += 1
+            self.items += items
+            if error:
+                self.errors += 1
+            else:
+                self._latencies.append(seconds)
+    
+    def summary(self) -> dict:
+        """Counters plus mean/p50/p95/p99 latency in milliseconds."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            summary = {"calls": self.calls, "items": self.items, "errors": self.errors}
+        
+        if len(latencies):
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            summary.update({
+                "mean_ms": float(latencies.mean()),
+                "p50_ms": float(p50),
+                "p95_ms": float(p95),
+                "p99_ms": float(p99)
+            })
+        return summary
+
+
+class ModelVersion:
+    """One loaded model version and everything needed to serve it."""
+    
+    def __init__(self, version: str, path: str, agent: MLExecutionAgent, feature_store,
+                 max_batch_size: int = 64, batch_window_ms: float = 3.0,
+                 executor: Optional[Executor] = None):
+        """
+        Initialize a served model version.
+        
+        Args:
+            version: Version name (model file stem)
+            path: Path to the .cbm file
+            agent: Agent with the model already loaded
+            feature_store: FeatureStore for this version, or None
+            max_batch_size: Micro-batch size for single requests
+            batch_window_ms: Micro-batch window for single requests
+            executor: Executor the batched model calls run in
+        """
+        self.version = version
+        self.path = path
+        self.agent = agent
+        self.feature_store = feature_store
+        self.batcher = MicroBatcher(agent.predict_batch, max_batch_size=max_batch_size,
+                                    max_wait_ms=batch_window_ms, executor=executor)
+        self.loaded_at = datetime.now().isoformat()
+        
+        self.latency = LatencyStats()
+        self.shadow_latency = LatencyStats()
+        self.shadow_diffs = deque(maxlen=2048)
+    
+    def stats(self) -> dict:
+        """Latency, batching and shadow comparison stats."""
+        stats = {
+            "loaded_at": self.loaded_at,
+            "latency": self.latency.summary(),
+            "batching": self.batcher.stats()
+        }
+        
+        if self.shadow_latency.calls:
+            diffs = np.array(self.shadow_diffs)
+            stats["shadow"] = {
+                "latency": self.shadow_latency.summary(),
+                "mean_abs_diff_pct": float(diffs.mean()) if len(diffs) else None,
+                "p95_abs_diff_pct": float(np.percentile(diffs, 95)) if len(diffs) else None
+            }
+        return stats
+
+
+class ModelRegistry:
+    """
+    Discovers, loads and routes between house model versions.
+    
+    Versions are models/<version>.cbm files with a <version>_metadata.json next
+    to them. Loading happens off the request path; activation is a single
+    reference swap, so requests already holding the previous version finish
+    on it. A traffic split, when set, takes precedence over the active version
+    for routing, and an optional shadow version re-scores live traffic in the
+    background for comparison without affecting responses.
+    """
+    
+    def __init__(self, models_dir: str = "models", engine: str = "catboost",
+                 serving_mode: str = "model",
+                 explanation_cache: Optional[ExplanationCache] = None,
+                 max_batch_size: int = 64, batch_window_ms: float = 3.0,
+                 max_shadow_pending: int = 100,
+                 executor: Optional[Executor] = None,
+                 llm_gateway: Optional[LLMGateway] = None):
+        """
+        Initialize model registry.
+        
+        Args:
+            models_dir: Directory scanned for versions
+            engine: Inference engine for MLExecutionAgent ("catboost" or "numpy")
+            serving_mode: "model" or "grid" (use <version>_grid when present)
+            explanation_cache: Explanation cache shared by all versions
+            max_batch_size: Micro-batch size per version
+            batch_window_ms: Micro-batch window per version
+            max_shadow_pending: Shadow calls queued beyond this are skipped
+            executor: Bounded executor for model calls (loop default if None)
+            llm_gateway: LLM gateway shared by all versions
+        """
+        self.models_dir = Path(models_dir)
+        self.engine = engine
+        self.serving_mode = serving_mode
+        self.explanation_cache = explanation_cache or ExplanationCache()
+        self.max_batch_size = max_batch_size
+        self.batch_window_ms = batch_window_ms
+        self.max_shadow_pending = max_shadow_pending
+        self.executor = executor
+        self.llm_gateway = llm_gateway or LLMGateway()
+        
+        self.versions: Dict[str, ModelVersion] = {}
+        self.loading: Dict[str, threading.Thread] = {}
+        self.failed: Dict[str, str] = {}
+        
+        self._active: Optional[ModelVersion] = None
+        self._split: List[tuple] = []
+        self._shadow: Optional[ModelVersion] = None
+        self._lock = threading.Lock()
+        
+        self._shadow_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="shadow")
+        self._shadow_pending = 0
+        self.shadow_skipped = 0
+        
+        self._watcher: Optional[threading.Thread] = None
+        self._stop_watching = threading.Event()
+    
+    @property
+    def active(self) -> ModelVersion:
+        """Currently active version."""
+        if self._active is None:
+            raise RuntimeError("No model version is active")
+        return self._active
+    
+    def discover(self) -> Dict[str, str]:
+        """Model versions on disk, as {version: path to .cbm}."""
+        return {
+            path.stem: str(path)
+            for path in sorted(self.models_dir.glob("*.cbm"))
+            if (self.models_dir / f"{path.stem}_metadata.json").exists()
+        }
+    
+    def load(self, version: str) -> ModelVersion:
+        """
+        Load a version (blocking) and keep it ready for activation.
+        
+        Already-loaded versions are returned as is.
+        """
+        if version in self.versions:
+            return self.versions[version]
+        
+        path = self.discover().get(version)
+        if path is None:
+            raise ValueError(f"Unknown model version '{version}' in {self.models_dir}")
+        
+        start = time.perf_counter()
+        agent = MLExecutionAgent(path, explanation_cache=self.explanation_cache, engine=self.engine,
+                                 llm_gateway=self.llm_gateway)
+        agent.load_model()
+        
+        grid_path = self.models_dir / f"{version}_grid"
+        if self.serving_mode == "grid":
+            if Path(f"{grid_path}.npy").exists():
+                agent.load_grid(str(grid_path))
+            else:
+                logger.warning(f"{grid_path}.npy not found, serving {version} from the live model")
+        
+        model_version = ModelVersion(
+            version, path, agent,
+            load_feature_store(str(self.models_dir / f"{version}_features")),
+            max_batch_size=self.max_batch_size,
+            batch_window_ms=self.batch_window_ms,
+            executor=self.executor
+        )
+        
+        with self._lock:
+            self.versions[version] = model_version
+            self.failed.pop(version, None)
+        
+        logger.info(f"Loaded model {version} in {time.perf_counter() - start:.2f}s")
+        return model_version
+    
+    def load_in_background(self, version: str, activate: bool = False) -> threading.Thread:
+        """
+        Load a version on a background thread, optionally activating it once ready.
+        
+        Returns:
+            The loading thread (already started); an existing one if the
+            version is already loading
+        """
+        with self._lock:
+            thread = self.loading.get(version)
+            if thread is not None and thread.is_alive():
+                return thread
+            
+            def run():
+                try:
+                    self.load(version)
+                    if activate:
+                        self.activate(version)
+                except Exception as e:
+                    logger.error(f"Loading model {version} failed: {e}")
+                    self.failed[version] = str(e)
+                finally:
+                    self.loading.pop(version, None)
+            
+            thread = threading.Thread(target=run, name=f"load-{version}", daemon=True)
+            self.loading[version] = thread
+        
+        thread.start()
+        return thread
+    
+    def activate(self, version: str):
+        """Make a loaded version the default for new requests."""
+        model_version = self.versions.get(version)
+        if model_version is None:
+            raise ValueError(f"Model version '{version}' is not loaded")
+        
+        previous = self._active.version if self._active else None
+        self._active = model_version
+        logger.info(f"Active model: {previous} -> {version}")
+    
+    def set_routing(self, weights: Optional[Dict[str, float]] = None, shadow: Optional[str] = None):
+        """
+        Set the traffic split and shadow version.
+        
+        Args:
+            weights: {version: weight} over loaded versions; empty or None sends
+                everything to the active version
+            shadow: Loaded version to re-score traffic with in the background
+        """
+        weights = {v: float(w) for v, w in (weights or {}).items() if w > 0}
+        unknown = [v for v in list(weights) + ([shadow] if shadow else []) if v not in self.versions]
+        if unknown:
+            raise ValueError(f"Model versions not loaded: {', '.join(unknown)}")
+        
+        total = sum(weights.values())
+        split, cumulative = [], 0.0
+        for version in sorted(weights):
+            cumulative += weights[version] / total
+            split.append((cumulative, self.versions[version]))
+        
+        self._split = split
+        self._shadow = self.versions[shadow] if shadow else None
+    
+    def route(self, key: Optional[str] = None) -> ModelVersion:
+        """
+        Pick the version for a request.
+        
+        Args:
+            key: Sticky routing key (e.g. postcode); requests with the same key
+                land on the same version. Random if None.
+        """
+        split = self._split
+        if not split:
+            return self.active
+        
+        if key is None:
+            point = random.random()
+        else:
+            point = (zlib.crc32(key.encode()) % 10000) / 10000
+        
+        for cumulative, model_version in split:
+            if point < cumulative:
+                return model_version
+        return split[-1][1]
+    
+    def shadow_score(self, primary: ModelVersion, user_inputs: List[Dict], predictions: List[float],
+                     build_features: Callable[[Dict, ModelVersion], Dict]):
+        """
+        Re-score a request on the shadow version in the background.
+        
+        Features are rebuilt from the raw inputs with build_features(input,
+        shadow), so a shadow trained with different feature store medians
+        is compared on its own inputs. Results are only compared with the
+        primary predictions and recorded on the shadow version's stats;
+        callers never wait for them.
+        """
+        shadow = self._shadow
+        if shadow is None or shadow is primary:
+            return
+        
+        with self._lock:
+            if self._shadow_pending >= self.max_shadow_pending:
+                self.shadow_skipped += 1
+                return
+            self._shadow_pending += 1
+        
+        self._shadow_executor.submit(self._run_shadow, shadow, user_inputs, predictions, build_features)
+    
+    def _run_shadow(self, shadow: ModelVersion, user_inputs: List[Dict], predictions: List[float],
+                    build_features: Callable[[Dict, ModelVersion], Dict]):
+        """Build features for and score on the shadow version, recording latency and drift."""
+        start = time.perf_counter()
+        try:
+            features_list = [build_features(user_input, shadow) for user_input in user_inputs]
+            results = shadow.agent.predict_batch(features_list)
+            shadow.shadow_latency.record(time.perf_counter() - start, items=len(user_inputs))
+            
+            for result, primary in zip(results, predictions):
+                if primary:
+                    shadow.shadow_diffs.append(abs(result["prediction"] - primary) / abs(primary) * 100)
+        except Exception as e:
+            logger.error(f"Shadow scoring on {shadow.version} failed: {e}")
+            shadow.shadow_latency.record(time.perf_counter() - start, items=len(user_inputs), error=True)
+        finally:
+            with self._lock:
+                self._shadow_pending -= 1
+    
+    def unload(self, version: str):
+        """
+        Forget a loaded version.
+        
+        In-flight requests that already hold it still complete.
+        """
+        if self._active is not None and self._active.version == version:
+            raise ValueError("Cannot unload the active model version")
+        if any(mv.version == version for _, mv in self._split) or \
+                (self._shadow is not None and self._shadow.version == version):
+            raise ValueError(f"Model version '{version}' is still routed to")
+        
+        with self._lock:
+            self.versions.pop(version, None)
+    
+    def refresh(self, activate: bool = False) -> List[str]:
+        """
+        Start background loads for versions that appeared on disk.
+        
+        Args:
+            activate: Activate each new version once loaded
+        
+        Returns:
+            Versions that started loading
+        """
+        new = [
+            v for v in self.discover()
+            if v not in self.versions and v not in self.loading and v not in self.failed
+        ]
+        for version in new:
+            self.load_in_background(version, activate=activate)
+        return new
+    
+    def start_watching(self, interval_seconds: float, activate: bool = False):
+        """Poll the models directory for new versions every interval_seconds."""
+        if self._watcher is not None:
+            return
+        
+        def watch():
+            while not self._stop_watching.wait(interval_seconds):
+                try:
+                    self.refresh(activate=activate)
+                except Exception as e:
+                    logger.error(f"Model discovery failed: {e}")
+        
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+        self._watcher.start()
+    
+    def stop_watching(self):
+        """Stop the directory watcher, waiting for an in-progress refresh to finish."""
+        watcher = self._watcher
+        if watcher is None:
+            return
+        
+        self._stop_watching.set()
+        watcher.join()
+        self._watcher = None
+    
+    def list_versions(self) -> List[dict]:
+        """Every discovered version with its load/routing status."""
+        weights, previous = {}, 0.0
+        for cumulative, model_version in self._split:
+            weights[model_version.version] = round(cumulative - previous, 6)
+            previous = cumulative
+        
+        versions = []
+        for version in sorted(set(self.discover()) | set(self.versions)):
+            if version in self.versions:
+                status = "loaded"
+            elif version in self.loading:
+                status = "loading"
+            elif version in self.failed:
+                status = "failed"
+            else:
+                status = "available"
+            
+            versions.append({
+                "version": version,
+                "status": status,
+                "active": self._active is not None and self._active.version == version,
+                "shadow": self._shadow is not None and self._shadow.version == version,
+                "traffic_weight": weights.get(version),
+                "error": self.failed.get(version)
+            })
+        return versions
+    
+    def stats(self) -> dict:
+        """Per-version serving stats."""
+        return {
+            "active": self._active.version if self._active else None,
+            "shadow": self._shadow.version if self._shadow else None,
+            "shadow_skipped": self.shadow_skipped,
+            "versions": {v: mv.stats() for v, mv in list(self.versions.items())}
+        }
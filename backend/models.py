@@ -2,8 +2,8 @@
 Pydantic models with Chat support.
 """
 
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from pydantic import BaseModel, Field
+from typing import Optional, Dict, Any, List
 
 class PredictionRequest(BaseModel):
     """Standard prediction request."""
@@ -19,6 +19,28 @@ class PredictionResponse(BaseModel):
     explanation: str
     metadata: Optional[Dict[str, Any]] = None
 
+class BatchPredictionRequest(BaseModel):
+    """Portfolio prediction request scored in one model call."""
+    category: str
+    inputs: List[Dict[str, Any]] = Field(..., min_length=1, max_length=10000)
+    explain: bool = False
+    attribution: bool = False
+
+class BatchPredictionItem(BaseModel):
+    """Single property result within a batch."""
+    prediction: float
+    confidence_low: float
+    confidence_high: float
+    explanation: Optional[str] = None
+    shap_values: Optional[Dict[str, float]] = None
+
+class BatchPredictionResponse(BaseModel):
+    """Portfolio prediction response, in input order."""
+    category: str
+    count: int
+    predictions: List[BatchPredictionItem]
+    metadata: Optional[Dict[str, Any]] = None
+
 class ChatRequest(BaseModel):
     """Natural language chat request."""
     message: str
@@ -32,3 +54,8 @@ class ChatResponse(BaseModel):
     confidence_high: Optional[float] = None
     conversation_id: Optional[str] = None
     metadata: Optional[Dict[str, Any]] = None
+
+class ModelRoutingRequest(BaseModel):
+    """Traffic split and shadow version for the house model."""
+    weights: Dict[str, float] = Field(default_factory=dict)
+    shadow: Optional[str] = None
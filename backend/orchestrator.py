@@ -2,11 +2,11 @@
 Orchestrator that coordinates all agents.
 """
 
-import logging
 import asyncio
+import logging
 from typing import Dict, Any
 from backend.models import PredictionRequest
-from agents import CrawlerAgent, PreprocessingAgent, MLExecutionAgent
+from agents import PreprocessingAgent, MLExecutionAgent, SourceScheduler
 from utils import InstructionLoader, CacheManager
 
 logger = logging.getLogger(__name__)
@@ -18,7 +18,7 @@ class PredictionOrchestrator:
     
     Pipeline:
     1. Load instructions for model type
-    2. Execute 3 crawler agents in parallel
+    2. Fetch the 3 crawlers' sources, each as soon as its dependencies resolve
     3. Preprocess data
     4. Generate prediction with ML agent
     5. Return results
@@ -58,26 +58,33 @@ class PredictionOrchestrator:
             logger.warning(f"Instructions not found for {model_type}, using placeholder")
             return self._placeholder_response()
         
-        # Step 2: Execute crawlers in parallel
+        # Step 2: Execute crawlers' sources as a dependency DAG
         logger.info("Executing crawler agents...")
-        crawler_results = await self._execute_crawlers_parallel(crawler_configs, user_input)
+        crawler_results = await self._execute_crawlers(crawler_configs, user_input)
         
         # Step 3: Preprocess data
         logger.info("Preprocessing data...")
         preprocessing_agent = PreprocessingAgent(feature_config)
         features = preprocessing_agent.process(crawler_results, user_input)
         
-        # Step 4: Generate prediction
+        # Step 4: Generate prediction (model work off the loop, LLM via the gateway)
         logger.info("Generating prediction...")
         ml_agent = MLExecutionAgent(model_type)
-        result = ml_agent.predict(features)
+        result = await asyncio.to_thread(ml_agent.predict, features)
+        
+        explanation = await ml_agent.aexplain(features, result)
+        result["explanation"] = explanation or ml_agent.template_explanation(features, result)
         
         return result
     
-    async def _execute_crawlers_parallel(self, crawler_configs: list, 
-                                        user_input: Dict[str, Any]) -> list:
+    async def _execute_crawlers(self, crawler_configs: list,
+                                user_input: Dict[str, Any]) -> list:
         """
-        Execute 3 crawler agents in parallel.
+        Execute 3 crawler agents, scheduling their sources by dependency.
+        
+        Independent sources run in parallel across all crawlers; sources that
+        need another's output (e.g. {derived.latitude} from postcodes_io)
+        start as soon as it arrives.
         
         Args:
             crawler_configs: List of 3 crawler configurations
@@ -86,17 +93,8 @@ class PredictionOrchestrator:
         Returns:
             List of results from 3 crawlers
         """
-        async def run_crawler(config):
-            """Run single crawler in executor."""
-            loop = asyncio.get_event_loop()
-            crawler = CrawlerAgent(config, self.cache_manager)
-            return await loop.run_in_executor(None, crawler.execute, user_input)
-        
-        # Execute all 3 crawlers simultaneously
-        tasks = [run_crawler(config) for config in crawler_configs]
-        results = await asyncio.gather(*tasks)
-        
-        return results
+        scheduler = SourceScheduler(crawler_configs, self.cache_manager)
+        return await scheduler.run(user_input)
     
     def _placeholder_response(self) -> Dict[str, Any]:
         """Return placeholder response when model not available."""
@@ -2,21 +2,171 @@
 Prediction service with LLM-powered explanations.
 """
 
+import asyncio
+import logging
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Callable, List, Optional
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from agents.ml_execution_agent import MLExecutionAgent
+from agents.explanation_cache import ExplanationCache
+from agents.feature_store import postcode_sector
+from utils.cache_manager import CacheManager
+from utils.llm_client import LLMClient
+from utils.llm_gateway import LLMGateway
+from backend.model_registry import ModelRegistry, ModelVersion
+from backend.explanations import ExplanationStore
+
+logger = logging.getLogger(__name__)
+
+# Version activated at startup; others in MODELS_DIR can be loaded and
+# swapped in at runtime through the model registry
+MODELS_DIR = os.getenv("MODELS_DIR", "models")
+MODEL_VERSION = os.getenv("MODEL_VERSION", "house_2024_improved_v1")
+
+# Poll MODELS_DIR for new versions (0 = off) and activate them once loaded
+MODEL_WATCH_INTERVAL_S = float(os.getenv("MODEL_WATCH_INTERVAL_S", "0"))
+MODEL_AUTO_ACTIVATE = os.getenv("MODEL_AUTO_ACTIVATE", "false").lower() == "true"
+
+# "model" scores every request live; "grid" answers from the precomputed
+# table built by scripts/build_prediction_grid.py and falls back to the model
+SERVING_MODE = os.getenv("PREDICTION_SERVING_MODE", "model")
+
+# "catboost" or "numpy" (flat arrays from scripts/compile_tree_model.py)
+INFERENCE_ENGINE = os.getenv("INFERENCE_ENGINE", "catboost")
+
+# Micro-batching window for concurrent single-property requests
+BATCH_WINDOW_MS = float(os.getenv("PREDICT_BATCH_WINDOW_MS", "3"))
+MAX_BATCH_SIZE = int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64"))
+
+# Model calls run on a bounded pool, never on the event loop (CatBoost
+# releases the GIL while scoring, so threads scale across cores)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(min(8, (os.cpu_count() or 2)))))
+
+# Per-stage timeouts in seconds
+PREDICT_TIMEOUT_S = float(os.getenv("PREDICT_TIMEOUT_S", "5"))
+BATCH_PREDICT_TIMEOUT_S = float(os.getenv("BATCH_PREDICT_TIMEOUT_S", "60"))
+LLM_TIMEOUT_S = float(os.getenv("LLM_TIMEOUT_S", "30"))
+LLM_CONNECT_TIMEOUT_S = float(os.getenv("LLM_CONNECT_TIMEOUT_S", "2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "16"))
+
+# LLM admission control: concurrent generations, waiting callers, max queue
+# wait, and the latency budget after which callers get the template
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "2"))
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "32"))
+LLM_MAX_QUEUE_WAIT_S = float(os.getenv("LLM_MAX_QUEUE_WAIT_S", "2"))
+LLM_BUDGET_S = float(os.getenv("LLM_BUDGET_S", "8"))
 
 class PredictionService:
-    """Handles predictions with LLM explanations."""
+    """
+    Handles predictions with LLM explanations.
+    
+    Construction is cheap; the model (and CatBoost/pandas with it) is loaded by
+    warm_up(), which the API runs in the background after binding.
+    """
     
     def __init__(self):
-        self.house_agent = MLExecutionAgent("models/house_2024_improved_v1.cbm")
-        self.house_agent.load_model()
+        self.inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS,
+                                                 thread_name_prefix="inference")
+        self.llm = LLMGateway(
+            LLMClient(
+                max_connections=LLM_MAX_CONNECTIONS,
+                connect_timeout=LLM_CONNECT_TIMEOUT_S,
+                timeout=LLM_TIMEOUT_S
+            ),
+            max_concurrency=LLM_MAX_CONCURRENCY,
+            max_queue=LLM_MAX_QUEUE,
+            max_wait_s=LLM_MAX_QUEUE_WAIT_S,
+            budget_s=LLM_BUDGET_S
+        )
+        self.registry = ModelRegistry(
+            MODELS_DIR,
+            engine=INFERENCE_ENGINE,
+            serving_mode=SERVING_MODE,
+            explanation_cache=ExplanationCache(cache_manager=CacheManager()),
+            max_batch_size=MAX_BATCH_SIZE,
+            batch_window_ms=BATCH_WINDOW_MS,
+            executor=self.inference_pool,
+            llm_gateway=self.llm
+        )
+        self.explanations = ExplanationStore()
+        
+        self.status = "starting"
+        self.error = None
+        self.warmup_seconds = None
+        self._warm_lock = threading.Lock()
+    
+    @property
+    def ready(self) -> bool:
+        """True once the startup model is loaded and warmed."""
+        return self.status == "ready"
+    
+    def warm_up(self):
+        """
+        Load and activate the startup model, then score one request.
+        
+        The first prediction pays one-off costs (lazy imports, CatBoost and
+        feature store page-ins), so it happens here rather than on a user
+        request. Safe to call more than once.
+        """
+        with self._warm_lock:
+            if self.ready:
+                return
+            
+            self.status = "loading"
+            start = time.perf_counter()
+            try:
+                self.registry.load(MODEL_VERSION)
+                self.registry.activate(MODEL_VERSION)
+                
+                model = self.registry.active
+                features = self._build_features({"postcode": "SW1A 1AA", "property_type": "Flat"}, model)
+                model.agent.predict_batch([features])
+                
+                if MODEL_WATCH_INTERVAL_S > 0:
+                    self.registry.start_watching(MODEL_WATCH_INTERVAL_S, activate=MODEL_AUTO_ACTIVATE)
+            except Exception as e:
+                self.status = "failed"
+                self.error = str(e)
+                logger.exception("Model warm-up failed")
+                raise
+            
+            self.warmup_seconds = time.perf_counter() - start
+            self.status = "ready"
+            logger.info(f"Prediction service ready in {self.warmup_seconds:.2f}s")
+    
+    async def aclose(self):
+        """Release pooled LLM connections and the inference pool on shutdown."""
+        await self.llm.client.aclose()
+        self.inference_pool.shutdown(wait=False, cancel_futures=True)
+    
+    def readiness(self) -> dict:
+        """Readiness details for the /ready endpoint."""
+        return {
+            "status": self.status,
+            "model_version": self.registry.active.version if self.ready else None,
+            "warmup_seconds": self.warmup_seconds,
+            "error": self.error
+        }
+    
+    @property
+    def house_agent(self) -> MLExecutionAgent:
+        """Agent of the active model version."""
+        return self.registry.active.agent
+    
+    @property
+    def feature_store(self):
+        """Feature store of the active model version."""
+        return self.registry.active.feature_store
     
-    def predict_house_price(self, user_input: dict) -> dict:
-        """Predict with LLM explanation."""
+    def _build_features(self, user_input: dict, model: Optional[ModelVersion] = None) -> dict:
+        """Map API input to the model's feature dict."""
         
         property_type_map = {
             "Detached": "D",
@@ -25,13 +175,10 @@ class PredictionService:
             "Flat": "F"
         }
         
-        postcode = user_input.get("postcode", "").strip().upper()
-        postcode_sector = postcode.split()[0] if postcode else "UNKNOWN"
-        
         features = {
             "property_type": property_type_map.get(user_input.get("property_type"), "S"),
             "duration": "F" if user_input.get("tenure") == "Freehold" else "L",
-            "postcode_sector": postcode_sector,
+            "postcode_sector": postcode_sector(user_input.get("postcode")),
             "town_city": "LONDON",
             "county": "GREATER LONDON",
             "month": 6,
@@ -43,8 +190,15 @@ class PredictionService:
             "property_type_median": 350000
         }
         
-        result = self.house_agent.predict(features)
+        # Real geography and medians from training, when available
+        feature_store = (model or self.registry.active).feature_store
+        if feature_store is not None:
+            feature_store.enrich(features)
         
+        return features
+    
+    def _format_result(self, result: dict, model_version: str) -> dict:
+        """Shape an agent result into the service response."""
         return {
             "status": "success",
             "prediction": result["prediction"],
@@ -52,8 +206,107 @@ class PredictionService:
             "confidence_high": result["confidence_high"],
             "explanation": result["explanation"],
             "top_factors": result["top_factors"],
-            "model_version": "house_2024_improved_v1",
-            "llm_powered": True
+            "model_version": model_version,
+            "llm_powered": result["explanation"] is not None
         }
+    
+    def _route(self, user_input: dict) -> ModelVersion:
+        """Pick the model version for a request, sticky per postcode."""
+        postcode = (user_input.get("postcode") or "").strip().upper()
+        return self.registry.route(postcode or None)
+    
+    async def predict_house_price_async(self, user_input: dict,
+                                        on_explained: Optional[Callable[[str], None]] = None) -> dict:
+        """
+        Predict immediately and explain in the background.
+        
+        The model call is shared with whatever other requests arrive within the
+        batching window. The returned explanation is the instant template; the
+        LLM explanation streams from the job in "explanation_id".
+        
+        Args:
+            user_input: API input (postcode, property_type, tenure)
+            on_explained: Called with the LLM explanation once it is complete
+        """
+        # Holding the version for the whole request keeps it valid across a swap
+        model = self._route(user_input)
+        features = self._build_features(user_input, model)
+        
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(model.batcher.submit(features), PREDICT_TIMEOUT_S)
+        except Exception:
+            model.latency.record(time.perf_counter() - start, error=True)
+            raise
+        model.latency.record(time.perf_counter() - start)
+        
+        self.registry.shadow_score(model, [user_input], [result["prediction"]], self._build_features)
+        
+        explanation_id = self.explanations.start(features, result, on_done=on_explained,
+                                                 agent=model.agent)
+        
+        response = self._format_result({
+            **result,
+            "explanation": model.agent.template_explanation(features, result)
+        }, model.version)
+        response["llm_powered"] = False
+        response["explanation_id"] = explanation_id
+        return response
+    
+    async def predict_house_prices_async(self, user_inputs: List[dict], explain: bool = False,
+                                         attribution: bool = False) -> List[dict]:
+        """
+        Predict a whole portfolio with one vectorized model call.
+        
+        Scoring (and SHAP) runs on the inference pool; LLM explanations are then
+        requested concurrently over the pooled async client, falling back to
+        the template per property.
+        """
+        model = self.registry.route()
+        features_list = [self._build_features(user_input, model) for user_input in user_inputs]
+        
+        loop = asyncio.get_running_loop()
+        results = await asyncio.wait_for(
+            loop.run_in_executor(
+                self.inference_pool,
+                partial(self._score_batch, model, user_inputs, features_list, attribution=attribution)
+            ),
+            BATCH_PREDICT_TIMEOUT_S
+        )
+        
+        if explain:
+            texts = await asyncio.gather(*(
+                model.agent.aexplain(features, result)
+                for features, result in zip(features_list, results)
+            ))
+            for features, result, text in zip(features_list, results, texts):
+                result["explanation"] = text or model.agent.template_explanation(features, result)
+                result["llm_powered"] = text is not None
+        
+        return results
+    
+    def _score_batch(self, model: ModelVersion, user_inputs: List[dict], features_list: List[dict],
+                     attribution: bool = False) -> List[dict]:
+        """
+        Score prepared features on one version, recording latency and shadow
+        traffic (the shadow rebuilds features from user_inputs).
+        """
+        start = time.perf_counter()
+        try:
+            raw = model.agent.predict_batch(features_list)
+        except Exception:
+            model.latency.record(time.perf_counter() - start, items=len(features_list), error=True)
+            raise
+        model.latency.record(time.perf_counter() - start, items=len(features_list))
+        
+        self.registry.shadow_score(model, user_inputs, [r["prediction"] for r in raw], self._build_features)
+        results = [self._format_result(result, model.version) for result in raw]
+        
+        if attribution:
+            for result, shap_values in zip(results, model.agent.shap_values(features_list)):
+                result["shap_values"] = shap_values
+        
+        return results
 
+# Cheap to construct; backend.main warms it up in the background on startup
 prediction_service = PredictionService()
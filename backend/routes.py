@@ -1,13 +1,28 @@
-from fastapi import APIRouter, HTTPException
-from backend.models import PredictionRequest, PredictionResponse, ChatRequest, ChatResponse
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from backend.models import (
+    PredictionRequest, PredictionResponse, ChatRequest, ChatResponse,
+    BatchPredictionRequest, BatchPredictionResponse, BatchPredictionItem,
+    ModelRoutingRequest
+)
 from backend.prediction_service import prediction_service
 from backend.chat_manager import chat_manager
 from agents.nlp_agent import NLPAgent
-import requests
+import asyncio
+import json
 
 router = APIRouter()
 nlp_agent = NLPAgent()
 
+def require_model():
+    """Reject model-backed requests until startup warm-up has finished."""
+    if not prediction_service.ready:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Model is {prediction_service.status}, try again shortly",
+            headers={"Retry-After": "1"}
+        )
+
 @router.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     try:
@@ -53,11 +68,29 @@ Example: "How much is a 3 bed semi in SW1A 1AA?"
                 metadata={"intent": "request_info", "missing": parsed["missing_fields"]}
             )
         
+        if intent == "predict_price" and not prediction_service.ready:
+            response_text = "⏳ The valuation model is still starting up - please try again in a moment."
+            chat_manager.add_message(conv_id, "assistant", response_text)
+            return ChatResponse(
+                message=response_text,
+                conversation_id=conv_id,
+                metadata={"intent": intent, "model_status": prediction_service.status}
+            )
+        
         if intent == "predict_price":
-            result = prediction_service.predict_house_price(parsed["input_data"])
+            message_index = None
+            
+            def on_explained(explanation: str):
+                # Swap the template for the LLM text once it has streamed
+                if message_index is not None:
+                    chat_manager.update_message(conv_id, message_index, f"💰 {explanation}")
+            
+            result = await prediction_service.predict_house_price_async(
+                parsed["input_data"], on_explained=on_explained
+            )
             response_message = f"💰 {result['explanation']}"
             
-            chat_manager.add_message(conv_id, "assistant", response_message)
+            message_index = chat_manager.add_message(conv_id, "assistant", response_message)
             
             return ChatResponse(
                 message=response_message,
@@ -65,19 +98,21 @@ Example: "How much is a 3 bed semi in SW1A 1AA?"
                 confidence_low=result["confidence_low"],
                 confidence_high=result["confidence_high"],
                 conversation_id=conv_id,
-                metadata={"intent": intent, "extracted": parsed["input_data"]}
+                metadata={
+                    "intent": intent,
+                    "extracted": parsed["input_data"],
+                    "explanation_id": result["explanation_id"],
+                    "explanation_stream": f"/api/explanations/{result['explanation_id']}/stream"
+                }
             )
         
         elif intent == "scenario":
             prompt = f"Previous: {context}\n\nUser asks: {request.message}\n\nRespond about property value changes."
             
-            llm_response = requests.post(
-                "http://localhost:11434/api/generate",
-                json={"model": "llama3.2:3b", "prompt": prompt, "stream": False},
-                timeout=30
-            )
+            response_text = await prediction_service.llm.generate(prompt)
+            if response_text is None:
+                response_text = "⚠️ The language model is busy right now - please try the scenario again shortly."
             
-            response_text = llm_response.json()["response"].strip()
             chat_manager.add_message(conv_id, "assistant", response_text)
             
             return ChatResponse(
@@ -95,24 +130,135 @@ Example: "How much is a 3 bed semi in SW1A 1AA?"
                 metadata={"intent": intent}
             )
     
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@router.post("/predict")
+@router.post("/predict", dependencies=[Depends(require_model)])
 async def predict(request: PredictionRequest):
     try:
-        result = prediction_service.predict_house_price(request.input_data)
+        result = await prediction_service.predict_house_price_async(request.input_data)
         return PredictionResponse(
             category=request.category,
             prediction=result["prediction"],
             confidence_low=result["confidence_low"],
             confidence_high=result["confidence_high"],
             explanation=result["explanation"],
-            metadata={"model_version": result["model_version"]}
+            metadata={
+                "model_version": result["model_version"],
+                "explanation_id": result["explanation_id"],
+                "explanation_stream": f"/api/explanations/{result['explanation_id']}/stream"
+            }
+        )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/explanations/{explanation_id}/stream")
+async def stream_explanation(explanation_id: str):
+    """Server-Sent Events stream of LLM explanation tokens."""
+    job = prediction_service.explanations.get(explanation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Explanation not found or expired")
+    
+    async def events():
+        async for token in job.follow():
+            yield f"data: {json.dumps({'token': token})}\n\n"
+        yield f"event: done\ndata: {json.dumps({'explanation': job.text})}\n\n"
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/explanations/{explanation_id}")
+async def get_explanation(explanation_id: str):
+    """Explanation text generated so far (polling alternative to the stream)."""
+    job = prediction_service.explanations.get(explanation_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Explanation not found or expired")
+    
+    return {"explanation_id": job.id, "done": job.done, "explanation": job.text}
+
+@router.post("/predict/batch", response_model=BatchPredictionResponse, dependencies=[Depends(require_model)])
+async def predict_batch(request: BatchPredictionRequest):
+    try:
+        results = await prediction_service.predict_house_prices_async(
+            request.inputs, explain=request.explain, attribution=request.attribution
+        )
+        return BatchPredictionResponse(
+            category=request.category,
+            count=len(results),
+            predictions=[
+                BatchPredictionItem(
+                    prediction=result["prediction"],
+                    confidence_low=result["confidence_low"],
+                    confidence_high=result["confidence_high"],
+                    explanation=result["explanation"],
+                    shap_values=result.get("shap_values")
+                )
+                for result in results
+            ],
+            metadata={
+                "model_version": results[0]["model_version"],
+                "top_factors": results[0]["top_factors"]
+            }
         )
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Prediction timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/models")
 async def list_models():
-    return {"models": [{"id": "house_price", "status": "active"}]}
+    registry = prediction_service.registry
+    return {
+        "models": [{
+            "id": "house_price",
+            "status": "active" if prediction_service.ready else prediction_service.status,
+            "active_version": registry.active.version if prediction_service.ready else None,
+            "versions": registry.list_versions()
+        }]
+    }
+
+@router.post("/models/{version}/activate", status_code=202, dependencies=[Depends(require_model)])
+async def activate_model(version: str):
+    """Load a model version in the background and swap it in once ready."""
+    registry = prediction_service.registry
+    if version not in registry.versions and version not in registry.discover():
+        raise HTTPException(status_code=404, detail=f"Model version '{version}' not found")
+    
+    if version in registry.versions:
+        registry.activate(version)
+        return {"version": version, "status": "active"}
+    
+    registry.load_in_background(version, activate=True)
+    return {"version": version, "status": "loading"}
+
+@router.post("/models/{version}/load", status_code=202, dependencies=[Depends(require_model)])
+async def load_model(version: str):
+    """Load a model version in the background without routing traffic to it."""
+    registry = prediction_service.registry
+    if version not in registry.versions and version not in registry.discover():
+        raise HTTPException(status_code=404, detail=f"Model version '{version}' not found")
+    
+    if version not in registry.versions:
+        registry.load_in_background(version)
+    return {"version": version, "status": "loaded" if version in registry.versions else "loading"}
+
+@router.put("/models/routing", dependencies=[Depends(require_model)])
+async def set_model_routing(request: ModelRoutingRequest):
+    """Split traffic between loaded versions and/or shadow-score one."""
+    try:
+        prediction_service.registry.set_routing(request.weights, shadow=request.shadow)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"versions": prediction_service.registry.list_versions()}
+
+@router.get("/models/stats", dependencies=[Depends(require_model)])
+async def model_stats():
+    """Per-version latency, batching and shadow comparison stats, plus LLM gateway load."""
+    return {**prediction_service.registry.stats(), "llm": prediction_service.llm.stats()}
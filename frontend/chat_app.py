@@ -15,7 +15,24 @@ st.set_page_config(
 st.title("🏠 KALMAN - AI Property Valuation")
 st.markdown("Ask me anything about UK property prices!")
 
-API_URL = "http://localhost:8000/api/chat"
+API_BASE = "http://localhost:8000"
+API_URL = f"{API_BASE}/api/chat"
+
+
+def stream_explanation(stream_path: str):
+    """Yield explanation tokens from the backend's Server-Sent Events stream."""
+    with requests.get(f"{API_BASE}{stream_path}", stream=True, timeout=60) as response:
+        response.raise_for_status()
+        event = "message"
+        for line in response.iter_lines(decode_unicode=True):
+            if not line:
+                event = "message"
+                continue
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:") and event == "message":
+                yield json.loads(line[len("data:"):])["token"]
+
 
 if "conversation_id" not in st.session_state:
     st.session_state.conversation_id = None
@@ -53,7 +70,9 @@ if prompt := st.chat_input("Ask about property prices..."):
                 if data.get("conversation_id"):
                     st.session_state.conversation_id = data["conversation_id"]
                 
-                st.markdown(data["message"])
+                message_text = data["message"]
+                placeholder = st.empty()
+                placeholder.markdown(message_text)
                 
                 if data.get("prediction"):
                     st.metric(
@@ -62,9 +81,24 @@ if prompt := st.chat_input("Ask about property prices..."):
                         delta=f"Range: £{data['confidence_low']:,.0f} - £{data['confidence_high']:,.0f}"
                     )
                 
+                # Number is already on screen; stream the LLM explanation into place
+                stream_path = (data.get("metadata") or {}).get("explanation_stream")
+                if stream_path:
+                    try:
+                        streamed = ""
+                        for token in stream_explanation(stream_path):
+                            streamed += token
+                            placeholder.markdown(f"💰 {streamed}▌")
+                        if streamed.strip():
+                            message_text = f"💰 {streamed.strip()}"
+                            placeholder.markdown(message_text)
+                    except requests.exceptions.RequestException:
+                        # Keep the instant template explanation
+                        placeholder.markdown(message_text)
+                
                 st.session_state.messages.append({
                     "role": "assistant",
-                    "content": data["message"],
+                    "content": message_text,
                     "prediction": data.get("prediction"),
                     "confidence_low": data.get("confidence_low"),
                     "confidence_high": data.get("confidence_high")
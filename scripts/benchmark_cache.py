@@ -0,0 +1,127 @@
+"""
+Benchmark CacheManager get/set throughput under concurrent threads.
+
+Compares the old open-execute-close connection per call (rollback journal,
+synchronous=FULL) with the pooled WAL CacheManager, using a fresh database
+for each run. Mixes 80% reads and 20% writes by default, like crawler
+threads that mostly hit the cache.
+
+    python scripts/benchmark_cache.py --threads 8 --ops 2000
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import json
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+from functools import partial
+
+from utils.cache_manager import CacheManager
+
+
+class ConnectPerCallCache(CacheManager):
+    """The previous behaviour: a new default-journal connection for every call."""
+    
+    LEGACY_GET_SQL = "SELECT response_data FROM cached_api_responses WHERE source = ? AND query_key = ?"
+    
+    LEGACY_SET_SQL = """
+        INSERT OR REPLACE INTO cached_api_responses 
+        (source, query_key, response_data, fetched_at, ttl_days)
+        VALUES (?, ?, ?, ?, ?)
+    """
+    
+    def __init__(self, db_path: str):
+        super().__init__(db_path, compression="none")
+        self.close()
+        conn = sqlite3.connect(db_path)
+        conn.execute("PRAGMA journal_mode=DELETE")
+        conn.close()
+    
+    def get(self, source, query_key, ttl_days=30):
+        conn = sqlite3.connect(self.db_path)
+        result = conn.execute(self.LEGACY_GET_SQL, (source, query_key)).fetchone()
+        conn.close()
+        return json.loads(result[0]) if result else None
+    
+    def set(self, source, query_key, data, ttl_days=30):
+        conn = sqlite3.connect(self.db_path)
+        conn.execute(self.LEGACY_SET_SQL, (source, query_key, json.dumps(data),
+                                           datetime.now().isoformat(), ttl_days))
+        conn.commit()
+        conn.close()
+
+
+def run(cache, threads: int, ops: int, write_ratio: float, keys: int) -> dict:
+    """Hammer the cache from several threads; return ops/sec and errors."""
+    payload = {"status": "success", "data": {"median_price": 325000, "sales": list(range(50))}}
+    for i in range(keys):
+        cache.set("bench", f"key_{i}", payload)
+    
+    errors = []
+    barrier = threading.Barrier(threads + 1)
+    
+    def worker(seed: int):
+        rng = random.Random(seed)
+        barrier.wait()
+        for _ in range(ops):
+            key = f"key_{rng.randrange(keys)}"
+            try:
+                if rng.random() < write_ratio:
+                    cache.set("bench", key, payload)
+                else:
+                    cache.get("bench", key)
+            except sqlite3.Error as e:
+                errors.append(e)
+    
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in workers:
+        t.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for t in workers:
+        t.join()
+    elapsed = time.perf_counter() - start
+    
+    return {"ops_per_sec": threads * ops / elapsed, "errors": len(errors)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--ops", type=int, default=2000, help="Operations per thread")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--keys", type=int, default=500)
+    args = parser.parse_args()
+    
+    print("="*70)
+    print("KALMAN - Cache Benchmark")
+    print("="*70)
+    print(f"{args.threads} threads x {args.ops} ops, {args.write_ratio:.0%} writes, {args.keys} keys")
+    
+    results = {}
+    # The in-process L1 would answer most reads on its own, so the pooling
+    # comparison runs with it off and reports it as a separate row
+    for label, factory in [("connect per call", ConnectPerCallCache),
+                           ("pooled WAL", partial(CacheManager, memory_entries=0)),
+                           ("pooled WAL + L1", CacheManager)]:
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = factory(f"{tmp}/bench.db")
+            results[label] = run(cache, args.threads, args.ops, args.write_ratio, args.keys)
+            cache.close()
+        print(f"\n⏱️  {label:<17} {results[label]['ops_per_sec']:>10,.0f} ops/sec"
+              f"  ({results[label]['errors']} errors)")
+    
+    baseline = results["connect per call"]["ops_per_sec"]
+    print(f"\n✅ Speedup: {results['pooled WAL']['ops_per_sec'] / baseline:.1f}x pooled, "
+          f"{results['pooled WAL + L1']['ops_per_sec'] / baseline:.1f}x with L1")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Precompute house model predictions over the full input grid.
+
+Every (postcode sector, property type, tenure, month, new build) combination
+is scored in vectorized chunks and written next to the model as a
+memory-mappable .npy plus a JSON index. Serve it with
+PREDICTION_SERVING_MODE=grid.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import time
+from catboost import CatBoostRegressor
+
+from agents.prediction_grid import build_grid, save_grid
+from agents.feature_store import FeatureStore
+
+MODEL_VERSION = "house_2024_improved_v1"
+
+print("="*70)
+print("KALMAN - Build Prediction Grid")
+print("="*70)
+
+print("\n📂 Loading model...")
+model = CatBoostRegressor()
+model.load_model(f"models/{MODEL_VERSION}.cbm")
+with open(f"models/{MODEL_VERSION}_metadata.json", 'r') as f:
+    feature_names = json.load(f)["features"]
+print("✅ Model loaded")
+
+print("\n📂 Loading feature store...")
+store = FeatureStore(f"models/{MODEL_VERSION}_features")
+geography = store.geography()
+type_medians = store.type_medians()
+print(f"✅ {len(geography):,} postcode sectors")
+
+print("\n🧮 Scoring grid...")
+start = time.time()
+grid = build_grid(model, feature_names, geography, type_medians)
+print(f"✅ {grid.size:,} predictions in {time.time() - start:.1f}s")
+
+output = f"models/{MODEL_VERSION}_grid"
+save_grid(grid, geography.index.tolist(), output, MODEL_VERSION)
+print(f"\n💾 Saved: {output}.npy ({grid.nbytes / 1e6:.1f} MB) + {output}.json")
@@ -2,8 +2,13 @@
 Clean data and save for training.
 """
 
-import pandas as pd
+import sys
 from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import pandas as pd
+
+from agents.feature_store import SECTOR_PATTERN
 
 print("Loading data...")
 
@@ -26,7 +31,7 @@ df = df[df['property_type'].isin(['D', 'S', 'T', 'F'])]
 
 df = df[df['postcode'].notna()]
 
-df['postcode_sector'] = df['postcode'].str.extract(r'^([A-Z]{1,2}\d{1,2})')
+df['postcode_sector'] = df['postcode'].str.extract(SECTOR_PATTERN.pattern)
 
 print(f"Cleaned: {len(df):,} ({len(df)/initial*100:.1f}% retained)")
 
@@ -0,0 +1,70 @@
+"""
+Compress the API response cache in place.
+
+Recompresses rows still stored as plain JSON, trains a zstd dictionary for
+every source with enough rows, rewrites those rows with it and VACUUMs the
+database file.
+
+    python scripts/compact_cache.py [--db data/cache/api_cache.db] [--min-rows 200]
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import os
+import sqlite3
+
+from utils.cache_manager import CacheManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--db", default="data/cache/api_cache.db")
+    parser.add_argument("--min-rows", type=int, default=200,
+                        help="Rows a source needs before training a dictionary")
+    parser.add_argument("--dict-size", type=int, default=32 * 1024)
+    args = parser.parse_args()
+    
+    print("="*70)
+    print("KALMAN - Compact Cache")
+    print("="*70)
+    
+    size_before = os.path.getsize(args.db)
+    print(f"\n📂 {args.db}: {size_before / 1e6:.1f} MB")
+    
+    # Opening migrates legacy rows
+    cache = CacheManager(db_path=args.db, memory_entries=0)
+    print(f"✅ Compression: {cache.codec.compression}")
+    
+    if cache.codec.compression == "zstd":
+        conn = sqlite3.connect(args.db)
+        sources = conn.execute(
+            "SELECT source, COUNT(*) FROM cached_api_responses GROUP BY source HAVING COUNT(*) >= ?",
+            (args.min_rows,)
+        ).fetchall()
+        conn.close()
+        
+        print(f"\n📚 Training dictionaries for {len(sources)} sources...")
+        for source, rows in sources:
+            try:
+                dict_id = cache.train_dictionary(source, dict_size=args.dict_size)
+                print(f"  ✓ {source}: {rows:,} rows, dictionary {dict_id}")
+            except ValueError as e:
+                print(f"  ⚠️ {source}: {e}")
+    else:
+        print("⚠️ zstandard not installed, skipping dictionaries")
+    
+    cache.close()
+    conn = sqlite3.connect(args.db)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("VACUUM")
+    conn.close()
+    
+    size_after = os.path.getsize(args.db)
+    print(f"\n💾 {size_before / 1e6:.1f} MB -> {size_after / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Compile the house model into flat NumPy arrays for the numpy inference engine.
+
+Exports the CatBoost model as JSON and flattens it next to the model as
+models/<version>_trees/. CatBoost only writes hashes for categories in the
+export pool, so the pool is built from the feature store vocabularies.
+Serve it with INFERENCE_ENGINE=numpy.
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import json
+import time
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor, Pool
+
+from agents.feature_store import FeatureStore
+from agents.prediction_grid import PROPERTY_TYPES, TENURES
+from agents.tree_evaluator import export_catboost_json, compile_tree_model, ObliviousTreeModel
+
+MODEL_VERSION = "house_2024_improved_v1"
+
+print("="*70)
+print("KALMAN - Compile Tree Model")
+print("="*70)
+
+print("\n📂 Loading model...")
+model = CatBoostRegressor()
+model.load_model(f"models/{MODEL_VERSION}.cbm")
+with open(f"models/{MODEL_VERSION}_metadata.json", 'r') as f:
+    feature_names = json.load(f)["features"]
+cat_features = [feature_names[i] for i in model.get_cat_feature_indices()]
+print(f"✅ Model loaded ({model.tree_count_} trees)")
+
+print("\n📂 Building category vocabulary from feature store...")
+store = FeatureStore(f"models/{MODEL_VERSION}_features")
+vocabulary = {
+    "postcode_sector": store.meta["sectors"],
+    "town_city": store.towns + ["UNKNOWN"],
+    "county": store.counties + ["UNKNOWN"],
+    "property_type": sorted(set(store.meta["property_types"]) | set(PROPERTY_TYPES)),
+    "duration": TENURES
+}
+rows = max(len(v) for v in vocabulary.values())
+vocab_df = pd.DataFrame({
+    name: (np.resize(np.array(vocabulary.get(name, ["UNKNOWN"]), dtype=object), rows)
+           if name in cat_features else np.zeros(rows))
+    for name in feature_names
+})
+print(f"✅ {rows:,} rows covering {len(cat_features)} categorical features")
+
+print("\n🌲 Exporting and compiling...")
+start = time.time()
+json_path = f"models/{MODEL_VERSION}.json"
+output = f"models/{MODEL_VERSION}_trees"
+export_catboost_json(model, json_path, Pool(vocab_df, cat_features=cat_features))
+compile_tree_model(json_path, output, feature_names, MODEL_VERSION)
+print(f"✅ Compiled in {time.time() - start:.1f}s")
+
+print("\n🔍 Checking parity on the vocabulary rows...")
+trees = ObliviousTreeModel(output)
+sample = vocab_df.head(1000)
+diff = np.abs(trees.predict(sample.to_dict('records')) - model.predict(sample)).max()
+print(f"✅ Max abs difference vs CatBoost: {diff:.2e}")
+
+print(f"\n💾 Saved: {output}/")
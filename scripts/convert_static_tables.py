@@ -0,0 +1,49 @@
+"""
+Convert every csv_static file named in the instructions to an Arrow table.
+
+Requests convert a CSV on first use anyway; running this after deploying or
+editing data files moves that cost out of the request path.
+
+    python scripts/convert_static_tables.py [--config-dir config/instructions]
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import argparse
+import time
+
+from utils.instruction_loader import InstructionLoader
+from utils.static_table import StaticTableStore
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--config-dir", default="config/instructions")
+    args = parser.parse_args()
+    
+    print("="*70)
+    print("KALMAN - Convert Static Tables")
+    print("="*70)
+    
+    loader = InstructionLoader(config_dir=args.config_dir)
+    file_paths = set()
+    for path in sorted(Path(args.config_dir).glob("*_instructions.json")):
+        plan = loader.load(path.name[:-len("_instructions.json")])
+        file_paths.update(source["file_path"] for crawler in plan.crawlers
+                          for source in crawler.sources if source.type == "csv_static")
+    
+    store = StaticTableStore.shared()
+    print(f"\n📂 {len(file_paths)} static files -> {store.table_dir}")
+    for file_path in sorted(file_paths):
+        start = time.perf_counter()
+        try:
+            table = store.get(file_path)
+            print(f"  ✓ {file_path}: {table.num_rows:,} rows in {time.perf_counter() - start:.2f}s")
+        except FileNotFoundError:
+            print(f"  ⚠️ {file_path}: not found")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,10 @@
 Improved model with more features.
 """
 
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
 import pandas as pd
 import numpy as np
 from catboost import CatBoostRegressor, Pool
@@ -10,6 +14,9 @@ from sklearn.metrics import r2_score, mean_absolute_error, mean_squared_error
 import json
 from datetime import datetime
 
+from agents.feature_store import save_feature_store
+from agents.tree_evaluator import export_catboost_json, compile_tree_model
+
 print("="*70)
 print("KALMAN - IMPROVED House Price Model")
 print("="*70)
@@ -105,4 +112,14 @@ metadata = {
 with open("models/house_2024_improved_v1_metadata.json", 'w') as f:
     json.dump(metadata, f, indent=2)
 
+# Serving needs the same lookup tables the features were built from
+save_feature_store(df, "models/house_2024_improved_v1_features", "house_2024_improved_v1")
+print(f"💾 Saved: models/house_2024_improved_v1_features/")
+
+# Flat arrays for INFERENCE_ENGINE=numpy; the training pool covers every category
+export_catboost_json(model, "models/house_2024_improved_v1.json", train_pool)
+compile_tree_model("models/house_2024_improved_v1.json", "models/house_2024_improved_v1_trees",
+                   feature_cols, "house_2024_improved_v1")
+print(f"💾 Saved: models/house_2024_improved_v1_trees/")
+
 print("✅ Training complete!")
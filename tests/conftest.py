@@ -0,0 +1,84 @@
+"""
+Shared fixtures for KALMAN tests.
+"""
+
+import sys
+import os
+import json
+
+# Add project root to path
+sys.path.insert(0, os.path.abspath('.'))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+FEATURES = [
+    "property_type", "duration", "postcode_sector", "town_city", "county",
+    "month", "quarter", "is_new_build", "is_freehold",
+    "sector_median_price", "town_median_price", "property_type_median"
+]
+CATEGORICAL = ["property_type", "duration", "postcode_sector", "town_city", "county"]
+
+SECTORS = {
+    "SW1": ("LONDON", "GREATER LONDON", 750000),
+    "E1": ("LONDON", "GREATER LONDON", 520000),
+    "M1": ("MANCHESTER", "GREATER MANCHESTER", 220000),
+    "B1": ("BIRMINGHAM", "WEST MIDLANDS", 210000),
+    "LS1": ("LEEDS", "WEST YORKSHIRE", 190000),
+}
+TYPE_FACTOR = {"D": 1.6, "S": 1.1, "T": 0.9, "F": 0.7}
+
+
+def make_training_frame(n: int = 600, seed: int = 0) -> pd.DataFrame:
+    """Synthetic Land Registry-shaped frame with the improved model's features."""
+    rng = np.random.default_rng(seed)
+    sectors = rng.choice(list(SECTORS), n)
+    types = rng.choice(list(TYPE_FACTOR), n)
+    duration = np.where(types == "F", "L", rng.choice(["F", "L"], n, p=[0.8, 0.2]))
+    month = rng.integers(1, 13, n)
+    new_build = rng.integers(0, 2, n)
+    
+    df = pd.DataFrame({
+        "property_type": types,
+        "duration": duration,
+        "postcode_sector": sectors,
+        "town_city": [SECTORS[s][0] for s in sectors],
+        "county": [SECTORS[s][1] for s in sectors],
+        "month": month,
+        "quarter": (month - 1) // 3 + 1,
+        "is_new_build": new_build,
+        "is_freehold": (duration == "F").astype(int),
+    })
+    base = np.array([SECTORS[s][2] for s in sectors], dtype=float)
+    df["price"] = base * np.array([TYPE_FACTOR[t] for t in types]) * (1 + 0.1 * new_build) \
+        * rng.normal(1.0, 0.05, n)
+    df["sector_median_price"] = df["postcode_sector"].map(df.groupby("postcode_sector")["price"].median())
+    df["town_median_price"] = df["town_city"].map(df.groupby("town_city")["price"].median())
+    df["property_type_median"] = df["property_type"].map(df.groupby("property_type")["price"].median())
+    return df
+
+
+@pytest.fixture(scope="session")
+def tiny_house_model(tmp_path_factory):
+    """Train a small CatBoost model shaped like house_2024_improved_v1."""
+    catboost = pytest.importorskip("catboost")
+    
+    df = make_training_frame()
+    model = catboost.CatBoostRegressor(iterations=30, depth=4, verbose=0, random_seed=42,
+                                      allow_writing_files=False)
+    model.fit(df[FEATURES], df["price"], cat_features=CATEGORICAL)
+    
+    model_dir = tmp_path_factory.mktemp("models")
+    model_path = model_dir / "house_test_v1.cbm"
+    model.save_model(str(model_path))
+    
+    with open(model_dir / "house_test_v1_metadata.json", "w") as f:
+        json.dump({
+            "model_name": "house_test_v1",
+            "version": "1.0",
+            "features": FEATURES,
+            "metrics": {"r2_score": 0.9, "mae": 1.0, "rmse": 1.0}
+        }, f)
+    
+    return {"path": str(model_path), "frame": df}
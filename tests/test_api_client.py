@@ -0,0 +1,76 @@
+"""
+Tests for the shared async API client.
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+
+from utils.api_client import AsyncAPIClient
+
+
+def test_per_host_limit_and_connection_reuse():
+    """Requests to one host are capped; other hosts are not held up by it."""
+    print("\n=== Testing AsyncAPIClient ===")
+    running = {"slow.example": 0, "fast.example": 0}
+    peak = {"slow.example": 0, "fast.example": 0}
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        running[host] += 1
+        peak[host] = max(peak[host], running[host])
+        await asyncio.sleep(0.1 if host == "slow.example" else 0)
+        running[host] -= 1
+        return httpx.Response(200, json={"host": host})
+    
+    client = AsyncAPIClient(max_per_host=2, transport=httpx.MockTransport(handler))
+    
+    async def run():
+        slow = [client.get("https://slow.example/x", params={"i": i}) for i in range(6)]
+        fast = [client.get("https://fast.example/y") for _ in range(6)]
+        results = await asyncio.gather(*slow, *fast)
+        pooled = client._client
+        await client.get("https://fast.example/z")
+        assert client._client is pooled
+        await client.aclose()
+        return results
+    
+    results = asyncio.run(run())
+    
+    assert len(results) == 12
+    assert peak["slow.example"] == 2
+    print(f"✓ Peak per-host concurrency: {peak}")
+
+
+def test_loop_change_closes_the_previous_client():
+    """A client left on another loop is closed there, not leaked."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={})
+    
+    client = AsyncAPIClient(transport=httpx.MockTransport(handler))
+    
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        asyncio.run_coroutine_threadsafe(client.get("https://a.example/"), other_loop).result(5)
+        first = client._client
+        
+        async def run():
+            await client.get("https://a.example/")
+            current = client._client
+            await client.aclose()
+            return current
+        
+        second = asyncio.run(run())
+        deadline = time.time() + 5
+        while not first.is_closed and time.time() < deadline:
+            time.sleep(0.01)
+        assert second is not first and first.is_closed
+        print("✓ Previous loop's client closed on its own loop")
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join(5)
+        other_loop.close()
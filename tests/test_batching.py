@@ -0,0 +1,61 @@
+"""
+Tests for the prediction micro-batcher.
+"""
+
+import asyncio
+
+from backend.batching import MicroBatcher
+
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    """Concurrent submits share one batch call and get their own results."""
+    print("\n=== Testing MicroBatcher ===")
+    
+    calls = []
+    
+    def double_all(items):
+        calls.append(list(items))
+        return [item * 2 for item in items]
+    
+    async def run():
+        batcher = MicroBatcher(double_all, max_batch_size=100, max_wait_ms=20)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)))
+    
+    results = asyncio.run(run())
+    
+    assert results == [i * 2 for i in range(10)]
+    assert len(calls) == 1, f"Expected one batch, got {len(calls)}"
+    print("✓ 10 requests served by 1 batch call")
+
+
+def test_micro_batcher_flushes_at_max_batch_size():
+    """A full batch flushes without waiting for the window."""
+    calls = []
+    
+    def identity(items):
+        calls.append(len(items))
+        return items
+    
+    async def run():
+        batcher = MicroBatcher(identity, max_batch_size=4, max_wait_ms=10_000)
+        return await asyncio.wait_for(
+            asyncio.gather(*(batcher.submit(i) for i in range(8))), timeout=5
+        )
+    
+    assert asyncio.run(run()) == list(range(8))
+    assert calls == [4, 4]
+    print("✓ Batches capped at max_batch_size")
+
+
+def test_micro_batcher_propagates_errors():
+    """A failing batch raises in every waiter."""
+    def boom(items):
+        raise ValueError("model exploded")
+    
+    async def run():
+        batcher = MicroBatcher(boom, max_wait_ms=1)
+        return await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+    
+    results = asyncio.run(run())
+    assert all(isinstance(r, ValueError) for r in results)
+    print("✓ Batch errors reach all callers")
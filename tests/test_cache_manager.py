@@ -0,0 +1,220 @@
+"""
+Tests for the pooled SQLite CacheManager.
+"""
+
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+from utils.cache_manager import CacheManager
+from utils.payload_codec import CODEC_ZLIB, zstandard
+
+
+def test_pooled_connections_under_concurrency(tmp_path):
+    """Threads share a few WAL connections and never see 'database is locked'."""
+    print("\n=== Testing CacheManager pooling ===")
+    cache = CacheManager(db_path=str(tmp_path / "cache.db"), pool_size=4)
+    errors = []
+    
+    def worker(n: int):
+        try:
+            for i in range(200):
+                cache.set("src", f"k{n}_{i % 20}", {"n": n, "i": i})
+                assert cache.get("src", f"k{n}_{i % 20}") == {"n": n, "i": i}
+        except (sqlite3.Error, AssertionError) as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert errors == []
+    assert cache.connections_opened <= 9
+    print(f"✓ 3,200 ops over {cache.connections_opened} connections")
+    
+    conn = sqlite3.connect(cache.db_path)
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    conn.close()
+    print("✓ WAL journal mode")
+    
+    assert cache.clear_expired() == 0
+    cache.clear_all()
+    assert cache.get("src", "k0_0") is None
+    cache.close()
+    print("✓ clear_expired / clear_all / close")
+
+
+def test_memory_tier_write_through_and_invalidation(tmp_path):
+    """Hot keys are served from L1; writes and invalidations reach both tiers."""
+    print("\n=== Testing CacheManager L1 ===")
+    cache = CacheManager(db_path=str(tmp_path / "cache.db"), memory_entries=2)
+    
+    cache.set("land_registry", "SW1A", {"median": 1})
+    assert cache.get("land_registry", "SW1A") == {"median": 1}
+    assert cache.stats()["sources"]["land_registry"]["l1_hits"] == 1
+    print("✓ Write-through then L1 hit")
+    
+    # A second manager on the same file only has the L2 copy
+    other = CacheManager(db_path=cache.db_path)
+    assert other.get("land_registry", "SW1A") == {"median": 1}
+    assert other.get("land_registry", "SW1A") == {"median": 1}
+    assert other.stats()["sources"]["land_registry"]["l2_hits"] == 1
+    assert other.stats()["sources"]["land_registry"]["l1_hits"] == 1
+    print("✓ L2 hit promoted into L1")
+    
+    cache.set("land_registry", "E1", {"median": 2})
+    cache.set("epc", "E1", {"rating": "C"})
+    assert len(cache.memory) == 2
+    assert cache.get("land_registry", "SW1A") == {"median": 1}
+    print("✓ LRU eviction to L2")
+    
+    assert cache.invalidate("land_registry") == 2
+    assert cache.get("land_registry", "E1") is None
+    assert cache.get("land_registry", "SW1A") is None
+    assert cache.get("epc", "E1") == {"rating": "C"}
+    assert cache.stats()["sources"]["land_registry"]["misses"] == 2
+    print("✓ Source invalidation hits both tiers")
+    
+    bounded = CacheManager(db_path=str(tmp_path / "bounded.db"), memory_max_bytes=100)
+    bounded.set("s", "big", {"blob": "x" * 200})
+    bounded.set("s", "small", {"v": 1})
+    assert bounded.memory.keys() == [("s", "small")]
+    assert bounded.get("s", "big") == {"blob": "x" * 200}
+    print("✓ Byte budget keeps oversized payloads out of L1")
+
+
+def test_compressed_payloads_and_legacy_migration(tmp_path):
+    """Old text rows are recompressed on open; every codec stays readable."""
+    print("\n=== Testing CacheManager compression ===")
+    db_path = str(tmp_path / "legacy.db")
+    payload = {"status": "success", "data": [{"price": 325000 + i, "postcode": "SW1A 1AA"} for i in range(100)]}
+    
+    # A database written before the codec column existed
+    conn = sqlite3.connect(db_path)
+    conn.execute("""
+        CREATE TABLE cached_api_responses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT NOT NULL, query_key TEXT NOT NULL,
+            response_data TEXT, fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            ttl_days INTEGER DEFAULT 30, UNIQUE(source, query_key))
+    """)
+    conn.execute("INSERT INTO cached_api_responses (source, query_key, response_data, fetched_at) VALUES (?, ?, ?, ?)",
+                 ("land_registry", "SW1A", json.dumps(payload), datetime.now().isoformat()))
+    conn.commit()
+    conn.close()
+    
+    cache = CacheManager(db_path=db_path, compression="zlib")
+    conn = sqlite3.connect(db_path)
+    codec, blob = conn.execute("SELECT codec, response_data FROM cached_api_responses").fetchone()
+    conn.close()
+    assert codec == CODEC_ZLIB and isinstance(blob, bytes)
+    assert len(blob) < len(json.dumps(payload)) / 4
+    assert cache.get("land_registry", "SW1A") == payload
+    print(f"✓ Legacy row migrated ({len(json.dumps(payload))} -> {len(blob)} bytes)")
+    
+    # A zstd manager still reads zlib rows
+    if zstandard is not None:
+        other = CacheManager(db_path=db_path, compression="zstd", memory_entries=0)
+        assert other.get("land_registry", "SW1A") == payload
+        print("✓ Mixed codecs readable")
+
+
+def test_zstd_dictionary_per_source(tmp_path):
+    """A trained dictionary is used for the source's rows and survives reopening."""
+    if zstandard is None:
+        print("⚠️ zstandard not installed, skipping")
+        return
+    
+    db_path = str(tmp_path / "dict.db")
+    cache = CacheManager(db_path=db_path, compression="zstd", memory_entries=0)
+    for i in range(300):
+        cache.set("epc", f"key_{i}", {"postcode": f"E1 {i % 9}AB", "rating": "CDE"[i % 3],
+                                      "floor_area": 50 + i % 40, "property_type": "Flat"})
+    
+    def total_bytes():
+        conn = sqlite3.connect(db_path)
+        size = conn.execute("SELECT SUM(LENGTH(response_data)) FROM cached_api_responses").fetchone()[0]
+        conn.close()
+        return size
+    
+    before = total_bytes()
+    dict_id = cache.train_dictionary("epc", dict_size=4096)
+    after = total_bytes()
+    assert after < before / 2
+    print(f"✓ Dictionary {dict_id}: {before} -> {after} bytes")
+    
+    reopened = CacheManager(db_path=db_path, compression="zstd", memory_entries=0)
+    assert reopened.get("epc", "key_7")["floor_area"] == 57
+    reopened.set("epc", "new", {"rating": "A"})
+    assert reopened.get("epc", "new") == {"rating": "A"}
+    print("✓ Dictionary reloaded from the database")
+
+
+def test_sql_expiry_and_lru_eviction(tmp_path):
+    """Expired rows never come back from SQL; the sweep keeps the table in budget."""
+    print("\n=== Testing CacheManager expiry and eviction ===")
+    cache = CacheManager(db_path=str(tmp_path / "evict.db"), memory_entries=0,
+                         max_rows=10, sweep_interval_s=0, stale_grace_days=0)
+    
+    cache.set("src", "old", {"v": 1}, ttl_days=1)
+    cache.set("src", "fresh", {"v": 2}, ttl_days=30)
+    conn = sqlite3.connect(cache.db_path)
+    conn.execute("UPDATE cached_api_responses SET expires_at = expires_at - 2 * 86400 WHERE query_key = 'old'")
+    conn.commit()
+    
+    assert cache.get("src", "old", ttl_days=1) is None
+    assert cache.get("src", "fresh", ttl_days=30) == {"v": 2}
+    print("✓ Expiry filtered in the lookup query")
+    
+    plan = " ".join(row[-1] for row in conn.execute(
+        "EXPLAIN QUERY PLAN DELETE FROM cached_api_responses WHERE expires_at <= 0"))
+    assert "idx_cache_expires" in plan
+    assert cache.clear_expired() == 1
+    print("✓ clear_expired uses idx_cache_expires")
+    
+    for i in range(20):
+        cache.set("src", f"k{i}", {"i": i})
+    # Keep the first few keys hot
+    for i in range(3):
+        assert cache.get("src", f"k{i}") == {"i": i}
+    
+    result = cache.sweep()
+    assert result["evicted"] == 21 - 9
+    assert cache.usage()["rows"] == 9
+    assert all(cache.get("src", f"k{i}") == {"i": i} for i in range(3))
+    assert cache.get("src", "k5") is None and cache.get("src", "fresh") is None
+    print(f"✓ Evicted {result['evicted']} least recently accessed rows")
+    conn.close()
+    cache.close()
+
+
+def test_get_many_and_set_many(tmp_path):
+    """Bulk calls batch SQL and mix L1 and L2 hits."""
+    print("\n=== Testing CacheManager bulk API ===")
+    cache = CacheManager(db_path=str(tmp_path / "bulk.db"), sweep_interval_s=0)
+    
+    cache.set_many("postcodes", {f"PC{i}": {"i": i} for i in range(1200)}, ttl_days=30)
+    assert cache.stats()["sources"]["postcodes"]["sets"] == 1200
+    
+    other = CacheManager(db_path=cache.db_path, memory_entries=100, sweep_interval_s=0)
+    other.get("postcodes", "PC0")
+    keys = [f"PC{i}" for i in range(0, 1200, 2)] + ["missing", "PC0"]
+    found = other.get_many("postcodes", keys)
+    
+    assert len(found) == 600
+    assert found["PC1198"] == {"i": 1198} and "missing" not in found
+    counts = other.stats()["sources"]["postcodes"]
+    assert counts["l1_hits"] == 1 and counts["l2_hits"] == 600 and counts["misses"] == 1
+    print("✓ 1,200 rows in one transaction, 601 keys over two IN queries")
+    
+    conn = sqlite3.connect(cache.db_path)
+    conn.execute("UPDATE cached_api_responses SET expires_at = expires_at - 31 * 86400 WHERE query_key = 'PC2'")
+    conn.commit()
+    conn.close()
+    entries = other.get_many_entries("postcodes", ["PC0", "PC2", "PC4", "missing"])
+    assert entries["PC0"] == ({"i": 0}, True) and entries["PC4"] == ({"i": 4}, True)
+    assert entries["PC2"] == ({"i": 2}, False) and "missing" not in entries
+    assert other.stats()["sources"]["postcodes"]["stale_hits"] == 1
+    print("✓ get_many_entries returns expired rows flagged stale")
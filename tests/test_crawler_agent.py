@@ -0,0 +1,349 @@
+"""
+Tests for CrawlerAgent caching paths.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+
+import httpx
+import pytest
+
+from agents.crawler_agent import CrawlerAgent, SourceFetchError
+from utils.api_client import AsyncAPIClient
+from utils.cache_manager import CacheManager
+
+
+class FakeAPIClient:
+    """Records requests and returns a canned response per postcode."""
+    
+    def __init__(self, fail_for=()):
+        self.calls = []
+        self.fail_for = set(fail_for)
+    
+    def get(self, url, params=None, headers=None):
+        self.calls.append((url, params))
+        postcode = params["postcode"]
+        if postcode in self.fail_for:
+            raise ConnectionError(f"upstream down for {postcode}")
+        return {"result": {"postcode": postcode}}
+    
+    def close(self):
+        pass
+
+
+def make_crawler(tmp_path, api_client, **source_overrides):
+    source = {
+        "name": "postcodes_io",
+        "type": "rest_api",
+        "url": "https://api.postcodes.io/postcodes",
+        "params_mapping": {"postcode": "{user_input.postcode}"},
+        "cache_ttl_days": 180,
+        **source_overrides
+    }
+    cache = CacheManager(db_path=str(tmp_path / "crawler.db"), memory_entries=0, sweep_interval_s=0)
+    crawler = CrawlerAgent({"name": "Test Crawler", "data_sources": [source]}, cache)
+    crawler.api_client = api_client
+    return crawler
+
+
+def test_execute_many_batches_cache_and_dedupes_fetches(tmp_path):
+    """Each distinct missing key is fetched once; hits come from one bulk lookup."""
+    print("\n=== Testing CrawlerAgent.execute_many ===")
+    api = FakeAPIClient(fail_for={"B1 1AA"})
+    crawler = make_crawler(tmp_path, api)
+    crawler.cache.set("postcodes_io", "postcodes_io_SW1A 1AA", {"status": "success", "cached": True})
+    
+    inputs = [{"postcode": pc} for pc in ["SW1A 1AA", "E1 6AN", "E1 6AN", "B1 1AA"]]
+    results = crawler.execute_many(inputs)
+    
+    assert len(results) == 4
+    assert results[0]["sources"]["postcodes_io"]["cached"] is True
+    assert results[1]["sources"]["postcodes_io"] == results[2]["sources"]["postcodes_io"]
+    assert results[3]["sources"]["postcodes_io"]["status"] == "failed"
+    assert sorted(p["postcode"] for _, p in api.calls) == ["B1 1AA", "E1 6AN"]
+    print("✓ 1 cached, 1 fetched once for 2 inputs, 1 failure")
+    
+    # Second run: everything that succeeded is cached
+    api.calls.clear()
+    crawler.execute_many(inputs[:3])
+    assert api.calls == []
+    assert crawler.execute(inputs[1])["sources"]["postcodes_io"]["status"] == "success"
+    print("✓ Fetched results written back with set_many")
+
+
+def test_execute_many_misses_need_no_point_lookups(tmp_path):
+    """Stale rows and negative entries come from bulk lookups, not one query per key."""
+    api = FakeAPIClient(fail_for={"B1 1AA"})
+    crawler = make_crawler(tmp_path, api, stale_while_revalidate=False,
+                           fallback_strategy="use_cached_if_available")
+    crawler.execute_many([{"postcode": "B1 1AA"}])
+    crawler.cache.set("postcodes_io", "postcodes_io_N1 9GU", {"status": "success", "old": True}, ttl_days=180)
+    expire(crawler.cache, "postcodes_io_N1 9GU")
+    api.fail_for.add("N1 9GU")
+    api.calls.clear()
+    
+    def point_lookup(*args, **kwargs):
+        raise AssertionError("execute_many made a per-key cache lookup")
+    crawler.cache.get = crawler.cache.get_entry = point_lookup
+    
+    results = crawler.execute_many([{"postcode": pc} for pc in ("B1 1AA", "N1 9GU", "E1 6AN")])
+    
+    assert results[0]["sources"]["postcodes_io"]["status"] == "failed"
+    assert results[1]["sources"]["postcodes_io"]["old"] is True
+    assert results[2]["sources"]["postcodes_io"]["status"] == "success"
+    assert sorted(p["postcode"] for _, p in api.calls) == ["E1 6AN", "N1 9GU"]
+    print("✓ Negative hit, stale fallback and fetch with bulk lookups only")
+
+
+def test_execute_many_reuses_upstream_without_fetching(tmp_path):
+    """Sources declaring "source" never reach the HTTP client or the cache in batch mode."""
+    api = FakeAPIClient()
+    crawler = make_crawler(tmp_path, api, name="comparable_sales", url=None,
+                           source="crawler_1.land_registry_ppd",
+                           filter={"postcode": "{user_input.postcode}"})
+    upstream = {"crawler_1.land_registry_ppd": {"status": "success", "data": {"items": [1]}}}
+    
+    results = crawler.execute_many([{"postcode": "E1 6AN"},
+                                    {"postcode": "N1 9GU", "upstream": upstream}])
+    
+    assert results[0]["sources"]["comparable_sales"] == {
+        "error": "Upstream crawler_1.land_registry_ppd not available", "status": "failed"}
+    assert results[1]["sources"]["comparable_sales"]["data"] == {"items": [1]}
+    assert results[1]["sources"]["comparable_sales"]["filter"] == {"postcode": "N1 9GU"}
+    assert api.calls == []
+    assert crawler.cache.usage()["rows"] == 0
+    print("✓ Upstream reference resolved per input, no HTTP and nothing cached")
+
+
+def expire(cache, query_key):
+    conn = sqlite3.connect(cache.db_path)
+    conn.execute("UPDATE cached_api_responses SET expires_at = expires_at - (ttl_days + 1) * 86400 "
+                 "WHERE query_key = ?", (query_key,))
+    conn.commit()
+    conn.close()
+
+
+def test_stale_while_revalidate(tmp_path):
+    """An expired entry is returned at once and refreshed in the background."""
+    print("\n=== Testing stale-while-revalidate ===")
+    api = FakeAPIClient()
+    crawler = make_crawler(tmp_path, api)
+    key = "postcodes_io_E1 6AN"
+    crawler.cache.set("postcodes_io", key, {"status": "success", "data": {"result": "old"}}, ttl_days=180)
+    expire(crawler.cache, key)
+    
+    result = crawler.execute({"postcode": "E1 6AN"})
+    assert result["sources"]["postcodes_io"]["data"] == {"result": "old"}
+    
+    deadline = time.time() + 5
+    while crawler.cache.get("postcodes_io", key, ttl_days=180) is None and time.time() < deadline:
+        time.sleep(0.02)
+    assert crawler.cache.get("postcodes_io", key, ttl_days=180)["data"] == {"result": {"postcode": "E1 6AN"}}
+    assert len(api.calls) == 1
+    print("✓ Stale served, fresh value written by the background refresh")
+
+
+@pytest.mark.parametrize("strategy", ["use_cached_if_available", "return_null", "fail_request", None])
+def test_fallback_strategies_and_negative_cache(tmp_path, strategy):
+    """Failures are negative-cached and handled per fallback_strategy."""
+    api = FakeAPIClient(fail_for={"E1 6AN"})
+    crawler = make_crawler(tmp_path, api, fallback_strategy=strategy, stale_while_revalidate=False)
+    key = "postcodes_io_E1 6AN"
+    crawler.cache.set("postcodes_io", key, {"status": "success", "data": {"result": "old"}}, ttl_days=180)
+    expire(crawler.cache, key)
+    
+    for _ in range(3):
+        if strategy == "fail_request":
+            with pytest.raises(SourceFetchError):
+                crawler.execute({"postcode": "E1 6AN"})
+            continue
+        
+        source = crawler.execute({"postcode": "E1 6AN"})["sources"]["postcodes_io"]
+        if strategy == "use_cached_if_available":
+            assert source["data"] == {"result": "old"}
+        elif strategy == "return_null":
+            assert source["status"] == "null" and source["data"] is None
+        else:
+            assert source["status"] == "failed"
+    
+    # Only the first request reached the failing upstream
+    assert len(api.calls) == 1
+    print(f"✓ {strategy}: 3 requests, 1 upstream call")
+
+
+def test_empty_responses_use_negative_ttl(tmp_path):
+    """Empty upstream answers are cached, but only briefly."""
+    api = FakeAPIClient()
+    api.get = lambda url, params=None, headers=None: api.calls.append(params) or {"result": []}
+    crawler = make_crawler(tmp_path, api, negative_cache_ttl_seconds=60)
+    
+    crawler.execute({"postcode": "E1 6AN"})
+    crawler.execute({"postcode": "E1 6AN"})
+    assert len(api.calls) == 1
+    
+    conn = sqlite3.connect(crawler.cache.db_path)
+    ttl_days = conn.execute("SELECT ttl_days FROM cached_api_responses").fetchone()[0]
+    conn.close()
+    assert ttl_days == pytest.approx(60 / 86400)
+    print("✓ Empty response cached for 60s")
+
+
+def test_concurrent_misses_share_one_fetch(tmp_path):
+    """Threads missing the same key at once trigger one upstream call."""
+    print("\n=== Testing crawler request coalescing ===")
+    api = FakeAPIClient()
+    real_get = api.get
+    
+    def slow_get(url, params=None, headers=None):
+        time.sleep(0.2)
+        return real_get(url, params, headers)
+    
+    api.get = slow_get
+    crawlers = [make_crawler(tmp_path, api) for _ in range(6)]
+    results = []
+    threads = [threading.Thread(target=lambda c=c: results.append(c.execute({"postcode": "E1 6AN"})))
+               for c in crawlers]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert len(api.calls) == 1
+    assert all(r["sources"]["postcodes_io"]["status"] == "success" for r in results)
+    print("✓ 6 concurrent crawlers, 1 upstream call")
+
+
+def test_aexecute_runs_on_the_event_loop(tmp_path):
+    """aexecute uses the async client and coalesces concurrent misses."""
+    print("\n=== Testing CrawlerAgent.aexecute ===")
+    calls = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(str(request.url))
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"result": {"postcode": request.url.params["postcode"]}})
+    
+    async_client = AsyncAPIClient(transport=httpx.MockTransport(handler))
+    crawler = make_crawler(tmp_path, FakeAPIClient())
+    crawler.async_client = async_client
+    
+    async def run():
+        results = await asyncio.gather(*(crawler.aexecute({"postcode": "E1 6AN"}) for _ in range(5)))
+        await async_client.aclose()
+        return results
+    
+    results = asyncio.run(run())
+    
+    assert len(calls) == 1
+    assert all(r["sources"]["postcodes_io"]["data"]["result"]["postcode"] == "E1 6AN" for r in results)
+    assert crawler.cache.get("postcodes_io", "postcodes_io_E1 6AN", ttl_days=180) is not None
+    print("✓ 5 concurrent aexecute calls, 1 HTTP request, result cached")
+
+
+def make_multi_source_crawler(tmp_path, delays, **crawler_overrides):
+    """One REST source per entry in delays ({name: seconds}), all on one host."""
+    sources = [{
+        "name": name,
+        "type": "rest_api",
+        "url": f"https://slow.example/{name}",
+        "params_mapping": {"postcode": "{user_input.postcode}"},
+        "cache_ttl_days": 30
+    } for name in delays]
+    cache = CacheManager(db_path=str(tmp_path / "crawler.db"), memory_entries=0, sweep_interval_s=0)
+    return CrawlerAgent({"name": "Test Crawler", "data_sources": sources, **crawler_overrides}, cache)
+
+
+def test_sources_are_fetched_concurrently_with_timeouts(tmp_path):
+    """Latency is the slowest source, not the sum; a slow source times out to its fallback."""
+    print("\n=== Testing concurrent sources ===")
+    delays = {"land_registry": 0.2, "epc": 0.2, "postcodes": 0.2, "flood": 1.0}
+    
+    class SlowAPIClient:
+        def get(self, url, params=None, headers=None):
+            time.sleep(delays[url.rsplit("/", 1)[-1]])
+            return {"result": {"url": url}}
+    
+    crawler = make_multi_source_crawler(tmp_path, delays)
+    crawler.data_sources[3].update(timeout_seconds=0.4, fallback_strategy="return_null")
+    crawler.api_client = SlowAPIClient()
+    
+    start = time.monotonic()
+    result = crawler.execute({"postcode": "E1 6AN"})
+    elapsed = time.monotonic() - start
+    
+    assert list(result["sources"]) == list(delays)
+    assert all(result["sources"][name]["status"] == "success" for name in ("land_registry", "epc", "postcodes"))
+    assert result["sources"]["flood"]["status"] == "null"
+    assert elapsed < 0.7
+    
+    # The timed-out fetch completes in the background and is cached
+    time.sleep(0.8)
+    assert crawler.cache.get("flood", crawler._generate_cache_key(crawler.data_sources[3], {"postcode": "E1 6AN"}),
+                             ttl_days=30) is not None
+    print(f"✓ 4 sources in {elapsed:.2f}s (sequential: 1.6s), slow one fell back to null")
+    
+    (tmp_path / "serial").mkdir()
+    serial = make_multi_source_crawler(tmp_path / "serial", {"a": 0.1, "b": 0.1}, max_concurrency=1)
+    serial.api_client = SlowAPIClient()
+    delays.update(a=0.1, b=0.1)
+    start = time.monotonic()
+    serial.execute({"postcode": "E1 6AN"})
+    assert time.monotonic() - start >= 0.2
+    print("✓ max_concurrency=1 fetches one source at a time")
+
+
+def test_hung_source_gives_up_its_slot(tmp_path):
+    """With one slot, a hung source times out and the next source still runs in time."""
+    release = threading.Event()
+    
+    class HangingAPIClient:
+        def get(self, url, params=None, headers=None):
+            if url.endswith("/hung"):
+                release.wait(3)
+            return {"result": {"url": url}}
+    
+    crawler = make_multi_source_crawler(tmp_path, {"hung": 0, "quick": 0}, max_concurrency=1)
+    for source_config in crawler.data_sources:
+        source_config.update(timeout_seconds=0.5, fallback_strategy="return_null")
+    crawler.api_client = HangingAPIClient()
+    
+    start = time.monotonic()
+    result = crawler.execute({"postcode": "E1 6AN"})
+    elapsed = time.monotonic() - start
+    release.set()
+    
+    assert result["sources"]["hung"]["status"] == "null"
+    assert result["sources"]["quick"]["status"] == "success"
+    assert elapsed < 0.8
+    print(f"✓ Hung source timed out, next source ran: {elapsed:.2f}s")
+
+
+def test_aexecute_fetches_sources_concurrently(tmp_path):
+    """aexecute overlaps sources and applies per-source timeouts the same way."""
+    delays = {"land_registry": 0.2, "epc": 0.2, "postcodes": 0.2, "flood": 1.0}
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delays[request.url.path.strip("/")])
+        return httpx.Response(200, json={"result": {"path": request.url.path}})
+    
+    crawler = make_multi_source_crawler(tmp_path, delays)
+    crawler.data_sources[3]["timeout_seconds"] = 0.4
+    async_client = AsyncAPIClient(transport=httpx.MockTransport(handler))
+    crawler.async_client = async_client
+    
+    async def run():
+        start = time.monotonic()
+        result = await crawler.aexecute({"postcode": "E1 6AN"})
+        elapsed = time.monotonic() - start
+        await asyncio.sleep(0.8)
+        await async_client.aclose()
+        return result, elapsed
+    
+    result, elapsed = asyncio.run(run())
+    
+    assert elapsed < 0.7
+    assert result["sources"]["epc"]["status"] == "success"
+    assert result["sources"]["flood"] == {"error": "timed out after 0.4s", "status": "failed"}
+    print(f"✓ aexecute: 4 sources in {elapsed:.2f}s, timeout reported as failed")
@@ -0,0 +1,42 @@
+"""
+Tests for background explanation streaming.
+"""
+
+import asyncio
+
+from backend.explanations import ExplanationStore
+
+
+class FakeAgent:
+    """Stands in for MLExecutionAgent's streaming API."""
+    
+    async def astream_explanation(self, features, result):
+        for token in ["This ", "flat ", "is ", "great."]:
+            yield token
+    
+    def template_explanation(self, features, result):
+        return "template"
+
+
+def test_explanation_stream_replays_and_completes():
+    """Followers get every token, even when they attach after generation."""
+    print("\n=== Testing ExplanationStore ===")
+    
+    finished = []
+    
+    async def run():
+        store = ExplanationStore(FakeAgent())
+        job_id = store.start({}, {"prediction": 1.0}, on_done=finished.append)
+        job = store.get(job_id)
+        
+        live = [token async for token in job.follow()]
+        late = [token async for token in job.follow()]
+        return job, live, late
+    
+    job, live, late = asyncio.run(run())
+    
+    assert "".join(live) == "This flat is great."
+    assert live == late
+    assert job.done
+    assert finished == ["This flat is great."]
+    print("✓ Tokens streamed, replayed and completion callback fired")
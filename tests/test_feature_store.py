@@ -0,0 +1,55 @@
+"""
+Tests for the serving-side feature store.
+"""
+
+from types import SimpleNamespace
+
+from agents.feature_store import FeatureStore, postcode_sector, save_feature_store
+from conftest import make_training_frame
+
+
+def test_feature_store_round_trip(tmp_path):
+    """Training tables are reproduced by serving lookups."""
+    print("\n=== Testing FeatureStore ===")
+    
+    df = make_training_frame()
+    save_feature_store(df, str(tmp_path / "features"), "house_test_v1")
+    store = FeatureStore(str(tmp_path / "features"))
+    
+    features = store.enrich({"postcode_sector": "M1", "property_type": "T"})
+    
+    assert features["town_city"] == "MANCHESTER"
+    assert features["county"] == "GREATER MANCHESTER"
+    assert features["sector_median_price"] == df.loc[df.postcode_sector == "M1", "price"].median()
+    assert features["town_median_price"] == df.loc[df.town_city == "MANCHESTER", "price"].median()
+    assert features["property_type_median"] == df.loc[df.property_type == "T", "price"].median()
+    print("✓ Known sector enriched from stored tables")
+    
+    unknown = store.enrich({"postcode_sector": "ZZ9", "property_type": "T"})
+    assert unknown["town_city"] == "UNKNOWN"
+    assert unknown["sector_median_price"] == store.defaults["sector_median_price"]
+    print("✓ Unknown sector falls back to training defaults")
+    
+    geography = store.geography()
+    assert geography.loc["SW1", "town_city"] == "LONDON"
+    assert set(store.type_medians()) == {"D", "S", "T", "F"}
+
+
+def test_postcodes_key_sectors_as_in_training(tmp_path):
+    """Serving derives the same sector as training, so lookups hit stored medians."""
+    from backend.prediction_service import prediction_service
+    
+    assert postcode_sector("SW1A 1AA") == "SW1"
+    assert postcode_sector(" ec1a 1bb") == "EC1"
+    assert postcode_sector("M1 1AE") == "M1"
+    assert postcode_sector("") == postcode_sector(None) == "UNKNOWN"
+    
+    df = make_training_frame()
+    save_feature_store(df, str(tmp_path / "features"), "house_test_v1")
+    model = SimpleNamespace(feature_store=FeatureStore(str(tmp_path / "features")))
+    
+    features = prediction_service._build_features({"postcode": "SW1A 1AA", "property_type": "Flat"}, model)
+    assert features["postcode_sector"] == "SW1"
+    assert features["town_city"] == "LONDON"
+    assert features["sector_median_price"] == df.loc[df.postcode_sector == "SW1", "price"].median()
+    print("✓ SW1A 1AA -> SW1 with that sector's stored medians")
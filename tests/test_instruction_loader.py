@@ -0,0 +1,108 @@
+"""
+Tests for compiled, cached instruction plans.
+"""
+
+import json
+import os
+import shutil
+
+import pytest
+
+from agents.crawler_agent import CrawlerAgent
+from agents.source_scheduler import SourceScheduler
+from schemas import PostcodeData
+from utils.cache_manager import CacheManager
+from utils.instruction_loader import InstructionLoader
+from utils.instruction_plan import InstructionPlan, Template
+
+
+def copy_instructions(tmp_path, model_type="house_general"):
+    target = tmp_path / f"{model_type}_instructions.json"
+    shutil.copy(f"config/instructions/{model_type}_instructions.json", target)
+    return target
+
+
+def test_plans_are_cached_until_the_file_changes(tmp_path):
+    """One parse per file version; an edit is picked up on the next load."""
+    print("\n=== Testing InstructionLoader plan cache ===")
+    path = copy_instructions(tmp_path)
+    loader = InstructionLoader(config_dir=str(tmp_path))
+    
+    plan = loader.load("house_general")
+    assert isinstance(plan, InstructionPlan)
+    assert InstructionLoader(config_dir=str(tmp_path)).load("house_general") is plan
+    assert loader.get_crawler_configs("house_general")[0] is plan["crawler_1"]
+    assert loader.get_feature_config("house_general") is plan.feature_config
+    print("✓ load, get_crawler_configs and get_feature_config share one compiled plan")
+    
+    instructions = json.loads(path.read_text())
+    instructions["crawler_1"]["name"] = "Edited Crawler"
+    path.write_text(json.dumps(instructions))
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    
+    edited = loader.load("house_general")
+    assert edited is not plan
+    assert edited["crawler_1"]["name"] == "Edited Crawler"
+    print("✓ Edited file recompiled")
+
+
+def test_plan_is_compiled_and_read_only(tmp_path):
+    """Templates pre-parsed, derived inputs, schemas and types resolved; nothing mutable."""
+    copy_instructions(tmp_path)
+    plan = InstructionLoader(config_dir=str(tmp_path)).load("house_general")
+    
+    police = plan["crawler_2"]["data_sources"][0]
+    assert police.derived == ("date_last_month", "latitude", "longitude")
+    postcodes = plan.crawlers[0].sources[2]
+    assert postcodes.schema is PostcodeData
+    assert plan.crawlers[1].sources[1].schema is None  # FloodRiskData not defined yet
+    assert all(source.supported for crawler in plan.crawlers for source in crawler.sources)
+    assert plan.crawlers[2].sources[1].upstream == "crawler_1.land_registry_ppd"
+    
+    with pytest.raises(TypeError):
+        police["params_mapping"]["lat"] = "0"
+    with pytest.raises(TypeError):
+        plan["crawler_1"]["data_sources"][0] = {}
+    
+    template = Template.of("{user_input.postcode}/{derived.latitude}/{user_input.missing}")
+    assert Template.of("{user_input.postcode}/{derived.latitude}/{user_input.missing}") is template
+    assert template.render({"postcode": "E1 6AN", "derived": {"latitude": 51.5}}) == \
+        "E1 6AN/51.5/{user_input.missing}"
+    assert Template.of(100).render({}) == 100
+    print("✓ Plan is frozen; templates render without scanning user_input")
+
+
+def test_invalid_instructions_are_rejected(tmp_path):
+    path = copy_instructions(tmp_path)
+    loader = InstructionLoader(config_dir=str(tmp_path))
+    instructions = json.loads(path.read_text())
+    
+    instructions["crawler_2"]["data_sources"].append(dict(instructions["crawler_2"]["data_sources"][0]))
+    path.write_text(json.dumps(instructions))
+    with pytest.raises(ValueError, match="duplicate data source names"):
+        loader.load("house_general")
+    
+    del instructions["crawler_3"]
+    path.write_text(json.dumps(instructions))
+    with pytest.raises(ValueError, match="crawler_3"):
+        loader.load("house_general")
+    print("✓ Duplicate sources and missing crawlers rejected")
+
+
+def test_crawlers_and_scheduler_run_from_plans(tmp_path):
+    """Plans drop in where dict configs were used."""
+    copy_instructions(tmp_path)
+    crawler_configs = InstructionLoader(config_dir=str(tmp_path)).get_crawler_configs("house_general")
+    cache = CacheManager(db_path=str(tmp_path / "plans.db"), memory_entries=0, sweep_interval_s=0)
+    
+    scheduler = SourceScheduler(crawler_configs, cache)
+    assert scheduler.dependencies()["crawler_3.comparable_sales"] == \
+        ["crawler_1.land_registry_ppd", "crawler_1.postcodes_io"]
+    
+    crawler = CrawlerAgent(crawler_configs[1], cache)
+    url, params, headers = crawler._build_request(
+        crawler.data_sources[0], {"postcode": "E1 6AN", "derived": {"latitude": 51.52, "longitude": -0.07}})
+    assert url == "https://data.police.uk/api/crimes-street/all-crime"
+    assert params["lat"] == "51.52" and params["lng"] == "-0.07"
+    print("✓ Scheduler and CrawlerAgent accept compiled plans")
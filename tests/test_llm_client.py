@@ -0,0 +1,100 @@
+"""
+Tests for the async LLM client.
+"""
+
+import asyncio
+import json
+import time
+
+import httpx
+
+from utils.llm_client import LLMClient
+
+
+def _ollama(delay: float = 0.0):
+    """Mock Ollama /api/generate answering in both stream and non-stream mode."""
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(delay)
+        body = json.loads(request.content)
+        if body["stream"]:
+            lines = [{"response": t, "done": False} for t in ["Nice ", "flat."]]
+            lines.append({"response": "", "done": True})
+            return httpx.Response(200, text="\n".join(json.dumps(l) for l in lines))
+        return httpx.Response(200, json={"response": " Nice flat. ", "done": True})
+    return httpx.MockTransport(handler)
+
+
+def test_generate_and_stream():
+    """Complete and streamed generations over the pooled client."""
+    print("\n=== Testing LLMClient ===")
+    client = LLMClient(base_url="http://ollama", transport=_ollama())
+    
+    async def run():
+        text = await client.generate("prompt")
+        tokens = [token async for token in client.stream("prompt")]
+        await client.aclose()
+        return text, tokens
+    
+    text, tokens = asyncio.run(run())
+    assert text == "Nice flat."
+    assert tokens == ["Nice ", "flat."]
+    print("✓ Generate and stream work")
+
+
+def test_slow_llm_times_out_without_blocking_the_loop():
+    """A stalled LLM call hits its deadline while other coroutines keep running."""
+    client = LLMClient(base_url="http://ollama", transport=_ollama(delay=5.0))
+    
+    async def run():
+        ticks = 0
+        
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+        
+        task = asyncio.create_task(ticker())
+        start = time.perf_counter()
+        try:
+            await client.generate("prompt", timeout=0.2)
+            timed_out = False
+        except TimeoutError:
+            timed_out = True
+        elapsed = time.perf_counter() - start
+        task.cancel()
+        await client.aclose()
+        return timed_out, elapsed, ticks
+    
+    timed_out, elapsed, ticks = asyncio.run(run())
+    assert timed_out
+    assert elapsed < 1.0
+    assert ticks >= 5
+    print("✓ Deadline enforced and event loop stayed responsive")
+
+
+def test_new_loop_closes_the_previous_client():
+    """Moving to another event loop closes the client the old loop left behind."""
+    client = LLMClient(base_url="http://ollama", transport=_ollama())
+    
+    old_loop = asyncio.new_event_loop()
+    try:
+        old_loop.run_until_complete(client.generate("prompt"))
+        first = client._client
+        
+        async def run():
+            await client.generate("prompt")
+            current = client._client
+            await client.aclose()
+            return current
+        
+        second = asyncio.run(run())
+        deadline = time.time() + 5
+        while not first.is_closed and time.time() < deadline:
+            time.sleep(0.01)
+        assert second is not first and first.is_closed
+        print("✓ Stopped loop's client closed before replacing it")
+    finally:
+        while old_loop.is_running():
+            time.sleep(0.01)
+        old_loop.close()
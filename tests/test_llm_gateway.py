@@ -0,0 +1,75 @@
+"""
+Tests for LLM admission control and latency budgets.
+"""
+
+import asyncio
+import time
+
+import httpx
+
+from utils.llm_client import LLMClient
+from utils.llm_gateway import LLMGateway
+
+
+class SlowOllama:
+    """Mock Ollama that takes `delay` seconds per generation and tracks concurrency."""
+    
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.running = 0
+        self.peak = 0
+    
+    async def handler(self, request: httpx.Request) -> httpx.Response:
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.running -= 1
+        return httpx.Response(200, json={"response": "Late but lovely.", "done": True})
+    
+    def client(self) -> LLMClient:
+        return LLMClient(base_url="http://ollama", transport=httpx.MockTransport(self.handler))
+
+
+def test_over_budget_returns_immediately_and_caches_late_result():
+    """The caller gets None at the deadline; the text still arrives for the cache."""
+    print("\n=== Testing LLMGateway budgets ===")
+    ollama = SlowOllama(delay=0.3)
+    late = []
+    
+    async def run():
+        gateway = LLMGateway(ollama.client(), max_concurrency=1)
+        start = time.perf_counter()
+        text = await gateway.generate("prompt", budget_s=0.05, on_late_result=late.append)
+        elapsed = time.perf_counter() - start
+        
+        await asyncio.sleep(0.5)
+        return gateway, text, elapsed
+    
+    gateway, text, elapsed = asyncio.run(run())
+    
+    assert text is None
+    assert elapsed < 0.2
+    assert late == ["Late but lovely."]
+    assert gateway.over_budget == 1 and gateway.late_results == 1
+    assert gateway.running == 0
+    print("✓ Template fallback at the deadline, late result delivered")
+
+
+def test_concurrency_limit_and_bounded_queue():
+    """Only max_concurrency calls reach the server; excess callers are shed."""
+    ollama = SlowOllama(delay=0.2)
+    
+    async def run():
+        gateway = LLMGateway(ollama.client(), max_concurrency=1, max_queue=1, max_wait_s=1.0)
+        results = await asyncio.gather(*(gateway.generate("prompt", budget_s=2.0) for _ in range(3)))
+        return gateway, results
+    
+    gateway, results = asyncio.run(run())
+    
+    assert ollama.peak == 1
+    assert results.count("Late but lovely.") == 2
+    assert results.count(None) == 1
+    assert gateway.rejected == 1 and gateway.completed == 2
+    print("✓ One generation at a time, one queued, one rejected")
@@ -0,0 +1,115 @@
+"""
+Tests for the ML execution agent.
+"""
+
+import asyncio
+
+import numpy as np
+
+from agents.ml_execution_agent import MLExecutionAgent
+from conftest import FEATURES
+
+
+def test_predict_batch_matches_single_predictions(tiny_house_model):
+    """One vectorized call gives the same numbers as per-row calls."""
+    print("\n=== Testing MLExecutionAgent.predict_batch ===")
+    
+    agent = MLExecutionAgent(tiny_house_model["path"])
+    agent.load_model()
+    
+    rows = tiny_house_model["frame"][FEATURES].head(25).to_dict("records")
+    batch = agent.predict_batch(rows)
+    single = [agent.model.predict([list(row.values())])[0] for row in rows]
+    
+    assert len(batch) == len(rows)
+    assert np.allclose([r["prediction"] for r in batch], single)
+    assert all(r["explanation"] is None for r in batch)
+    assert agent.predict_batch([]) == []
+    print("✓ Batch predictions match single-row predictions")
+
+
+def test_explanation_cache_reuses_similar_context():
+    """Same context within a price bucket reuses the text with the new price."""
+    from agents.explanation_cache import ExplanationCache
+    
+    cache = ExplanationCache(price_bucket_pct=5)
+    features = {"postcode_sector": "sw1", "town_city": "LONDON", "property_type": "F",
+                "duration": "L", "sector_median_price": 600000}
+    top = [("sector_median_price", 40.0), ("property_type", 20.0)]
+    
+    cache.set(features, 500000, top, "Your flat is worth about £500,000.")
+    
+    assert cache.get(features, 501000, top) == "Your flat is worth about £501,000."
+    assert cache.get(features, 800000, top) is None
+    assert cache.get({**features, "property_type": "D"}, 500000, top) is None
+    print("✓ Explanation cache hits on normalized context")
+
+
+def test_prediction_grid_matches_live_model(tiny_house_model, tmp_path):
+    """Grid answers equal live predictions; unseen sectors fall back to the model."""
+    from agents.prediction_grid import build_grid, save_grid
+    
+    agent = MLExecutionAgent(tiny_house_model["path"])
+    agent.load_model()
+    
+    df = tiny_house_model["frame"]
+    geography = df.groupby("postcode_sector").agg(
+        town_city=("town_city", "first"),
+        county=("county", "first"),
+        sector_median_price=("sector_median_price", "first"),
+        town_median_price=("town_median_price", "first")
+    )
+    type_medians = df.groupby("property_type")["property_type_median"].first().to_dict()
+    
+    grid = build_grid(agent.model, FEATURES, geography, type_medians, chunk_size=2)
+    save_grid(grid, geography.index.tolist(), str(tmp_path / "grid"), "house_test_v1")
+    
+    rows = df[FEATURES].head(20).to_dict("records")
+    unseen = {**rows[0], "postcode_sector": "ZZ9"}
+    live = [r["prediction"] for r in agent.predict_batch(rows + [unseen])]
+    
+    agent.load_grid(str(tmp_path / "grid"))
+    served = [r["prediction"] for r in agent.predict_batch(rows + [unseen])]
+    
+    assert np.allclose(served, live, rtol=1e-5)
+    assert agent.grid.hits == 20 and agent.grid.misses == 1
+    print("✓ Grid lookups match the live model")
+
+
+def test_shap_values_sum_to_prediction(tiny_house_model):
+    """Batched SHAP attribution is additive and cached per feature vector."""
+    agent = MLExecutionAgent(tiny_house_model["path"])
+    agent.load_model()
+    
+    rows = tiny_house_model["frame"][FEATURES].head(5).to_dict("records")
+    contributions = agent.shap_values(rows)
+    predictions = [r["prediction"] for r in agent.predict_batch(rows)]
+    
+    base = agent._shap_explainer.expected_value
+    assert np.allclose([sum(c.values()) + base for c in contributions], predictions)
+    assert agent.shap_values(rows) == contributions
+    assert agent._shap_cache.hits == 5
+    assert agent.top_factors and len(agent.top_factors) == 5
+    print("✓ SHAP contributions add up to each prediction")
+
+
+def test_explanation_cache_async_reads_persistent_tier(tmp_path):
+    """aset/aget round-trip through SQLite once the in-memory entry is gone."""
+    from agents.explanation_cache import ExplanationCache
+    from utils.cache_manager import CacheManager
+    
+    cache_manager = CacheManager(db_path=str(tmp_path / "explanations.db"), memory_entries=0,
+                                 sweep_interval_s=0)
+    cache = ExplanationCache(cache_manager=cache_manager)
+    features = {"postcode_sector": "SW1", "town_city": "LONDON", "property_type": "F",
+                "duration": "L", "sector_median_price": 600000}
+    top = [("sector_median_price", 40.0)]
+    
+    async def round_trip():
+        await cache.aset(features, 500000, top, "Your flat is worth about £500,000.")
+        cache.memory.clear()
+        return await cache.aget(features, 500000, top)
+    
+    assert asyncio.run(round_trip()) == "Your flat is worth about £500,000."
+    assert cache.get(features, 500000, top) == "Your flat is worth about £500,000."
+    print("✓ Async explanation cache reaches the persistent tier")
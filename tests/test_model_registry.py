@@ -0,0 +1,127 @@
+"""
+Tests for the model registry.
+"""
+
+import asyncio
+import shutil
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.model_registry import ModelRegistry
+from conftest import FEATURES
+
+
+def _models_dir(tiny_house_model, tmp_path, versions):
+    """Copy the test model into a models dir under several version names."""
+    source = Path(tiny_house_model["path"])
+    models = tmp_path / "models"
+    models.mkdir()
+    for version in versions:
+        shutil.copy(source, models / f"{version}.cbm")
+        shutil.copy(source.with_name(f"{source.stem}_metadata.json"), models / f"{version}_metadata.json")
+    return models
+
+
+def test_background_load_and_atomic_swap(tiny_house_model, tmp_path):
+    """A new version loads off-thread; in-flight requests finish on the old one."""
+    print("\n=== Testing ModelRegistry hot swap ===")
+    models = _models_dir(tiny_house_model, tmp_path, ["house_a", "house_b"])
+    (models / "orphan.cbm").write_bytes(b"")
+    
+    registry = ModelRegistry(str(models))
+    assert set(registry.discover()) == {"house_a", "house_b"}
+    
+    registry.load("house_a")
+    registry.activate("house_a")
+    
+    rows = tiny_house_model["frame"][FEATURES].head(5).to_dict("records")
+    
+    async def swap_mid_request():
+        held = registry.route("SW1A 1AA")
+        pending = asyncio.ensure_future(held.batcher.submit(rows[0]))
+        
+        registry.load_in_background("house_b", activate=True).join()
+        assert registry.active.version == "house_b"
+        
+        # The request that started on house_a still completes there
+        result = await pending
+        return held.version, result
+    
+    held_version, result = asyncio.run(swap_mid_request())
+    assert held_version == "house_a"
+    assert result["prediction"] > 0
+    
+    statuses = {v["version"]: v for v in registry.list_versions()}
+    assert statuses["house_b"]["active"] and statuses["house_a"]["status"] == "loaded"
+    print("✓ Swapped versions without dropping the in-flight request")
+
+
+def test_traffic_split_is_sticky_and_weighted(tiny_house_model, tmp_path):
+    """Routing keys always map to the same version, in proportion to weights."""
+    models = _models_dir(tiny_house_model, tmp_path, ["house_a", "house_b"])
+    registry = ModelRegistry(str(models))
+    for version in ["house_a", "house_b"]:
+        registry.load(version)
+    registry.activate("house_a")
+    
+    registry.set_routing({"house_a": 0.75, "house_b": 0.25})
+    keys = [f"SW{i} 1AA" for i in range(2000)]
+    routed = [registry.route(key).version for key in keys]
+    
+    assert routed == [registry.route(key).version for key in keys]
+    assert 0.2 < routed.count("house_b") / len(routed) < 0.3
+    
+    registry.set_routing({})
+    assert {registry.route(key).version for key in keys[:50]} == {"house_a"}
+    print("✓ Traffic split is sticky per key and follows the weights")
+
+
+def test_shadow_scoring_records_stats(tiny_house_model, tmp_path):
+    """Shadow traffic is scored in the background and compared to the primary."""
+    models = _models_dir(tiny_house_model, tmp_path, ["house_a", "house_b"])
+    registry = ModelRegistry(str(models))
+    primary = registry.load("house_a")
+    registry.load("house_b")
+    registry.activate("house_a")
+    registry.set_routing(shadow="house_b")
+    
+    rows = tiny_house_model["frame"][FEATURES].head(10).to_dict("records")
+    predictions = [r["prediction"] for r in primary.agent.predict_batch(rows)]
+    built_for = []
+    
+    def build_features(row, model_version):
+        built_for.append(model_version.version)
+        return row
+    
+    registry.shadow_score(primary, rows, predictions, build_features)
+    
+    deadline = time.time() + 10
+    while registry.versions["house_b"].shadow_latency.calls == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    
+    stats = registry.stats()["versions"]["house_b"]["shadow"]
+    assert stats["latency"]["items"] == 10
+    assert np.isclose(stats["mean_abs_diff_pct"], 0.0)
+    assert built_for == ["house_b"] * 10
+    print("✓ Shadow version scored and compared")
+
+
+def test_watcher_restarts_after_stop(tmp_path):
+    """stop_watching ends the thread, and a later start_watching polls again."""
+    registry = ModelRegistry(str(tmp_path))
+    
+    registry.start_watching(0.01)
+    first = registry._watcher
+    registry.stop_watching()
+    assert not first.is_alive() and registry._watcher is None
+    
+    registry.start_watching(0.01)
+    second = registry._watcher
+    time.sleep(0.05)
+    assert second is not first and second.is_alive()
+    
+    registry.stop_watching()
+    assert not second.is_alive()
+    print("✓ Directory watcher can be stopped and restarted")
@@ -0,0 +1,138 @@
+"""
+Tests for per-host rate limiting of API calls.
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+from agents.crawler_agent import CrawlerAgent
+from utils.api_client import APIClient, AsyncAPIClient
+from utils.cache_manager import CacheManager
+from utils.rate_limiter import RateLimited, RateLimiter, parse_retry_after
+
+
+def test_token_bucket_paces_sync_and_async_callers():
+    """After the burst, requests to a host go out at the configured rate."""
+    print("\n=== Testing RateLimiter pacing ===")
+    limiter = RateLimiter()
+    limiter.configure("https://slow.example/api", requests_per_second=20, burst=2)
+    
+    start = time.monotonic()
+    for _ in range(6):
+        limiter.acquire("https://slow.example/api/x")
+    sync_elapsed = time.monotonic() - start
+    
+    async def run():
+        start = time.monotonic()
+        await asyncio.gather(*(limiter.aacquire("https://slow.example/y") for _ in range(4)))
+        await limiter.aacquire("https://other.example/z")
+        return time.monotonic() - start
+    
+    async_elapsed = asyncio.run(run())
+    
+    # 4 requests beyond the burst at 20/s; then a drained bucket, 4 more
+    assert 0.15 <= sync_elapsed < 0.5
+    assert 0.15 <= async_elapsed < 0.5
+    assert limiter.stats()["throttled"] >= 8
+    print(f"✓ Sync {sync_elapsed:.2f}s, async {async_elapsed:.2f}s for 4 throttled requests each")
+
+
+def test_configure_keeps_the_strictest_limit():
+    """Two sources on one host: the lower rate and burst win, repeats are no-ops."""
+    limiter = RateLimiter()
+    limiter.configure("https://api.postcodes.io/postcodes/{postcode}", 10, 20)
+    limiter.configure("https://api.postcodes.io/outcodes", 5)
+    limiter.configure("https://api.postcodes.io/postcodes/{postcode}", 10, 20)
+    
+    assert limiter.stats()["hosts"]["api.postcodes.io"] == {"rate": 5, "burst": 5}
+    assert parse_retry_after("3") == 3.0
+    assert 8 <= parse_retry_after(formatdate(time.time() + 10, usegmt=True)) <= 10
+    assert parse_retry_after("soon") is None
+    print("✓ Strictest limit kept, Retry-After parsed as seconds and HTTP-date")
+
+
+def test_retry_after_pauses_the_host_instead_of_backing_off():
+    """A 429 with Retry-After is retried after exactly that pause, sync and async."""
+    print("\n=== Testing Retry-After handling ===")
+    
+    def responses():
+        calls = []
+        
+        def respond(request: httpx.Request) -> httpx.Response:
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                return httpx.Response(429, headers={"Retry-After": "0.3"})
+            return httpx.Response(200, json={"ok": True})
+        return calls, respond
+    
+    calls, respond = responses()
+    client = APIClient(rate_limiter=RateLimiter(), transport=httpx.MockTransport(respond))
+    assert client.get("https://limited.example/a") == {"ok": True}
+    assert len(calls) == 2
+    # Retry-After honoured, exponential backoff (2s minimum) skipped
+    assert 0.25 <= calls[1] - calls[0] < 1.5
+    
+    async_calls, async_respond = responses()
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        return async_respond(request)
+    
+    limiter = RateLimiter()
+    async_client = AsyncAPIClient(rate_limiter=limiter, transport=httpx.MockTransport(handler))
+    
+    async def run():
+        result = await async_client.get("https://limited.example/b")
+        await async_client.aclose()
+        return result
+    
+    assert asyncio.run(run()) == {"ok": True}
+    assert 0.25 <= async_calls[1] - async_calls[0] < 1.5
+    assert limiter.stats()["penalties"] == 1
+    print(f"✓ Retried after {calls[1] - calls[0]:.2f}s (sync), "
+          f"{async_calls[1] - async_calls[0]:.2f}s (async)")
+
+
+def test_long_retry_after_and_client_errors_fail_fast():
+    """Pauses beyond max_wait_s raise RateLimited; a 404 isn't retried."""
+    calls = []
+    
+    def respond(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/busy":
+            return httpx.Response(429, headers={"Retry-After": "120"})
+        return httpx.Response(404)
+    
+    client = APIClient(rate_limiter=RateLimiter(max_wait_s=1),
+                       transport=httpx.MockTransport(respond))
+    
+    start = time.monotonic()
+    with pytest.raises(RateLimited):
+        client.get("https://limited.example/busy")
+    with pytest.raises(httpx.HTTPStatusError):
+        client.get("https://other.example/missing")
+    
+    assert calls == ["/busy", "/missing"]
+    assert time.monotonic() - start < 1
+    print("✓ 2 minute Retry-After and 404 failed without retrying")
+
+
+def test_crawler_registers_source_rate_limits(tmp_path):
+    """A source's "rate_limit" configures its host on the client's limiter."""
+    limiter = RateLimiter()
+    source = {
+        "name": "police_uk_crime",
+        "type": "rest_api",
+        "url": "https://data.police.uk/api/crimes-street/all-crime",
+        "rate_limit": {"requests_per_second": 15, "burst": 30}
+    }
+    cache = CacheManager(db_path=str(tmp_path / "crawler.db"), memory_entries=0, sweep_interval_s=0)
+    CrawlerAgent({"name": "Test Crawler", "data_sources": [source]}, cache,
+                 api_client=APIClient(rate_limiter=limiter),
+                 async_client=AsyncAPIClient(rate_limiter=limiter))
+    
+    assert limiter.stats()["hosts"] == {"data.police.uk": {"rate": 15, "burst": 30}}
+    print("✓ data.police.uk limited to 15/s, burst 30")
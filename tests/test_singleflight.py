@@ -0,0 +1,64 @@
+"""
+Tests for SingleFlight request coalescing.
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from utils.singleflight import SingleFlight
+
+
+def test_threads_and_tasks_share_one_execution():
+    """Threads and coroutines joining the same key run the function once."""
+    print("\n=== Testing SingleFlight ===")
+    flights = SingleFlight()
+    calls = []
+    
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"postcode": "E1 6AN"}
+    
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.do("E1", slow_fetch)))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    time.sleep(0.05)
+    
+    async def tasks():
+        return await asyncio.gather(*(flights.do_async("E1", slow_fetch) for _ in range(5)))
+    
+    results.extend(asyncio.run(tasks()))
+    for t in threads:
+        t.join()
+    
+    assert len(calls) == 1
+    assert results == [{"postcode": "E1 6AN"}] * 10
+    assert flights.in_flight() == 0
+    print("✓ 5 threads + 5 tasks, 1 execution")
+
+
+def test_errors_are_shared_and_not_cached():
+    """Waiters see the leader's exception; the next call runs again."""
+    flights = SingleFlight()
+    
+    async def failing():
+        await asyncio.sleep(0.05)
+        raise ConnectionError("upstream down")
+    
+    async def run():
+        return await asyncio.gather(*(flights.do_async("k", failing) for _ in range(3)),
+                                    return_exceptions=True)
+    
+    errors = asyncio.run(run())
+    assert all(isinstance(e, ConnectionError) for e in errors)
+    assert flights.leaders == 1 and flights.followers == 2
+    
+    with pytest.raises(ValueError):
+        flights.do("k", lambda: (_ for _ in ()).throw(ValueError("again")))
+    assert flights.leaders == 2
+    print("✓ Exceptions shared, flight cleared afterwards")
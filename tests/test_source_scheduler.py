@@ -0,0 +1,126 @@
+"""
+Tests for dependency-aware scheduling of instruction data sources.
+"""
+
+import asyncio
+import json
+import time
+from datetime import date
+
+import httpx
+import pytest
+
+from agents.crawler_agent import SourceFetchError
+from agents.source_scheduler import SourceScheduler, computed_value
+from utils.api_client import AsyncAPIClient
+from utils.cache_manager import CacheManager
+from utils.rate_limiter import RateLimiter
+
+POSTCODE = {"latitude": 51.5203, "longitude": -0.0712, "region": "London", "postcode_sector": "E1 6"}
+
+
+def load_house_crawlers():
+    with open("config/instructions/house_general_instructions.json") as f:
+        instructions = json.load(f)
+    return [instructions["crawler_1"], instructions["crawler_2"], instructions["crawler_3"]]
+
+
+def make_cache(tmp_path):
+    return CacheManager(db_path=str(tmp_path / "scheduler.db"), memory_entries=0, sweep_interval_s=0)
+
+
+def make_scheduler(tmp_path, handler):
+    scheduler = SourceScheduler(load_house_crawlers(), make_cache(tmp_path))
+    client = AsyncAPIClient(rate_limiter=RateLimiter(), transport=httpx.MockTransport(handler))
+    for crawler in scheduler.crawlers.values():
+        crawler.async_client = client
+    return scheduler, client
+
+
+def test_builds_dag_from_instructions(tmp_path):
+    """Derived placeholders and "source" references become edges."""
+    print("\n=== Testing SourceScheduler DAG ===")
+    scheduler = SourceScheduler(load_house_crawlers(), make_cache(tmp_path))
+    deps = scheduler.dependencies()
+    
+    assert deps["crawler_2.police_uk_crime"] == ["crawler_1.postcodes_io"]
+    assert deps["crawler_3.comparable_sales"] == ["crawler_1.land_registry_ppd", "crawler_1.postcodes_io"]
+    assert deps["crawler_1.epc_data"] == []
+    assert len(scheduler.critical_path()) == 2
+    
+    assert computed_value("date_last_month", date(2024, 3, 31)) == "2024-02"
+    assert computed_value("date_minus_1_months", date(2024, 3, 31)) == "2024-02-29"
+    assert computed_value("date_minus_12_months", date(2024, 1, 15)) == "2023-01-15"
+    assert computed_value("latitude", date(2024, 1, 15)) is None
+    print(f"✓ Critical path: {' -> '.join(scheduler.critical_path())}")
+    
+    cyclic = [{"name": "c", "data_sources": [
+        {"name": "a", "type": "rest_api", "params_mapping": {"x": "{derived.y}"}, "output_fields": ["x"]},
+        {"name": "b", "type": "rest_api", "params_mapping": {"y": "{derived.x}"}, "output_fields": ["y"]}
+    ]}]
+    with pytest.raises(ValueError, match="cycle"):
+        SourceScheduler(cyclic, make_cache(tmp_path))
+    print("✓ Dependency cycle rejected")
+
+
+def test_runs_sources_as_soon_as_inputs_resolve(tmp_path):
+    """Latency follows the critical path; derived values and upstream results flow through."""
+    requests = []
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.1)
+        if request.url.host == "api.postcodes.io":
+            return httpx.Response(200, json={"status": 200, "result": POSTCODE})
+        if request.url.host == "landregistry.data.gov.uk":
+            return httpx.Response(200, json={"result": {"items": [{"pricePaid": 450000}]}})
+        return httpx.Response(200, json={"items": [{"label": request.url.host}]})
+    
+    scheduler, client = make_scheduler(tmp_path, handler)
+    
+    async def run():
+        start = time.monotonic()
+        results = await scheduler.run({"postcode": "E1 6AN", "property_type": "F"})
+        elapsed = time.monotonic() - start
+        await client.aclose()
+        return results, elapsed
+    
+    results, elapsed = asyncio.run(run())
+    
+    # 5 HTTP sources of 0.1s each; the longest chain is 2 deep
+    assert elapsed < 0.35
+    hosts = [r.url.host for r in requests]
+    assert hosts.count("landregistry.data.gov.uk") == 1
+    
+    police = next(r for r in requests if r.url.host == "data.police.uk")
+    assert police.url.params["lat"] == "51.5203"
+    assert police.url.params["date"] == computed_value("date_last_month", date.today())
+    
+    comparables = results[2]["sources"]["comparable_sales"]
+    assert comparables["data"] == results[0]["sources"]["land_registry_ppd"]["data"]
+    assert comparables["filter"]["postcode_sector"] == "E1 6"
+    assert [r["crawler_name"] for r in results] == [c["name"] for c in load_house_crawlers()]
+    print(f"✓ 7 sources in {elapsed:.2f}s, police.uk got lat/lng from postcodes.io, "
+          f"comparables reused Land Registry")
+
+
+def test_fail_request_source_fails_the_request(tmp_path):
+    """postcodes_io is fail_request: its failure aborts the whole run."""
+    
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "api.postcodes.io":
+            return httpx.Response(404)
+        await asyncio.sleep(0.05)
+        return httpx.Response(200, json={"items": []})
+    
+    scheduler, client = make_scheduler(tmp_path, handler)
+    
+    async def run():
+        try:
+            await scheduler.run({"postcode": "XX1 1XX"})
+        finally:
+            await client.aclose()
+    
+    with pytest.raises(SourceFetchError, match="postcodes_io"):
+        asyncio.run(run())
+    print("✓ fail_request source aborted the run")
@@ -0,0 +1,65 @@
+"""
+Tests for API startup: lazy imports and background model warm-up.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+
+STARTUP_SCRIPT = """
+import json, sys, time
+from fastapi.testclient import TestClient
+from backend.main import app
+
+heavy = [m for m in ("pandas", "catboost", "shap") if m in sys.modules]
+
+with TestClient(app) as client:
+    before = client.get("/ready").status_code
+    for _ in range(600):
+        ready = client.get("/ready")
+        if ready.status_code == 200:
+            break
+        time.sleep(0.05)
+    predict = client.post("/api/predict", json={
+        "category": "house_price",
+        "input_data": {"postcode": "SW1 1AA", "property_type": "Flat"}
+    })
+
+print(json.dumps({
+    "heavy": heavy,
+    "before": before,
+    "ready": ready.json(),
+    "predict": predict.status_code
+}))
+"""
+
+
+def test_api_binds_before_model_load(tiny_house_model, tmp_path):
+    """Importing the app loads no ML libraries; /ready flips once warm-up finishes."""
+    print("\n=== Testing API startup ===")
+    
+    model_path = Path(tiny_house_model["path"])
+    env = {
+        **os.environ,
+        "MODELS_DIR": str(model_path.parent),
+        "MODEL_VERSION": model_path.stem,
+        "PYTHONPATH": str(REPO_ROOT)
+    }
+    
+    output = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=120
+    )
+    assert output.returncode == 0, output.stderr
+    result = json.loads(output.stdout.strip().splitlines()[-1])
+    
+    assert result["heavy"] == []
+    assert result["before"] == 503
+    assert result["ready"]["status"] == "ready"
+    assert result["ready"]["model_version"] == model_path.stem
+    assert result["predict"] == 200
+    print("✓ App imports without ML libraries and becomes ready in the background")
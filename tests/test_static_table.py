@@ -0,0 +1,143 @@
+"""
+Tests for indexed, memory-mapped csv_static tables.
+"""
+
+import os
+import time
+
+import pytest
+
+from agents.crawler_agent import CrawlerAgent
+from utils.cache_manager import CacheManager
+from utils.instruction_plan import CrawlerPlan
+from utils.static_table import StaticTableStore
+
+AREAS = ["E", "N", "SW", "M", "B"]
+
+
+def write_companies(path, rows=5000):
+    lines = ["company_name,sic_code,postcode_area,status,incorporation_date,employees"]
+    for i in range(rows):
+        lines.append(f"Cafe {i},{56101 if i % 2 else 56302},{AREAS[i % 5]},"
+                     f"{'active' if i % 3 else 'dissolved'},{2000 + i % 25}-0{1 + i % 9}-15,{i % 40}")
+    path.write_text("\n".join(lines) + "\n")
+
+
+def make_store(tmp_path):
+    csv_path = tmp_path / "companies.csv"
+    write_companies(csv_path)
+    return StaticTableStore(table_dir=str(tmp_path / "static")), str(csv_path)
+
+
+def test_csv_is_converted_once_and_reloaded_on_edit(tmp_path):
+    print("\n=== Testing StaticTableStore conversion ===")
+    store, csv_path = make_store(tmp_path)
+    
+    table = store.get(csv_path)
+    assert table.num_rows == 5000
+    assert store.get(csv_path) is table
+    assert len(list((tmp_path / "static").glob("companies-*.arrow"))) == 1
+    
+    # Another process (fresh store) maps the existing file instead of converting
+    mtime = os.path.getmtime(table.path)
+    assert StaticTableStore(table_dir=str(tmp_path / "static")).get(csv_path).path == table.path
+    assert os.path.getmtime(table.path) == mtime
+    print("✓ One Arrow file, shared by every load")
+    
+    write_companies(tmp_path / "companies.csv", rows=10)
+    stat = os.stat(csv_path)
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    edited = store.get(csv_path)
+    assert edited.num_rows == 10
+    assert [p.name for p in (tmp_path / "static").glob("companies-*.arrow")] == [os.path.basename(edited.path)]
+    print("✓ Edited CSV reconverted, old version removed")
+    
+    # Same file name in another directory: a separate table, nothing removed
+    (tmp_path / "other").mkdir()
+    write_companies(tmp_path / "other" / "companies.csv", rows=20)
+    assert store.get(str(tmp_path / "other" / "companies.csv")).num_rows == 20
+    assert len(list((tmp_path / "static").glob("companies-*.arrow"))) == 2
+    assert os.path.exists(edited.path)
+    print("✓ Same-named CSVs in other directories keep their own tables")
+    
+    with pytest.raises(FileNotFoundError, match="Static file not found"):
+        store.get(str(tmp_path / "missing.csv"))
+
+
+def test_filters_use_indexes(tmp_path):
+    store, csv_path = make_store(tmp_path)
+    table = store.get(csv_path)
+    records = table.records(range(5000))
+    
+    def expected(predicate):
+        return [i for i, r in enumerate(records) if predicate(r)]
+    
+    rows, unapplied = table.select({"sic_code": "56101", "postcode_area": "E", "status": ("active", "dissolved")})
+    assert list(rows) == expected(lambda r: r["sic_code"] == 56101 and r["postcode_area"] == "E")
+    assert unapplied == {}
+    
+    rows, _ = table.select({"postcode_area": "N", "incorporation_date_from": "2020-01-01",
+                            "employees_to": 10})
+    assert list(rows) == expected(lambda r: r["postcode_area"] == "N" and r["employees"] <= 10
+                                  and str(r["incorporation_date"]) >= "2020-01-01")
+    
+    rows, _ = table.select({"employees_from": 35, "company_name_contains": "CAFE 4"})
+    assert list(rows) == expected(lambda r: r["employees"] >= 35 and "Cafe 4" in r["company_name"])
+    print("✓ ==, in, ranges and substrings match a full scan")
+    
+    threes = list(table.select({"employees": 3})[0])
+    assert threes == expected(lambda r: r["employees"] == 3)
+    assert list(table.select({"employees": 3.0})[0]) == threes
+    assert list(table.select({"employees": ["3", 3.5]})[0]) == threes
+    assert list(table.select({"incorporation_date": "2003-04-15"})[0]) == \
+        expected(lambda r: str(r["incorporation_date"]) == "2003-04-15")
+    print("✓ Filter values cast to the column type before lookup")
+    
+    rows, unapplied = table.select({"sic_code": "99999", "within_radius_km": 2,
+                                    "postcode_area": "{derived.postcode_area}"})
+    assert len(rows) == 0
+    assert unapplied == {"within_radius_km": 2, "postcode_area": "{derived.postcode_area}"}
+    print("✓ Unknown columns and unresolved placeholders reported as unapplied")
+
+
+def test_crawler_serves_csv_static_from_table(tmp_path):
+    """csv_static sources are filtered in microseconds and never hit the SQLite cache."""
+    store, csv_path = make_store(tmp_path)
+    StaticTableStore._shared = store
+    try:
+        config = CrawlerPlan("crawler_1", {"name": "Static Crawler", "data_sources": [{
+            "name": "companies_house_competitors",
+            "type": "csv_static",
+            "file_path": csv_path,
+            "filter": {"sic_code": "56101", "postcode_area": "{derived.postcode_area}",
+                       "status": ["active"], "within_radius_km": 2},
+            "output_fields": ["company_name", "status"],
+            "max_rows": 50
+        }]})
+        cache = CacheManager(db_path=str(tmp_path / "static.db"), memory_entries=0, sweep_interval_s=0)
+        crawler = CrawlerAgent(config, cache)
+        user_input = {"postcode": "E1 6AN", "derived": {"postcode_area": "E"}}
+        
+        result = crawler.execute(user_input)["sources"]["companies_house_competitors"]
+        data = result["data"]
+        assert result["status"] == "success"
+        assert data["row_count"] == 333 and data["truncated"]
+        assert len(data["rows"]) == 50
+        assert set(data["rows"][0]) == {"company_name", "status"}
+        assert data["unapplied_filters"] == {"within_radius_km": 2}
+        assert cache.usage()["rows"] == 0
+        
+        batch = crawler.execute_many([user_input, {"postcode": "N1 9GU", "derived": {"postcode_area": "N"}}])
+        assert batch[0]["sources"]["companies_house_competitors"] == result
+        assert batch[1]["sources"]["companies_house_competitors"]["data"]["rows"][0]["company_name"] == "Cafe 1"
+        assert cache.usage()["rows"] == 0
+        print("✓ execute_many filters per input and skips the cache too")
+        
+        start = time.perf_counter()
+        for _ in range(200):
+            crawler._fetch_source(crawler.data_sources[0], user_input)
+        per_request = (time.perf_counter() - start) / 200
+        assert per_request < 0.005
+        print(f"✓ {data['row_count']} matches, {per_request * 1e6:.0f}µs per request")
+    finally:
+        StaticTableStore._shared = None
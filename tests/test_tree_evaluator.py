@@ -0,0 +1,71 @@
+"""
+Tests for the NumPy oblivious-tree evaluator.
+"""
+
+import numpy as np
+import pandas as pd
+from catboost import CatBoostRegressor, Pool
+
+from agents.ml_execution_agent import MLExecutionAgent
+from agents.tree_evaluator import export_catboost_json, compile_tree_model, ObliviousTreeModel
+from conftest import FEATURES, CATEGORICAL, make_training_frame
+
+
+def _with_unseen(rows):
+    """Rows plus copies with categories the model never saw."""
+    return rows + [
+        {**rows[0], "postcode_sector": "ZZ9"},
+        {**rows[1], "town_city": "NOWHERE", "county": "NOWHERE"},
+        {**rows[2], "property_type": "O", "duration": "U"}
+    ]
+
+
+def test_numpy_engine_matches_catboost(tiny_house_model, tmp_path):
+    """Agent scores identically with the compiled trees, including unseen categories."""
+    print("\n=== Testing numpy inference engine ===")
+    
+    path = tiny_house_model["path"]
+    frame = tiny_house_model["frame"]
+    
+    reference = MLExecutionAgent(path)
+    reference.load_model()
+    export_catboost_json(reference.model, str(tmp_path / "model.json"),
+                         Pool(frame[FEATURES], cat_features=CATEGORICAL))
+    compile_tree_model(str(tmp_path / "model.json"), path.replace(".cbm", "_trees"),
+                       FEATURES, "house_test_v1")
+    
+    agent = MLExecutionAgent(path, engine="numpy")
+    agent.load_model()
+    assert agent.tree_model is not None
+    
+    rows = _with_unseen(make_training_frame(200, seed=3)[FEATURES].to_dict("records"))
+    expected = [r["prediction"] for r in reference.predict_batch(rows)]
+    served = [r["prediction"] for r in agent.predict_batch(rows)]
+    
+    assert np.allclose(served, expected, rtol=1e-9)
+    print("✓ NumPy engine matches CatBoost through the agent")
+
+
+def test_tree_evaluator_handles_feature_combinations(tmp_path):
+    """Combination and Counter CTRs hash and look up like CatBoost."""
+    frame = make_training_frame(2000, seed=1)
+    model = CatBoostRegressor(
+        iterations=200, depth=6, verbose=0, random_seed=42, allow_writing_files=False,
+        simple_ctr=["Borders", "Counter"], combinations_ctr=["Borders", "Counter"]
+    )
+    model.fit(frame[FEATURES], frame["price"], cat_features=CATEGORICAL)
+    
+    export_catboost_json(model, str(tmp_path / "model.json"),
+                         Pool(frame[FEATURES], cat_features=CATEGORICAL))
+    compile_tree_model(str(tmp_path / "model.json"), str(tmp_path / "trees"), FEATURES, "combo")
+    trees = ObliviousTreeModel(str(tmp_path / "trees"))
+    
+    assert any(len(p) > 1 for p in trees.meta["projections"])
+    
+    test = make_training_frame(300, seed=9)
+    rows = _with_unseen(test[FEATURES].to_dict("records"))
+    expected = model.predict(pd.DataFrame(rows, columns=FEATURES))
+    
+    assert np.allclose(trees.predict(rows), expected, rtol=1e-9)
+    assert np.allclose(trees.predict(rows[:1]), expected[:1], rtol=1e-9)
+    print("✓ Combination CTRs match CatBoost")
@@ -5,5 +5,11 @@ Utility modules for KALMAN.
 from .cache_manager import CacheManager
 from .api_client import APIClient
 from .instruction_loader import InstructionLoader
+from .lru_cache import LRUCache
+from .llm_client import LLMClient
+from .llm_gateway import LLMGateway
+from .rate_limiter import RateLimiter
+from .singleflight import SingleFlight
 
-__all__ = ['CacheManager', 'APIClient', 'InstructionLoader']
+__all__ = ['CacheManager', 'APIClient', 'InstructionLoader', 'LRUCache', 'LLMClient', 'LLMGateway',
+           'RateLimiter', 'SingleFlight']
@@ -1,36 +1,134 @@
 """
-HTTP client with retry logic for API calls.
+HTTP clients with retry logic for API calls.
 """
 
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential
 from typing import Dict, Any, Optional
 import logging
 
+from utils.rate_limiter import RateLimited, RateLimiter, parse_retry_after
+
 logger = logging.getLogger(__name__)
 
+# HTTP/2 needs the optional h2 package (pip install httpx[http2])
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Statuses worth another attempt; other 4xx responses won't change
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Statuses that tell us to slow down (honouring Retry-After)
+THROTTLE_STATUSES = {429, 503}
+
+_backoff = wait_exponential(multiplier=1, min=2, max=10)
+
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    """Retry-After of a throttled response, if the server sent one."""
+    if isinstance(error, httpx.HTTPStatusError) and error.response.status_code in THROTTLE_STATUSES:
+        return parse_retry_after(error.response.headers.get("Retry-After"))
+    return None
+
+
+def _should_retry(error: BaseException) -> bool:
+    """Retry transport errors and transient statuses, not client errors."""
+    if isinstance(error, RateLimited):
+        return False
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in RETRY_STATUSES
+    return True
+
+
+def _wait(retry_state) -> float:
+    """
+    Exponential backoff, except after a Retry-After: the rate limiter has
+    already paused the host, so the next attempt waits there instead.
+    """
+    if _retry_after(retry_state.outcome.exception()) is not None:
+        return 0
+    return _backoff(retry_state)
+
+
+def close_on_loop(client: httpx.AsyncClient, loop: asyncio.AbstractEventLoop):
+    """
+    Close an AsyncClient bound to another event loop, without waiting.
+    
+    Its connections can only be closed on their own loop: the close is
+    scheduled there if it is still running, or run on a helper thread if it
+    has stopped. A closed loop can't close them anymore; its sockets are
+    released when the client is garbage-collected.
+    """
+    if loop.is_closed():
+        logger.debug("Dropping an async HTTP client whose event loop has closed")
+    elif loop.is_running():
+        asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+    else:
+        threading.Thread(target=loop.run_until_complete, args=(client.aclose(),),
+                         name="close-http-client", daemon=True).start()
+
+
+_retry_policy = retry(
+    stop=stop_after_attempt(3),
+    wait=_wait,
+    retry=retry_if_exception(_should_retry)
+)
+
 
 class APIClient:
-    """HTTP client with automatic retries and error handling."""
+    """HTTP client with per-host rate limiting, automatic retries and error handling."""
+    
+    _shared: Optional["APIClient"] = None
+    _shared_lock = threading.Lock()
     
-    def __init__(self, timeout: int = 30):
+    def __init__(self, timeout: int = 30, rate_limiter: Optional[RateLimiter] = None,
+                 transport: Optional[httpx.BaseTransport] = None):
         """
         Initialize API client.
         
         Args:
             timeout: Request timeout in seconds
+            rate_limiter: Per-host limits (process-wide one if None)
+            transport: Custom httpx transport (e.g. httpx.MockTransport in tests)
         """
         self.timeout = timeout
-        self.client = httpx.Client(timeout=timeout)
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        self.client = httpx.Client(timeout=timeout, transport=transport)
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
+    @classmethod
+    def shared(cls) -> "APIClient":
+        """Process-wide client, so connections are reused across crawlers."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def _request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        try:
+            self.rate_limiter.acquire(url)
+            logger.info(f"{method} {url}")
+            response = self.client.request(method, url, **kwargs)
+            if response.status_code in THROTTLE_STATUSES:
+                self.rate_limiter.penalize(url, parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+            return response.json()
+            
+        except (httpx.HTTPError, RateLimited) as e:
+            logger.error(f"HTTP error for {url}: {e}")
+            raise
+    
+    @_retry_policy
     def get(self, url: str, params: Optional[Dict[str, Any]] = None, 
             headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
         """
-        GET request with retry logic.
+        GET request with rate limiting and retry logic.
         
         Args:
             url: Request URL
@@ -42,21 +140,11 @@ class APIClient:
             
         Raises:
             httpx.HTTPError: If request fails after retries
+            RateLimited: Host is throttled for longer than the limiter's max wait
         """
-        try:
-            logger.info(f"GET {url}")
-            response = self.client.get(url, params=params, headers=headers)
-            response.raise_for_status()
-            return response.json()
-            
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error for {url}: {e}")
-            raise
+        return self._request("GET", url, params=params, headers=headers)
     
-    @retry(
-        stop=stop_after_attempt(3),
-        wait=wait_exponential(multiplier=1, min=2, max=10)
-    )
+    @_retry_policy
     def post(self, url: str, data: Optional[Dict[str, Any]] = None,
              json_data: Optional[Dict[str, Any]] = None,
              headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
@@ -72,15 +160,7 @@ class APIClient:
         Returns:
             Response JSON as dict
         """
-        try:
-            logger.info(f"POST {url}")
-            response = self.client.post(url, data=data, json=json_data, headers=headers)
-            response.raise_for_status()
-            return response.json()
-            
-        except httpx.HTTPError as e:
-            logger.error(f"HTTP error for {url}: {e}")
-            raise
+        return self._request("POST", url, data=data, json=json_data, headers=headers)
     
     def close(self):
         """Close HTTP client."""
@@ -91,3 +171,148 @@ class APIClient:
     
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.close()
+
+
+class AsyncAPIClient:
+    """
+    Async HTTP client with retries, shared by every crawler in the process.
+    
+    Wraps one httpx.AsyncClient for the running event loop, so keep-alive
+    connections and TLS sessions are reused across requests, with HTTP/2
+    when h2 is installed. Used from a new loop, it closes the previous
+    loop's client and opens a fresh one.
+    Besides the pool-wide connection limit, at most max_per_host requests run
+    against any single host at once, and requests are paced by the same
+    per-host rate limiter as APIClient.
+    """
+    
+    _shared: Optional["AsyncAPIClient"] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, timeout: float = 30, max_connections: int = 100,
+                 max_per_host: int = 10, http2: Optional[bool] = None,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize async API client.
+        
+        Args:
+            timeout: Request timeout in seconds
+            max_connections: Connection pool size across all hosts
+            max_per_host: Concurrent requests per host
+            http2: Use HTTP/2 (default: when h2 is installed)
+            rate_limiter: Per-host limits (process-wide one if None)
+            transport: Custom httpx transport (e.g. httpx.MockTransport in tests)
+        """
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.http2 = HTTP2_AVAILABLE if http2 is None else http2 and HTTP2_AVAILABLE
+        self.rate_limiter = rate_limiter or RateLimiter.shared()
+        self.transport = transport
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._host_limits: Dict[str, asyncio.Semaphore] = {}
+    
+    @classmethod
+    def shared(cls) -> "AsyncAPIClient":
+        """Process-wide async client."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Pooled client bound to the running event loop (the previous loop's is closed)."""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            close_on_loop(self._client, self._loop)
+            self._client = None
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                http2=self.http2,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self.transport
+            )
+            self._loop = loop
+            self._host_limits = {}
+        return self._client
+    
+    def _host_limit(self, url: str) -> asyncio.Semaphore:
+        host = urlsplit(url).netloc
+        limit = self._host_limits.get(host)
+        if limit is None:
+            limit = self._host_limits[host] = asyncio.Semaphore(self.max_per_host)
+        return limit
+    
+    async def _request(self, method: str, url: str, **kwargs) -> Dict[str, Any]:
+        client = self._get_client()
+        try:
+            await self.rate_limiter.aacquire(url)
+            logger.info(f"{method} {url}")
+            async with self._host_limit(url):
+                response = await client.request(method, url, **kwargs)
+            if response.status_code in THROTTLE_STATUSES:
+                self.rate_limiter.penalize(url, parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+            return response.json()
+            
+        except (httpx.HTTPError, RateLimited) as e:
+            logger.error(f"HTTP error for {url}: {e}")
+            raise
+    
+    @_retry_policy
+    async def get(self, url: str, params: Optional[Dict[str, Any]] = None,
+                  headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        GET request with rate limiting and retry logic (waits don't block the loop).
+        
+        Args:
+            url: Request URL
+            params: Query parameters
+            headers: Request headers
+            
+        Returns:
+            Response JSON as dict
+            
+        Raises:
+            httpx.HTTPError: If request fails after retries
+            RateLimited: Host is throttled for longer than the limiter's max wait
+        """
+        return await self._request("GET", url, params=params, headers=headers)
+    
+    @_retry_policy
+    async def post(self, url: str, data: Optional[Dict[str, Any]] = None,
+                   json_data: Optional[Dict[str, Any]] = None,
+                   headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """
+        POST request with retry logic.
+        
+        Args:
+            url: Request URL
+            data: Form data
+            json_data: JSON data
+            headers: Request headers
+            
+        Returns:
+            Response JSON as dict
+        """
+        return await self._request("POST", url, data=data, json=json_data, headers=headers)
+    
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
+    
+    @classmethod
+    async def aclose_shared(cls):
+        """Close the process-wide client's connections, if it was created."""
+        if cls._shared is not None:
+            await cls._shared.aclose()
@@ -2,57 +2,321 @@
 SQLite cache manager for API responses.
 """
 
+import logging
 import sqlite3
-import json
-from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, Dict, Any, Iterable, Iterator, List, Tuple
 import os
 
+from utils.lru_cache import LRUCache
+from utils.payload_codec import PayloadCodec, CODEC_JSON, loads
+
+logger = logging.getLogger(__name__)
+
+# Background expiry/eviction (0 = off) and total size budget (0 = unbounded)
+CACHE_SWEEP_INTERVAL_S = float(os.getenv("CACHE_SWEEP_INTERVAL_S", "300"))
+CACHE_MAX_ROWS = int(os.getenv("CACHE_MAX_ROWS", "0"))
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", "0"))
+
+# Expired rows are kept this long so they can still be served stale
+CACHE_STALE_GRACE_DAYS = float(os.getenv("CACHE_STALE_GRACE_DAYS", "30"))
+
+DAY_S = 86400.0
+
 
 class CacheManager:
-    """Manages SQLite cache for API responses."""
+    """
+    Manages SQLite cache for API responses.
+    
+    Connections are pooled and reused across calls (and threads), so each
+    get/set is a single statement on a warm connection instead of an
+    open/execute/close cycle. The database runs in WAL mode: readers never
+    block the writer and vice versa, and concurrent writers wait on
+    busy_timeout instead of failing with "database is locked". SQL strings are
+    constants, so sqlite3's per-connection statement cache prepares each one
+    once per connection.
+    
+    An in-process LRU (L1) sits in front of SQLite (L2) and holds decoded
+    payloads, so repeat lookups skip the query, json.loads and timestamp
+    parse. Writes go through to both tiers and invalidate() drops keys from
+    both. L1 is per process: another process's writes only show up here once
+    the L1 entry expires or is evicted. Values returned from L1 are shared,
+    so callers must not mutate them.
+    
+    Payloads are stored as compressed BLOBs (zstd, or zlib without the
+    zstandard package) with a codec column, so rows written with any codec
+    stay readable. train_dictionary() builds a per-source zstd dictionary,
+    which shrinks small repetitive responses much further. Uncompressed rows
+    from older databases are recompressed on open.
+    
+    Expiry is decided in the lookup query via an indexed expires_at (epoch
+    seconds), and an optional sweeper thread deletes expired rows and keeps
+    the table under max_rows/max_bytes by evicting the least recently
+    accessed rows. Reads record last_accessed in memory and flush it in
+    batches, so hits don't turn into writes. Expired rows are only deleted
+    stale_grace_days after expiry; until then get_entry() can still return
+    them, flagged as stale, for stale-while-revalidate and fallbacks.
+    """
+    
+    # The caller's ttl_days may be shorter than the one the row was written
+    # with, hence the second condition (expires_at - ttl = fetch time)
+    GET_SQL = """
+        SELECT response_data, codec, expires_at - ttl_days * 86400.0 
+        FROM cached_api_responses 
+        WHERE source = ? AND query_key = ? AND expires_at > ? 
+          AND expires_at - ttl_days * 86400.0 > ?
+    """
+    
+    GET_ENTRY_SQL = """
+        SELECT response_data, codec, expires_at - ttl_days * 86400.0, expires_at 
+        FROM cached_api_responses 
+        WHERE source = ? AND query_key = ? AND expires_at > ?
+    """
+    
+    GET_MANY_SQL = """
+        SELECT query_key, response_data, codec, expires_at - ttl_days * 86400.0 
+        FROM cached_api_responses 
+        WHERE source = ? AND query_key IN ({placeholders}) AND expires_at > ? 
+          AND expires_at - ttl_days * 86400.0 > ?
+    """
+    
+    GET_MANY_ENTRIES_SQL = """
+        SELECT query_key, response_data, codec, expires_at - ttl_days * 86400.0, expires_at 
+        FROM cached_api_responses 
+        WHERE source = ? AND query_key IN ({placeholders}) AND expires_at > ?
+    """
+    
+    SET_SQL = """
+        INSERT OR REPLACE INTO cached_api_responses 
+        (source, query_key, response_data, codec, fetched_at, ttl_days, expires_at, last_accessed, size)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """
+    
+    TOUCH_SQL = "UPDATE cached_api_responses SET last_accessed = ? WHERE source = ? AND query_key = ?"
+    
+    USAGE_SQL = "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cached_api_responses INDEXED BY idx_cache_lru"
+    
+    EVICT_SELECT_SQL = """
+        SELECT id, size FROM cached_api_responses INDEXED BY idx_cache_lru 
+        ORDER BY last_accessed 
+        LIMIT ?
+    """
+    
+    DELETE_ID_SQL = "DELETE FROM cached_api_responses WHERE id = ?"
+    
+    RECOMPRESS_SELECT_SQL = """
+        SELECT id, source, response_data, codec 
+        FROM cached_api_responses 
+        WHERE id > ? AND (? IS NULL OR source = ?) AND (? = 0 OR codec = 0)
+        ORDER BY id 
+        LIMIT ?
+    """
+    
+    RECOMPRESS_UPDATE_SQL = "UPDATE cached_api_responses SET response_data = ?, codec = ?, size = ? WHERE id = ?"
+    
+    CLEAR_EXPIRED_SQL = """
+        DELETE FROM cached_api_responses 
+        WHERE id IN (SELECT id FROM cached_api_responses WHERE expires_at <= ? LIMIT ?)
+    """
+    
+    CLEAR_ALL_SQL = "DELETE FROM cached_api_responses"
     
-    def __init__(self, db_path: str = "data/cache/api_cache.db"):
-        """Initialize cache manager."""
+    INVALIDATE_KEY_SQL = "DELETE FROM cached_api_responses WHERE source = ? AND query_key = ?"
+    
+    INVALIDATE_SOURCE_SQL = "DELETE FROM cached_api_responses WHERE source = ?"
+    
+    def __init__(self, db_path: str = "data/cache/api_cache.db", pool_size: int = 8,
+                 busy_timeout_ms: int = 5000, cache_size_kib: int = 8192,
+                 memory_entries: int = 4096, memory_max_bytes: int = 64 * 1024 * 1024,
+                 compression: str = "auto", migrate: bool = True,
+                 max_rows: Optional[int] = None, max_bytes: Optional[int] = None,
+                 sweep_interval_s: Optional[float] = None,
+                 stale_grace_days: Optional[float] = None):
+        """
+        Initialize cache manager.
+        
+        Args:
+            db_path: SQLite database file
+            pool_size: Idle connections kept open for reuse
+            busy_timeout_ms: How long a writer waits for the write lock
+            cache_size_kib: SQLite page cache per connection
+            memory_entries: L1 size in entries (0 disables the L1)
+            memory_max_bytes: L1 budget, measured as serialized payload size
+            compression: "zstd", "zlib", "none" or "auto" (see PayloadCodec)
+            migrate: Recompress uncompressed rows from older databases on open
+            max_rows: Row budget enforced by sweep() (default CACHE_MAX_ROWS, 0 = none)
+            max_bytes: Stored payload budget (default CACHE_MAX_BYTES, 0 = none)
+            sweep_interval_s: Run sweep() in a background thread this often
+                (default CACHE_SWEEP_INTERVAL_S, 0 = never)
+            stale_grace_days: How long expired rows stay available to
+                get_entry() (default CACHE_STALE_GRACE_DAYS)
+        """
         self.db_path = db_path
+        self.pool_size = pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self.connections_opened = 0
+        
+        self.memory = LRUCache(max_entries=memory_entries, max_bytes=memory_max_bytes) \
+            if memory_entries > 0 else None
+        self._source_stats: Dict[str, Dict[str, int]] = {}
+        
+        self.max_rows = max_rows if max_rows is not None else CACHE_MAX_ROWS
+        self.max_bytes = max_bytes if max_bytes is not None else CACHE_MAX_BYTES
+        self.stale_grace_days = stale_grace_days if stale_grace_days is not None else CACHE_STALE_GRACE_DAYS
+        self.evicted = 0
+        self.expired = 0
+        
+        # (source, query_key) -> last access time, flushed in batches
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._touch_flush_size = 256
+        
+        self._sweeper: Optional[threading.Thread] = None
+        self._stop_sweeper = threading.Event()
+        
+        self.codec = PayloadCodec(compression)
+        # source -> zstd dictionary id used for new writes
+        self._source_dictionaries: Dict[str, int] = {}
         
         # Ensure directory exists
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
         
         # Initialize database
         self._init_db()
+        self._load_dictionaries()
+        
+        if migrate and self.codec.codec != CODEC_JSON:
+            migrated = self.recompress(legacy_only=True)
+            if migrated:
+                logger.info(f"Compressed {migrated} legacy cache rows")
+        
+        interval = sweep_interval_s if sweep_interval_s is not None else CACHE_SWEEP_INTERVAL_S
+        if interval > 0:
+            self.start_sweeper(interval)
+    
+    def _connect(self) -> sqlite3.Connection:
+        """Open a tuned connection."""
+        # Autocommit: every statement here is its own transaction.
+        # check_same_thread=False because pooled connections move between
+        # threads; the pool hands each one to a single thread at a time.
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            isolation_level=None,
+            check_same_thread=False,
+            cached_statements=64
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA cache_size=-{int(self.cache_size_kib)}")
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        
+        with self._lock:
+            self.connections_opened += 1
+        return conn
+    
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a pooled connection, opening one if the pool is empty."""
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        
+        try:
+            yield conn
+        except sqlite3.Error:
+            # Don't return a connection in an unknown state to the pool
+            conn.close()
+            raise
+        except BaseException:
+            self._release(conn)
+            raise
+        
+        self._release(conn)
+    
+    def _release(self, conn: sqlite3.Connection):
+        """Return a connection to the pool, closing it if the pool is full."""
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
     
     def _init_db(self):
         """Create cache table if not exists."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cached_api_responses (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                source TEXT NOT NULL,
-                query_key TEXT NOT NULL,
-                response_data TEXT,
-                fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                ttl_days INTEGER DEFAULT 30,
-                UNIQUE(source, query_key)
-            )
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_cache_lookup 
-            ON cached_api_responses(source, query_key)
-        """)
-        
-        cursor.execute("""
-            CREATE INDEX IF NOT EXISTS idx_cache_expiry 
-            ON cached_api_responses(fetched_at, ttl_days)
-        """)
-        
-        conn.commit()
-        conn.close()
-    
-    def get(self, source: str, query_key: str, ttl_days: int = 30) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cached_api_responses (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    source TEXT NOT NULL,
+                    query_key TEXT NOT NULL,
+                    response_data BLOB,
+                    codec INTEGER NOT NULL DEFAULT 0,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    ttl_days INTEGER DEFAULT 30,
+                    expires_at REAL,
+                    last_accessed REAL,
+                    size INTEGER NOT NULL DEFAULT 0,
+                    UNIQUE(source, query_key)
+                )
+            """)
+            
+            # Databases created before compression have no codec column;
+            # their rows are plain JSON text (codec 0)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cached_api_responses)")}
+            if "codec" not in columns:
+                conn.execute("ALTER TABLE cached_api_responses ADD COLUMN codec INTEGER NOT NULL DEFAULT 0")
+            
+            # ... nor expiry/LRU columns: derive them from fetched_at, which
+            # was written as local time
+            if "expires_at" not in columns:
+                conn.execute("ALTER TABLE cached_api_responses ADD COLUMN expires_at REAL")
+                conn.execute("ALTER TABLE cached_api_responses ADD COLUMN last_accessed REAL")
+                conn.execute("ALTER TABLE cached_api_responses ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                conn.execute("""
+                    UPDATE cached_api_responses SET 
+                        last_accessed = (julianday(fetched_at, 'utc') - 2440587.5) * 86400.0,
+                        expires_at = (julianday(fetched_at, 'utc') - 2440587.5) * 86400.0 + ttl_days * 86400.0,
+                        size = LENGTH(response_data)
+                """)
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_dictionaries (
+                    dict_id INTEGER PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    data BLOB NOT NULL,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_lookup 
+                ON cached_api_responses(source, query_key)
+            """)
+            
+            # Replaced by idx_cache_expires (it could not serve expiry queries)
+            conn.execute("DROP INDEX IF EXISTS idx_cache_expiry")
+            
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_expires 
+                ON cached_api_responses(expires_at)
+            """)
+            
+            # Covers both LRU eviction order and the size totals
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_cache_lru 
+                ON cached_api_responses(last_accessed, size)
+            """)
+    
+    def get(self, source: str, query_key: str, ttl_days: float = 30) -> Optional[Dict[str, Any]]:
         """
         Retrieve cached data if not expired.
         
@@ -64,33 +328,39 @@ class CacheManager:
         Returns:
             Cached data dict or None if not found/expired
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        now = time.time()
         
-        cursor.execute("""
-            SELECT response_data, fetched_at 
-            FROM cached_api_responses 
-            WHERE source = ? AND query_key = ?
-        """, (source, query_key))
+        if self.memory is not None:
+            entry = self.memory.get((source, query_key))
+            if entry is not None:
+                data, fetched_at = entry
+                if now - fetched_at < ttl_days * DAY_S:
+                    self._count(source, "l1_hits")
+                    self._touch(source, [query_key], now)
+                    return data
         
-        result = cursor.fetchone()
-        conn.close()
+        with self._connection() as conn:
+            result = conn.execute(self.GET_SQL, (source, query_key, now, now - ttl_days * DAY_S)).fetchone()
         
         if not result:
+            self._count(source, "misses")
             return None
         
-        response_data, fetched_at = result
+        response_data, codec, fetched_at = result
+        self._touch(source, [query_key], now)
         
-        # Check if expired
-        fetched_datetime = datetime.fromisoformat(fetched_at)
-        age_days = (datetime.now() - fetched_datetime).days
-        
-        if age_days >= ttl_days:
+        try:
+            data, size = self.codec.decode(codec, response_data)
+        except Exception as e:
+            logger.warning(f"Unreadable cache row {source}/{query_key} (codec {codec}): {e}")
+            self._count(source, "misses")
             return None
         
-        return json.loads(response_data)
+        self._count(source, "l2_hits")
+        self._remember(source, query_key, data, fetched_at, ttl_days, size)
+        return data
     
-    def set(self, source: str, query_key: str, data: Dict[str, Any], ttl_days: int = 30):
+    def set(self, source: str, query_key: str, data: Dict[str, Any], ttl_days: float = 30):
         """
         Store data in cache.
         
@@ -98,48 +368,514 @@ class CacheManager:
             source: Data source name
             query_key: Unique query identifier
             data: Data to cache
+            ttl_days: Time-to-live in days (fractions allowed, e.g. for
+                short-lived negative entries)
+        """
+        codec, blob, raw = self.codec.encode(data, self._source_dictionaries.get(source))
+        now = time.time()
+        
+        with self._connection() as conn:
+            conn.execute(self.SET_SQL, self._row(source, query_key, codec, blob, now, ttl_days))
+        
+        self._count(source, "sets")
+        # Cache a decoded copy so later mutations of `data` don't leak into L1
+        self._remember(source, query_key, loads(raw), now, ttl_days, len(raw))
+    
+    def get_entry(self, source: str, query_key: str,
+                  ttl_days: float = 30) -> Optional[Tuple[Dict[str, Any], bool]]:
+        """
+        Retrieve cached data even if it has expired, within the stale grace period.
+        
+        Args:
+            source: Data source name
+            query_key: Unique query identifier
+            ttl_days: Time-to-live in days
+            
+        Returns:
+            (data, is_fresh), or None if there is no usable row
+        """
+        now = time.time()
+        
+        if self.memory is not None:
+            entry = self.memory.get((source, query_key))
+            if entry is not None and now - entry[1] < ttl_days * DAY_S:
+                self._count(source, "l1_hits")
+                self._touch(source, [query_key], now)
+                return entry[0], True
+        
+        with self._connection() as conn:
+            result = conn.execute(self.GET_ENTRY_SQL,
+                                  (source, query_key, now - self.stale_grace_days * DAY_S)).fetchone()
+        
+        if not result:
+            self._count(source, "misses")
+            return None
+        
+        response_data, codec, fetched_at, expires_at = result
+        try:
+            data, size = self.codec.decode(codec, response_data)
+        except Exception as e:
+            logger.warning(f"Unreadable cache row {source}/{query_key} (codec {codec}): {e}")
+            self._count(source, "misses")
+            return None
+        
+        self._touch(source, [query_key], now)
+        if expires_at > now and now - fetched_at < ttl_days * DAY_S:
+            self._count(source, "l2_hits")
+            self._remember(source, query_key, data, fetched_at, ttl_days, size)
+            return data, True
+        
+        self._count(source, "stale_hits")
+        return data, False
+    
+    def get_many(self, source: str, query_keys: Iterable[str], ttl_days: float = 30,
+                 chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """
+        Retrieve many keys of one source in as few queries as possible.
+        
+        Keys in L1 are served from memory; the rest are looked up with one
+        IN query per chunk_size keys.
+        
+        Args:
+            source: Data source name
+            query_keys: Query identifiers
             ttl_days: Time-to-live in days
+            chunk_size: Keys per IN query (SQLite caps bound parameters)
+            
+        Returns:
+            {query_key: data} for keys found and not expired (misses are absent)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        now = time.time()
+        found: Dict[str, Dict[str, Any]] = {}
+        pending: List[str] = []
+        
+        for query_key in dict.fromkeys(query_keys):
+            entry = self.memory.get((source, query_key)) if self.memory is not None else None
+            if entry is not None and now - entry[1] < ttl_days * DAY_S:
+                found[query_key] = entry[0]
+                self._count(source, "l1_hits")
+            else:
+                pending.append(query_key)
+        
+        rows = self._select_many(self.GET_MANY_SQL, source, pending,
+                                 (now, now - ttl_days * DAY_S), chunk_size)
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO cached_api_responses 
-            (source, query_key, response_data, fetched_at, ttl_days)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+        for query_key, response_data, codec, fetched_at in rows:
+            try:
+                data, size = self.codec.decode(codec, response_data)
+            except Exception as e:
+                logger.warning(f"Unreadable cache row {source}/{query_key} (codec {codec}): {e}")
+                continue
+            found[query_key] = data
+            self._count(source, "l2_hits")
+            self._remember(source, query_key, data, fetched_at, ttl_days, size)
+        
+        self._count(source, "misses", sum(1 for query_key in pending if query_key not in found))
+        self._touch(source, list(found), now)
+        return found
+    
+    def get_many_entries(self, source: str, query_keys: Iterable[str], ttl_days: float = 30,
+                         chunk_size: int = 500) -> Dict[str, Tuple[Dict[str, Any], bool]]:
+        """
+        get_entry() for many keys of one source: get_many(), plus expired
+        rows still within the stale grace period.
+        
+        Args:
+            source: Data source name
+            query_keys: Query identifiers
+            ttl_days: Time-to-live in days
+            chunk_size: Keys per IN query (SQLite caps bound parameters)
+            
+        Returns:
+            {query_key: (data, is_fresh)} for keys with a usable row
+        """
+        now = time.time()
+        found: Dict[str, Tuple[Dict[str, Any], bool]] = {}
+        pending: List[str] = []
+        
+        for query_key in dict.fromkeys(query_keys):
+            entry = self.memory.get((source, query_key)) if self.memory is not None else None
+            if entry is not None and now - entry[1] < ttl_days * DAY_S:
+                found[query_key] = (entry[0], True)
+                self._count(source, "l1_hits")
+            else:
+                pending.append(query_key)
+        
+        rows = self._select_many(self.GET_MANY_ENTRIES_SQL, source, pending,
+                                 (now - self.stale_grace_days * DAY_S,), chunk_size)
+        
+        for query_key, response_data, codec, fetched_at, expires_at in rows:
+            try:
+                data, size = self.codec.decode(codec, response_data)
+            except Exception as e:
+                logger.warning(f"Unreadable cache row {source}/{query_key} (codec {codec}): {e}")
+                continue
+            if expires_at > now and now - fetched_at < ttl_days * DAY_S:
+                found[query_key] = (data, True)
+                self._count(source, "l2_hits")
+                self._remember(source, query_key, data, fetched_at, ttl_days, size)
+            else:
+                found[query_key] = (data, False)
+                self._count(source, "stale_hits")
+        
+        self._count(source, "misses", sum(1 for query_key in pending if query_key not in found))
+        self._touch(source, list(found), now)
+        return found
+    
+    def _select_many(self, sql: str, source: str, query_keys: List[str], params: tuple,
+                     chunk_size: int) -> List[tuple]:
+        """Run an IN query (source, keys..., *params) over query_keys in chunks."""
+        rows = []
+        if not query_keys:
+            return rows
+        
+        with self._connection() as conn:
+            for start in range(0, len(query_keys), chunk_size):
+                chunk = query_keys[start:start + chunk_size]
+                rows.extend(conn.execute(sql.format(placeholders=",".join("?" * len(chunk))),
+                                         (source, *chunk, *params)).fetchall())
+        return rows
+    
+    def set_many(self, source: str, items: Dict[str, Dict[str, Any]], ttl_days: float = 30):
+        """
+        Store many keys of one source in a single transaction.
+        
+        Args:
+            source: Data source name
+            items: {query_key: data}
+            ttl_days: Time-to-live in days
+        """
+        if not items:
+            return
+        
+        now = time.time()
+        encoded = []
+        rows = []
+        for query_key, data in items.items():
+            codec, blob, raw = self.codec.encode(data, self._source_dictionaries.get(source))
+            encoded.append((query_key, raw))
+            rows.append(self._row(source, query_key, codec, blob, now, ttl_days))
+        
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(self.SET_SQL, rows)
+            conn.execute("COMMIT")
+        
+        self._count(source, "sets", len(encoded))
+        for query_key, raw in encoded:
+            self._remember(source, query_key, loads(raw), now, ttl_days, len(raw))
+    
+    @staticmethod
+    def _row(source: str, query_key: str, codec: int, blob, now: float, ttl_days: float) -> tuple:
+        """SET_SQL parameters."""
+        return (
             source,
             query_key,
-            json.dumps(data),
-            datetime.now().isoformat(),
-            ttl_days
-        ))
+            blob,
+            codec,
+            datetime.fromtimestamp(now).isoformat(),
+            ttl_days,
+            now + ttl_days * DAY_S,
+            now,
+            len(blob)
+        )
+    
+    def _remember(self, source: str, query_key: str, data: Dict[str, Any],
+                  fetched_at: float, ttl_days: float, size: int):
+        """Put a decoded payload in L1 until its row would expire."""
+        if self.memory is None:
+            return
+        
+        remaining = fetched_at + ttl_days * DAY_S - time.time()
+        if remaining > 0:
+            self.memory.set((source, query_key), (data, fetched_at),
+                            ttl_seconds=remaining, size=size)
+    
+    def _touch(self, source: str, query_keys: List[str], now: float):
+        """Record accesses; flushed to last_accessed in batches."""
+        with self._lock:
+            for query_key in query_keys:
+                self._touched[(source, query_key)] = now
+            flush = len(self._touched) >= self._touch_flush_size
+        if flush:
+            self.flush_access_times()
+    
+    def flush_access_times(self):
+        """Write pending last_accessed updates."""
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        if not touched:
+            return
         
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(self.TOUCH_SQL, [(ts, source, query_key)
+                                              for (source, query_key), ts in touched.items()])
+            conn.execute("COMMIT")
     
-    def clear_expired(self):
-        """Remove all expired cache entries."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _load_dictionaries(self):
+        """Register stored zstd dictionaries; the newest per source is used for writes."""
+        if self.codec.compression != "zstd":
+            return
+        
+        with self._connection() as conn:
+            rows = conn.execute("SELECT dict_id, source, data FROM cache_dictionaries ORDER BY created_at, rowid").fetchall()
+        
+        for dict_id, source, data in rows:
+            self.codec.add_dictionary(data)
+            self._source_dictionaries[source] = dict_id
+    
+    def train_dictionary(self, source: str, max_samples: int = 1000,
+                         dict_size: int = 32 * 1024, recompress: bool = True) -> int:
+        """
+        Train a zstd dictionary on a source's cached payloads and use it for
+        that source's writes.
+        
+        Args:
+            source: Data source name
+            max_samples: Most recent payloads to train on
+            dict_size: Target dictionary size in bytes
+            recompress: Re-encode the source's existing rows with the dictionary
+            
+        Returns:
+            Dictionary id
+            
+        Raises:
+            ValueError: zstd unavailable, or too few samples to train on
+        """
+        if self.codec.compression != "zstd":
+            raise ValueError("Dictionaries need zstd compression")
+        
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT response_data, codec FROM cached_api_responses 
+                WHERE source = ? ORDER BY id DESC LIMIT ?
+            """, (source, max_samples)).fetchall()
         
-        cursor.execute("""
-            DELETE FROM cached_api_responses 
-            WHERE julianday('now') - julianday(fetched_at) > ttl_days
-        """)
+        try:
+            data = self.codec.train_dictionary([self.codec.decode(codec, blob)[0] for blob, codec in rows],
+                                               dict_size=dict_size)
+        except Exception as e:
+            raise ValueError(f"Could not train a dictionary for {source} from {len(rows)} rows: {e}")
         
-        deleted_count = cursor.rowcount
-        conn.commit()
-        conn.close()
+        dict_id = self.codec.add_dictionary(data)
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache_dictionaries (dict_id, source, data) VALUES (?, ?, ?)",
+                         (dict_id, source, data))
+        self._source_dictionaries[source] = dict_id
         
-        return deleted_count
+        if recompress:
+            self.recompress(source=source)
+        return dict_id
+    
+    def recompress(self, source: Optional[str] = None, legacy_only: bool = False,
+                   batch_size: int = 500) -> int:
+        """
+        Re-encode stored rows with the current codec (and source dictionary).
+        
+        Args:
+            source: Only this source (None = all)
+            legacy_only: Only rows stored as uncompressed JSON
+            batch_size: Rows per write transaction
+            
+        Returns:
+            Number of rows rewritten
+        """
+        last_id = 0
+        rewritten = 0
+        
+        while True:
+            with self._connection() as conn:
+                rows = conn.execute(self.RECOMPRESS_SELECT_SQL,
+                                    (last_id, source, source, int(legacy_only), batch_size)).fetchall()
+            if not rows:
+                return rewritten
+            
+            updates = []
+            for row_id, row_source, blob, codec in rows:
+                try:
+                    data, _ = self.codec.decode(codec, blob)
+                except Exception as e:
+                    logger.warning(f"Skipping unreadable cache row {row_id}: {e}")
+                    continue
+                new_codec, new_blob, _ = self.codec.encode(data, self._source_dictionaries.get(row_source))
+                updates.append((new_blob, new_codec, len(new_blob), row_id))
+            
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(self.RECOMPRESS_UPDATE_SQL, updates)
+                conn.execute("COMMIT")
+            
+            rewritten += len(updates)
+            last_id = rows[-1][0]
+    
+    def invalidate(self, source: str, query_key: Optional[str] = None) -> int:
+        """
+        Drop a key, or every key of a source, from both tiers.
+        
+        Args:
+            source: Data source name
+            query_key: Key to drop (None = the whole source)
+            
+        Returns:
+            Number of rows deleted from SQLite
+        """
+        if self.memory is not None:
+            if query_key is not None:
+                self.memory.delete((source, query_key))
+            else:
+                for key in self.memory.keys():
+                    if key[0] == source:
+                        self.memory.delete(key)
+        
+        with self._connection() as conn:
+            if query_key is not None:
+                cursor = conn.execute(self.INVALIDATE_KEY_SQL, (source, query_key))
+            else:
+                cursor = conn.execute(self.INVALIDATE_SOURCE_SQL, (source,))
+            return cursor.rowcount
+    
+    def _count(self, source: str, counter: str, n: int = 1):
+        with self._lock:
+            stats = self._source_stats.get(source)
+            if stats is None:
+                stats = self._source_stats[source] = {"l1_hits": 0, "l2_hits": 0, "stale_hits": 0,
+                                                     "misses": 0, "sets": 0}
+            stats[counter] += n
+    
+    def stats(self) -> dict:
+        """Per-source hit/miss counters, L1 usage and sweep totals."""
+        with self._lock:
+            sources = {}
+            for source, counts in self._source_stats.items():
+                lookups = counts["l1_hits"] + counts["l2_hits"] + counts["stale_hits"] + counts["misses"]
+                sources[source] = {
+                    **counts,
+                    "hit_rate": (counts["l1_hits"] + counts["l2_hits"]) / lookups if lookups else 0.0
+                }
+        
+        return {
+            "memory": self.memory.stats() if self.memory is not None else None,
+            "sources": sources,
+            "expired": self.expired,
+            "evicted": self.evicted
+        }
+    
+    def clear_expired(self, batch_size: int = 1000) -> int:
+        """
+        Remove cache entries that expired more than stale_grace_days ago.
+        
+        Deletes in batches so the write lock is never held for long.
+        
+        Returns:
+            Number of rows deleted
+        """
+        deleted = 0
+        cutoff = time.time() - self.stale_grace_days * DAY_S
+        
+        while True:
+            with self._connection() as conn:
+                count = conn.execute(self.CLEAR_EXPIRED_SQL, (cutoff, batch_size)).rowcount
+            deleted += count
+            if count < batch_size:
+                break
+        
+        self.expired += deleted
+        return deleted
+    
+    def usage(self) -> Dict[str, int]:
+        """Row count and stored payload bytes (scans the LRU index)."""
+        with self._connection() as conn:
+            rows, size = conn.execute(self.USAGE_SQL).fetchone()
+        return {"rows": rows, "bytes": size}
+    
+    def evict(self, batch_size: int = 500) -> int:
+        """
+        Delete least recently accessed rows until under max_rows/max_bytes,
+        leaving 10% headroom.
+        
+        Returns:
+            Number of rows evicted
+        """
+        if not self.max_rows and not self.max_bytes:
+            return 0
+        
+        self.flush_access_times()
+        usage = self.usage()
+        rows, size = usage["rows"], usage["bytes"]
+        
+        target_rows = int(self.max_rows * 0.9) if self.max_rows and rows > self.max_rows else rows
+        target_bytes = int(self.max_bytes * 0.9) if self.max_bytes and size > self.max_bytes else size
+        evicted = 0
+        
+        while rows > target_rows or size > target_bytes:
+            with self._connection() as conn:
+                victims = conn.execute(self.EVICT_SELECT_SQL, (batch_size,)).fetchall()
+            if not victims:
+                break
+            
+            chosen = []
+            for row_id, row_size in victims:
+                if rows <= target_rows and size <= target_bytes:
+                    break
+                chosen.append((row_id,))
+                rows -= 1
+                size -= row_size
+            
+            with self._connection() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(self.DELETE_ID_SQL, chosen)
+                conn.execute("COMMIT")
+            evicted += len(chosen)
+        
+        self.evicted += evicted
+        if evicted:
+            logger.info(f"Evicted {evicted} cache rows ({rows} rows, {size / 1e6:.1f} MB left)")
+        return evicted
+    
+    def sweep(self) -> Dict[str, int]:
+        """Flush access times, delete expired rows and enforce the size budget."""
+        self.flush_access_times()
+        return {"expired": self.clear_expired(), "evicted": self.evict()}
+    
+    def start_sweeper(self, interval_s: float):
+        """Run sweep() every interval_s seconds in a daemon thread."""
+        if self._sweeper is not None:
+            return
+        
+        def run():
+            while not self._stop_sweeper.wait(interval_s):
+                try:
+                    self.sweep()
+                except Exception as e:
+                    logger.error(f"Cache sweep failed: {e}")
+        
+        self._stop_sweeper.clear()
+        self._sweeper = threading.Thread(target=run, name="cache-sweeper", daemon=True)
+        self._sweeper.start()
+    
+    def stop_sweeper(self):
+        """Stop the background sweeper."""
+        if self._sweeper is not None:
+            self._stop_sweeper.set()
+            self._sweeper.join()
+            self._sweeper = None
     
     def clear_all(self):
         """Clear entire cache."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        if self.memory is not None:
+            self.memory.clear()
         
-        cursor.execute("DELETE FROM cached_api_responses")
+        with self._connection() as conn:
+            conn.execute(self.CLEAR_ALL_SQL)
+    
+    def close(self):
+        """Stop the sweeper, flush access times and close all pooled connections."""
+        self.stop_sweeper()
+        self.flush_access_times()
         
-        conn.commit()
-        conn.close()
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
@@ -3,12 +3,25 @@ Loads and parses instruction JSON files for crawler agents.
 """
 
 import json
-from typing import Dict, List
+import threading
+from typing import Dict, List, Tuple
 from pathlib import Path
 
+from utils.instruction_plan import InstructionPlan
+
 
 class InstructionLoader:
-    """Loads instruction JSON files for different model types."""
+    """
+    Loads instruction JSON files for different model types.
+    
+    Each file is parsed, validated and compiled into an InstructionPlan once
+    and kept in a process-wide cache; a stat() per call notices edits (by
+    mtime and size) and recompiles. Plans are read-only, so every caller
+    can share them.
+    """
+    
+    _plans: Dict[Path, Tuple[Tuple[int, int], InstructionPlan]] = {}
+    _plans_lock = threading.Lock()
     
     def __init__(self, config_dir: str = "config/instructions"):
         """
@@ -19,35 +32,39 @@ class InstructionLoader:
         """
         self.config_dir = Path(config_dir)
     
-    def load(self, model_type: str) -> Dict:
+    def load(self, model_type: str) -> InstructionPlan:
         """
         Load instruction JSON for given model type.
         
         Args:
             model_type: Model identifier (e.g., "house_general", "business_restaurant")
-            
+        
         Returns:
-            Instruction configuration dict
-            
+            Compiled instructions (a read-only mapping shaped like the JSON)
+        
         Raises:
             FileNotFoundError: If instruction file doesn't exist
             ValueError: If required fields missing
         """
         file_path = self.config_dir / f"{model_type}_instructions.json"
         
-        if not file_path.exists():
-            raise FileNotFoundError(f"Instruction file not found: {file_path}")
+        try:
+            stat = file_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Instruction file not found: {file_path}") from None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        
+        cached = self._plans.get(file_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
         
         with open(file_path, 'r') as f:
             instructions = json.load(f)
         
-        # Validate required fields
-        required = ["model_type", "crawler_1", "crawler_2", "crawler_3"]
-        for field in required:
-            if field not in instructions:
-                raise ValueError(f"Missing required field '{field}' in {file_path}")
-        
-        return instructions
+        plan = InstructionPlan(instructions, str(file_path))
+        with self._plans_lock:
+            self._plans[file_path] = (stamp, plan)
+        return plan
     
     def get_crawler_configs(self, model_type: str) -> List[Dict]:
         """
@@ -55,16 +72,11 @@ class InstructionLoader:
         
         Args:
             model_type: Model identifier
-            
+        
         Returns:
-            List of 3 crawler configuration dicts
+            List of 3 compiled crawler configurations
         """
-        instructions = self.load(model_type)
-        return [
-            instructions["crawler_1"],
-            instructions["crawler_2"],
-            instructions["crawler_3"]
-        ]
+        return list(self.load(model_type).crawlers)
     
     def get_feature_config(self, model_type: str) -> Dict:
         """
@@ -72,9 +84,14 @@ class InstructionLoader:
         
         Args:
             model_type: Model identifier
-            
+        
         Returns:
-            Feature engineering configuration dict
+            Feature engineering configuration (read-only)
         """
-        instructions = self.load(model_type)
-        return instructions.get("feature_engineering", {})
+        return self.load(model_type).feature_config
+    
+    @classmethod
+    def clear_cache(cls):
+        """Forget every compiled plan."""
+        with cls._plans_lock:
+            cls._plans.clear()
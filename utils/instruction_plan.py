@@ -0,0 +1,247 @@
+"""
+Compiled, read-only execution plans for instruction JSON files.
+"""
+
+import importlib
+import logging
+import re
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PLACEHOLDER_PATTERN = re.compile(r"\{(user_input|derived)\.([A-Za-z0-9_]+)\}")
+
+# Source types CrawlerAgent can fetch; sources with a "source" reference
+# reuse another source's result whatever their type
+SUPPORTED_SOURCE_TYPES = {"rest_api", "bulk_csv", "csv_static"}
+
+REQUIRED_FIELDS = ["model_type", "crawler_1", "crawler_2", "crawler_3"]
+CRAWLER_KEYS = ["crawler_1", "crawler_2", "crawler_3"]
+
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of parsed JSON: dicts become mapping proxies, lists tuples."""
+    if isinstance(value, Mapping):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+class Template:
+    """
+    A template string split once into literals and {user_input.x} /
+    {derived.x} placeholders, so rendering is a join, not a search.
+    Non-string values (e.g. "_limit": 100) render as themselves.
+    """
+    
+    __slots__ = ("source", "parts")
+    
+    def __init__(self, source: Any):
+        self.source = source
+        self.parts: Optional[Tuple] = None
+        
+        if isinstance(source, str) and PLACEHOLDER_PATTERN.search(source):
+            parts = []
+            position = 0
+            for match in PLACEHOLDER_PATTERN.finditer(source):
+                if match.start() > position:
+                    parts.append(source[position:match.start()])
+                parts.append((match.group(1), match.group(2), match.group(0)))
+                position = match.end()
+            if position < len(source):
+                parts.append(source[position:])
+            self.parts = tuple(parts)
+    
+    @staticmethod
+    def of(source: Any) -> "Template":
+        """Compiled template, shared per distinct string."""
+        if isinstance(source, str):
+            return _compile_string(source)
+        return Template(source)
+    
+    @property
+    def placeholders(self) -> Tuple[Tuple[str, str], ...]:
+        """(namespace, key) of each placeholder."""
+        return tuple(part[:2] for part in self.parts or () if isinstance(part, tuple))
+    
+    def render(self, user_input: Dict[str, Any]) -> Any:
+        """
+        Substitute values from user_input (and its "derived" dict).
+        
+        Placeholders without a value are left as they are.
+        """
+        if self.parts is None:
+            return self.source
+        
+        derived = user_input.get("derived") or {}
+        out = []
+        for part in self.parts:
+            if isinstance(part, str):
+                out.append(part)
+                continue
+            namespace, key, text = part
+            scope = user_input if namespace == "user_input" else derived
+            out.append(str(scope[key]) if key in scope else text)
+        return "".join(out)
+
+
+@lru_cache(maxsize=4096)
+def _compile_string(source: str) -> Template:
+    return Template(source)
+
+
+def _collect_derived(value: Any, found: set):
+    """Every {derived.x} name used anywhere in a source definition."""
+    if isinstance(value, str):
+        found.update(key for namespace, key in Template.of(value).placeholders if namespace == "derived")
+    elif isinstance(value, Mapping):
+        for item in value.values():
+            _collect_derived(item, found)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _collect_derived(item, found)
+
+
+@lru_cache(maxsize=None)
+def resolve_schema(name: Optional[str]) -> Optional[type]:
+    """The pydantic model named by "pydantic_schema", if schemas defines it."""
+    if not name:
+        return None
+    return getattr(importlib.import_module("schemas"), name, None)
+
+
+class _FrozenMapping(Mapping):
+    """Read-only Mapping over a frozen config, so plans drop in for dicts."""
+    
+    def __init__(self, config: Mapping):
+        self._config = config
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._config[key]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._config)
+    
+    def __len__(self) -> int:
+        return len(self._config)
+    
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self._config)!r})"
+
+
+class SourcePlan(_FrozenMapping):
+    """
+    One data source, compiled: templates parsed, derived inputs listed,
+    schema and type resolved. Reads like the source's JSON dict.
+    """
+    
+    def __init__(self, config: Mapping):
+        """
+        Compile a source definition.
+        
+        Raises:
+            ValueError: Source has no name or no type
+        """
+        super().__init__(freeze(config))
+        self.name = self._config.get("name")
+        self.type = self._config.get("type")
+        if not self.name or not self.type:
+            raise ValueError(f"Data source needs a name and a type: {dict(config)}")
+        
+        self.upstream = self._config.get("source")
+        self.supported = bool(self.upstream) or self.type in SUPPORTED_SOURCE_TYPES
+        
+        url = self._config.get("url")
+        self.url = Template.of(url) if url is not None else None
+        self.params = tuple((key, Template.of(value))
+                            for key, value in self._config.get("params_mapping", {}).items())
+        self.filter = tuple((key, Template.of(value))
+                            for key, value in self._config.get("filter", {}).items())
+        self.headers = self._config.get("headers")
+        
+        found = set()
+        _collect_derived(self._config, found)
+        self.derived = tuple(sorted(found))
+        
+        self.schema_name = self._config.get("pydantic_schema")
+        self.schema = resolve_schema(self.schema_name)
+    
+    @staticmethod
+    def of(config: Mapping) -> "SourcePlan":
+        """config itself if already compiled, else a fresh plan for it."""
+        return config if isinstance(config, SourcePlan) else SourcePlan(config)
+
+
+class CrawlerPlan(_FrozenMapping):
+    """A crawler with its sources compiled; "data_sources" holds SourcePlans."""
+    
+    def __init__(self, crawler_id: str, config: Mapping):
+        """
+        Compile a crawler definition.
+        
+        Raises:
+            ValueError: Invalid source, or two sources with the same name
+        """
+        sources = tuple(SourcePlan(source) for source in config.get("data_sources", []))
+        names = [source.name for source in sources]
+        duplicates = sorted({name for name in names if names.count(name) > 1})
+        if duplicates:
+            raise ValueError(f"{crawler_id}: duplicate data source names {duplicates}")
+        
+        frozen = dict(freeze({key: value for key, value in config.items() if key != "data_sources"}))
+        frozen["data_sources"] = sources
+        super().__init__(MappingProxyType(frozen))
+        
+        self.id = crawler_id
+        self.name = config.get("name", "UnnamedCrawler")
+        self.sources = sources
+
+
+class InstructionPlan(_FrozenMapping):
+    """
+    A whole instruction file, compiled once: validated, frozen and with
+    every crawler and source compiled. Reads like the parsed JSON.
+    """
+    
+    def __init__(self, instructions: Mapping, path: str = "<memory>"):
+        """
+        Compile parsed instructions.
+        
+        Args:
+            instructions: Parsed instruction JSON
+            path: Where it came from (for error messages)
+        
+        Raises:
+            ValueError: If required fields missing or a source is invalid
+        """
+        for field in REQUIRED_FIELDS:
+            if field not in instructions:
+                raise ValueError(f"Missing required field '{field}' in {path}")
+        
+        try:
+            crawlers = tuple(CrawlerPlan(key, instructions[key]) for key in CRAWLER_KEYS)
+        except ValueError as e:
+            raise ValueError(f"{e} in {path}") from None
+        
+        frozen = dict(freeze({key: value for key, value in instructions.items()
+                              if key not in CRAWLER_KEYS}))
+        frozen.update(zip(CRAWLER_KEYS, crawlers))
+        super().__init__(MappingProxyType(frozen))
+        
+        self.path = path
+        self.model_type = instructions["model_type"]
+        self.crawlers = crawlers
+        self.feature_config = frozen.get("feature_engineering", MappingProxyType({}))
+        
+        sources = [source for crawler in crawlers for source in crawler.sources]
+        unsupported = sorted({source.type for source in sources if not source.supported})
+        if unsupported:
+            logger.warning(f"{path}: source types not fetched yet: {', '.join(unsupported)}")
+        missing = sorted({source.schema_name for source in sources
+                          if source.schema_name and source.schema is None})
+        if missing:
+            logger.info(f"{path}: schemas not defined yet: {', '.join(missing)}")
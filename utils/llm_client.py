@@ -0,0 +1,125 @@
+"""
+Async client for the local Ollama LLM with pooled connections.
+"""
+
+import asyncio
+import json
+import os
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from utils.api_client import close_on_loop
+
+
+class LLMClient:
+    """
+    Shared async HTTP client for Ollama's /api/generate.
+    
+    One httpx.AsyncClient (and its keep-alive connection pool) is reused for
+    every call made from the same event loop; moving to a new loop closes
+    the previous loop's client. Each call has an overall
+    deadline on top of httpx's connect/read timeouts.
+    """
+    
+    def __init__(self, base_url: Optional[str] = None, model: Optional[str] = None,
+                 max_connections: int = 16, connect_timeout: float = 2.0,
+                 timeout: float = 30.0,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        """
+        Initialize LLM client.
+        
+        Args:
+            base_url: Ollama server (default OLLAMA_API_URL or localhost:11434)
+            model: Model name (default OLLAMA_MODEL or llama3.2:3b)
+            max_connections: Connection pool size
+            connect_timeout: Seconds to establish a connection
+            timeout: Default overall deadline per call in seconds
+            transport: Custom httpx transport (e.g. httpx.MockTransport in tests)
+        """
+        self.base_url = (base_url or os.getenv("OLLAMA_API_URL", "http://localhost:11434")).rstrip("/")
+        self.model = model or os.getenv("OLLAMA_MODEL", "llama3.2:3b")
+        self.generate_url = f"{self.base_url}/api/generate"
+        self.max_connections = max_connections
+        self.connect_timeout = connect_timeout
+        self.timeout = timeout
+        self.transport = transport
+        
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Pooled client bound to the running event loop (the previous loop's is closed)."""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and self._loop is not loop:
+            close_on_loop(self._client, self._loop)
+            self._client = None
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                transport=self.transport
+            )
+            self._loop = loop
+        return self._client
+    
+    async def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """
+        Generate a complete response.
+        
+        Args:
+            prompt: Prompt text
+            timeout: Overall deadline in seconds (default self.timeout)
+        
+        Returns:
+            Response text, stripped
+        
+        Raises:
+            TimeoutError: Deadline exceeded
+            httpx.HTTPError: Connection or HTTP status error
+        """
+        async with asyncio.timeout(timeout or self.timeout):
+            response = await self._get_client().post(
+                self.generate_url,
+                json={"model": self.model, "prompt": prompt, "stream": False}
+            )
+            response.raise_for_status()
+            return response.json()["response"].strip()
+    
+    async def stream(self, prompt: str, timeout: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Stream response tokens as Ollama generates them.
+        
+        Args:
+            prompt: Prompt text
+            timeout: Overall deadline for the whole generation in seconds
+        
+        Yields:
+            Non-empty tokens, until Ollama reports done
+        """
+        async with asyncio.timeout(timeout or self.timeout):
+            async with self._get_client().stream(
+                "POST", self.generate_url,
+                json={"model": self.model, "prompt": prompt, "stream": True}
+            ) as response:
+                response.raise_for_status()
+                
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    token = chunk.get("response", "")
+                    if token:
+                        yield token
+                    if chunk.get("done"):
+                        return
+    
+    async def aclose(self):
+        """Close the pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._loop = None
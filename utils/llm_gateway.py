@@ -0,0 +1,179 @@
+"""
+Admission control and latency budgets for LLM calls.
+"""
+
+import asyncio
+import logging
+from typing import AsyncIterator, Callable, Optional
+
+from utils.llm_client import LLMClient
+
+logger = logging.getLogger(__name__)
+
+
+class LLMUnavailable(Exception):
+    """The gateway shed a call (queue full or no slot within the max wait)."""
+
+
+class LLMGateway:
+    """
+    Limits concurrent generations on the local LLM server.
+    
+    At most max_concurrency generations run at once; up to max_queue callers
+    wait for a slot, each for at most max_wait_s, and anyone beyond that is
+    turned away immediately. generate() also enforces a per-call latency
+    budget: when it runs out the caller gets None straight away (and falls back
+    to its template) while the generation keeps its slot and finishes in the
+    background, handing the late text to an optional callback for caching.
+    
+    Must be used from a single event loop.
+    """
+    
+    def __init__(self, client: Optional[LLMClient] = None, max_concurrency: int = 2,
+                 max_queue: int = 32, max_wait_s: float = 2.0, budget_s: float = 8.0):
+        """
+        Initialize LLM gateway.
+        
+        Args:
+            client: Async LLM client
+            max_concurrency: Generations allowed to run at once
+            max_queue: Callers allowed to wait for a slot
+            max_wait_s: Longest a caller waits for a slot
+            budget_s: Default latency budget for generate()
+        """
+        self.client = client or LLMClient()
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.max_wait_s = max_wait_s
+        self.budget_s = budget_s
+        
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._tasks: set = set()
+        self.running = 0
+        self.waiting = 0
+        
+        self.completed = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.over_budget = 0
+        self.late_results = 0
+        self.errors = 0
+    
+    async def _admit(self, max_wait_s: float):
+        """Take a generation slot or raise LLMUnavailable."""
+        if not self._semaphore.locked():
+            # Free slot: acquire() returns without suspending
+            await self._semaphore.acquire()
+            self.running += 1
+            return
+        
+        if self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise LLMUnavailable("LLM queue is full")
+        
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), max(max_wait_s, 0))
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise LLMUnavailable(f"No LLM slot within {max_wait_s:.1f}s")
+        finally:
+            self.waiting -= 1
+        
+        self.running += 1
+    
+    def _release(self):
+        self.running -= 1
+        self._semaphore.release()
+    
+    async def generate(self, prompt: str, budget_s: Optional[float] = None,
+                       on_late_result: Optional[Callable[[str], None]] = None) -> Optional[str]:
+        """
+        Generate within a latency budget.
+        
+        Args:
+            prompt: Prompt text
+            budget_s: Total time the caller is willing to wait, queueing included
+            on_late_result: Called with the text if it arrives after the budget
+        
+        Returns:
+            Generated text, or None if the call was shed, failed or ran over budget
+        """
+        loop = asyncio.get_running_loop()
+        budget = budget_s if budget_s is not None else self.budget_s
+        deadline = loop.time() + budget
+        
+        try:
+            await self._admit(min(self.max_wait_s, budget))
+        except LLMUnavailable as e:
+            logger.warning(f"LLM busy: {e}, using fallback")
+            return None
+        
+        task = loop.create_task(self._generate(prompt))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        
+        try:
+            text = await asyncio.wait_for(asyncio.shield(task), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            self.over_budget += 1
+            task.add_done_callback(lambda t: self._finish_late(t, on_late_result))
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"LLM error: {e}, using fallback")
+            return None
+        
+        self.completed += 1
+        return text
+    
+    async def _generate(self, prompt: str) -> str:
+        """Run one generation, holding a slot until it finishes."""
+        try:
+            return await self.client.generate(prompt)
+        finally:
+            self._release()
+    
+    def _finish_late(self, task: asyncio.Task, on_late_result: Optional[Callable[[str], None]]):
+        """Hand a generation that outlived its budget to the callback."""
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            self.errors += 1
+            return
+        
+        self.late_results += 1
+        if on_late_result is not None:
+            on_late_result(task.result())
+    
+    async def stream(self, prompt: str, max_wait_s: Optional[float] = None) -> AsyncIterator[str]:
+        """
+        Stream tokens once a slot is free; the slot is held until the stream ends.
+        
+        Raises:
+            LLMUnavailable: Queue full or no slot within max_wait_s
+        """
+        await self._admit(max_wait_s if max_wait_s is not None else self.max_wait_s)
+        try:
+            async for token in self.client.stream(prompt):
+                yield token
+            self.completed += 1
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            self._release()
+    
+    def stats(self) -> dict:
+        """Slot usage and outcome counters."""
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "queue_timeouts": self.queue_timeouts,
+            "over_budget": self.over_budget,
+            "late_results": self.late_results,
+            "errors": self.errors
+        }
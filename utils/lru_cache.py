@@ -0,0 +1,118 @@
+"""
+Thread-safe in-memory LRU cache with TTL.
+"""
+
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class LRUCache:
+    """Size-bounded LRU cache whose entries also expire after a TTL."""
+    
+    def __init__(self, max_entries: int = 1024, ttl_seconds: Optional[float] = None,
+                 max_bytes: Optional[int] = None):
+        """
+        Initialize LRU cache.
+        
+        Args:
+            max_entries: Least recently used entries are evicted beyond this
+            ttl_seconds: Entry lifetime (None = no expiry)
+            max_bytes: Evict beyond this total of the sizes passed to set()
+                (None = no byte limit)
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Return cached value, or None if missing/expired.
+        
+        Args:
+            key: Cache key
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at, size = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.bytes -= size
+                self.misses += 1
+                return None
+            
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None,
+            size: int = 0):
+        """
+        Store a value.
+        
+        Args:
+            key: Cache key
+            value: Value to cache
+            ttl_seconds: Override the default TTL for this entry
+            size: Approximate size in bytes, counted against max_bytes
+        """
+        ttl = ttl_seconds if ttl_seconds is not None else self.ttl_seconds
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            
+            self._data[key] = (value, expires_at, size)
+            self.bytes += size
+            
+            while self._data and (len(self._data) > self.max_entries or
+                                  (self.max_bytes is not None and self.bytes > self.max_bytes)):
+                _, (_, _, evicted_size) = self._data.popitem(last=False)
+                self.bytes -= evicted_size
+    
+    def delete(self, key: Hashable):
+        """Remove a key if present."""
+        with self._lock:
+            entry = self._data.pop(key, None)
+            if entry is not None:
+                self.bytes -= entry[2]
+    
+    def keys(self) -> list:
+        """Snapshot of the keys, least recently used first."""
+        with self._lock:
+            return list(self._data)
+    
+    def clear(self):
+        """Remove everything."""
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def stats(self) -> dict:
+        """Hit/miss counters."""
+        total = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
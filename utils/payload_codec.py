@@ -0,0 +1,156 @@
+"""
+Compressed serialization for cached API payloads.
+"""
+
+import json
+import logging
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+# Optional: faster JSON and better compression; fall back to json/zlib
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Codec ids stored with each row. zstd frames carry their dictionary id,
+# so dictionary-compressed rows need no extra bookkeeping.
+CODEC_JSON = 0   # Uncompressed JSON text (rows written before compression)
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+
+COMPRESSION_CODECS = {"none": CODEC_JSON, "zlib": CODEC_ZLIB, "zstd": CODEC_ZSTD}
+
+
+def dumps(data: Any) -> bytes:
+    """Serialize to JSON bytes (orjson when installed)."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+        except TypeError:
+            pass
+    return json.dumps(data).encode("utf-8")
+
+
+def loads(raw) -> Any:
+    """Parse JSON bytes or text (orjson when installed)."""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+class PayloadCodec:
+    """
+    Encodes payloads as compressed JSON and decodes any codec ever written.
+    
+    zstd can use a dictionary trained on one source's payloads, which is
+    where most of the gain is for small, repetitive API responses.
+    """
+    
+    def __init__(self, compression: str = "auto", level: Optional[int] = None):
+        """
+        Initialize payload codec.
+        
+        Args:
+            compression: "zstd", "zlib", "none", or "auto" (zstd if installed,
+                else zlib)
+            level: Compression level (default 3 for zstd, 6 for zlib)
+        """
+        if compression == "auto":
+            compression = "zstd" if zstandard is not None else "zlib"
+        if compression not in COMPRESSION_CODECS:
+            raise ValueError(f"Unknown compression: {compression}")
+        if compression == "zstd" and zstandard is None:
+            logger.warning("zstandard not installed, compressing with zlib")
+            compression = "zlib"
+        
+        self.compression = compression
+        self.codec = COMPRESSION_CODECS[compression]
+        self.level = level if level is not None else (3 if compression == "zstd" else 6)
+        
+        # dict_id -> ZstdCompressionDict
+        self.dictionaries: Dict[int, Any] = {}
+    
+    def add_dictionary(self, data: bytes) -> int:
+        """
+        Register a trained zstd dictionary for decoding (and encoding).
+        
+        Returns:
+            The dictionary's id
+        """
+        dictionary = zstandard.ZstdCompressionDict(data)
+        dictionary.precompute_compress(level=self.level)
+        self.dictionaries[dictionary.dict_id()] = dictionary
+        return dictionary.dict_id()
+    
+    def encode(self, data: Any, dict_id: Optional[int] = None) -> Tuple[int, Any, bytes]:
+        """
+        Serialize and compress.
+        
+        Args:
+            data: JSON-serializable payload
+            dict_id: zstd dictionary to compress with (ignored for zlib/none)
+        
+        Returns:
+            (codec, blob to store, uncompressed JSON bytes)
+        """
+        raw = dumps(data)
+        
+        if self.codec == CODEC_ZSTD:
+            dictionary = self.dictionaries.get(dict_id) if dict_id is not None else None
+            compressor = zstandard.ZstdCompressor(level=self.level, dict_data=dictionary)
+            return CODEC_ZSTD, compressor.compress(raw), raw
+        if self.codec == CODEC_ZLIB:
+            return CODEC_ZLIB, zlib.compress(raw, self.level), raw
+        return CODEC_JSON, raw.decode("utf-8"), raw
+    
+    def decode(self, codec: int, blob) -> Tuple[Any, int]:
+        """
+        Decompress and parse a stored payload.
+        
+        Returns:
+            (payload, uncompressed size)
+        
+        Raises:
+            ValueError: Unknown codec, zstd missing, or unknown dictionary
+        """
+        if codec == CODEC_JSON:
+            raw = blob
+        elif codec == CODEC_ZLIB:
+            raw = zlib.decompress(blob)
+        elif codec == CODEC_ZSTD:
+            if zstandard is None:
+                raise ValueError("zstd payload but zstandard is not installed")
+            dict_id = zstandard.get_frame_parameters(blob).dict_id
+            dictionary = None
+            if dict_id:
+                dictionary = self.dictionaries.get(dict_id)
+                if dictionary is None:
+                    raise ValueError(f"Unknown zstd dictionary {dict_id}")
+            raw = zstandard.ZstdDecompressor(dict_data=dictionary).decompress(blob)
+        else:
+            raise ValueError(f"Unknown codec: {codec}")
+        
+        return loads(raw), len(raw)
+    
+    def train_dictionary(self, samples: list, dict_size: int = 32 * 1024) -> bytes:
+        """
+        Train a zstd dictionary from sample payloads.
+        
+        Args:
+            samples: Payloads (JSON-serializable) from one source
+            dict_size: Target dictionary size in bytes
+        
+        Returns:
+            Dictionary bytes, to store and pass to add_dictionary()
+        """
+        if zstandard is None:
+            raise ValueError("Dictionary training needs zstandard")
+        return zstandard.train_dictionary(dict_size, [dumps(s) for s in samples]).as_bytes()
@@ -0,0 +1,257 @@
+"""
+Per-host token-bucket rate limiting for outbound API calls.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Hosts without a "rate_limit" in the instructions (0 = unlimited)
+RATE_LIMIT_DEFAULT_RPS = float(os.getenv("RATE_LIMIT_DEFAULT_RPS", "0"))
+
+# Longest a request waits for its turn before giving up (seconds)
+RATE_LIMIT_MAX_WAIT_S = float(os.getenv("RATE_LIMIT_MAX_WAIT_S", "30"))
+
+
+class RateLimited(Exception):
+    """A request would have to wait longer than the limiter's max_wait_s."""
+
+
+def host_of(url: str) -> str:
+    """Host (with port, if any) of a URL; bare host names pass through."""
+    if "://" in url:
+        return urlsplit(url).netloc.lower()
+    return url.lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds to wait from a Retry-After header.
+    
+    Args:
+        value: Header value, delta-seconds or an HTTP-date
+    
+    Returns:
+        Seconds from now (never negative), or None if missing or unparseable
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class TokenBucket:
+    """
+    Token bucket: rate tokens per second, holding at most burst.
+    
+    Callers reserve a token and are told how long to wait for it, so waiting
+    happens outside the lock and queued callers are served in order. A host
+    can also be paused (e.g. after a 429 with Retry-After); tokens don't
+    accumulate while it is.
+    """
+    
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        """
+        Initialize token bucket.
+        
+        Args:
+            rate: Tokens per second (0 = unlimited, pauses still apply)
+            burst: Bucket size (default max(rate, 1))
+        """
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.burst
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _refill(self, now: float):
+        start = max(self._updated, self.paused_until)
+        if self.rate > 0 and now > start:
+            self.tokens = min(self.burst, self.tokens + (now - start) * self.rate)
+        self._updated = max(self._updated, now)
+    
+    def reserve(self, max_wait_s: Optional[float] = None) -> float:
+        """
+        Take a token.
+        
+        Args:
+            max_wait_s: Don't take it if it would mean waiting longer than this
+        
+        Returns:
+            Seconds to wait before using the token
+        
+        Raises:
+            RateLimited: The wait would exceed max_wait_s
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            
+            delay = max(self.paused_until - now, 0.0)
+            if self.rate > 0:
+                delay += max(1.0 - self.tokens, 0.0) / self.rate
+            
+            if max_wait_s is not None and delay > max_wait_s:
+                raise RateLimited(f"Would wait {delay:.1f}s (max {max_wait_s:.1f}s)")
+            
+            if self.rate > 0:
+                self.tokens -= 1.0
+            return delay
+    
+    def pause(self, seconds: float):
+        """Hold all requests for seconds and empty the bucket."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.paused_until = max(self.paused_until, now + seconds)
+            self.tokens = min(self.tokens, 0.0)
+
+
+class RateLimiter:
+    """
+    One token bucket per host, shared by the sync and async API clients.
+    
+    Limits come from the "rate_limit" of each source in the instruction JSON;
+    when several sources call the same host, the strictest limit wins. Hosts
+    nobody configured get RATE_LIMIT_DEFAULT_RPS. Thread-safe.
+    """
+    
+    _shared: Optional["RateLimiter"] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, default_rate: float = RATE_LIMIT_DEFAULT_RPS,
+                 max_wait_s: float = RATE_LIMIT_MAX_WAIT_S):
+        """
+        Initialize rate limiter.
+        
+        Args:
+            default_rate: Requests per second for unconfigured hosts (0 = unlimited)
+            max_wait_s: Longest a request waits for its turn
+        """
+        self.default_rate = default_rate
+        self.max_wait_s = max_wait_s
+        
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._configured = set()
+        self._lock = threading.Lock()
+        
+        self.throttled = 0
+        self.rejected = 0
+        self.penalties = 0
+        self.waited_s = 0.0
+    
+    @classmethod
+    def shared(cls) -> "RateLimiter":
+        """Process-wide limiter."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def configure(self, url: str, requests_per_second: float, burst: Optional[float] = None):
+        """
+        Set a host's limit.
+        
+        Args:
+            url: Any URL on the host (or the bare host)
+            requests_per_second: Sustained request rate
+            burst: Requests allowed back to back (default max(rate, 1))
+        """
+        host = host_of(url)
+        burst = burst if burst is not None else max(requests_per_second, 1.0)
+        
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if host in self._configured and bucket.rate > 0:
+                requests_per_second = min(requests_per_second, bucket.rate)
+                burst = min(burst, bucket.burst)
+                if (requests_per_second, burst) == (bucket.rate, bucket.burst):
+                    return
+            
+            self._buckets[host] = TokenBucket(requests_per_second, burst)
+            self._configured.add(host)
+        
+        logger.info(f"Rate limit for {host}: {requests_per_second}/s, burst {burst}")
+    
+    def _bucket(self, url: str) -> TokenBucket:
+        host = host_of(url)
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(self.default_rate)
+            return bucket
+    
+    def _reserve(self, url: str) -> float:
+        try:
+            delay = self._bucket(url).reserve(self.max_wait_s)
+        except RateLimited as e:
+            self.rejected += 1
+            raise RateLimited(f"{host_of(url)}: {e}") from None
+        
+        if delay > 0:
+            self.throttled += 1
+            self.waited_s += delay
+        return delay
+    
+    def acquire(self, url: str):
+        """
+        Block until a request to url's host may be sent.
+        
+        Raises:
+            RateLimited: The wait would exceed max_wait_s
+        """
+        delay = self._reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+    
+    async def aacquire(self, url: str):
+        """acquire() that sleeps without blocking the event loop."""
+        delay = self._reserve(url)
+        if delay > 0:
+            await asyncio.sleep(delay)
+    
+    def penalize(self, url: str, retry_after_s: Optional[float] = None):
+        """
+        Back off a host that answered 429/503.
+        
+        Args:
+            url: URL that was rate limited
+            retry_after_s: Server's Retry-After; without one the bucket is
+                only emptied, so requests continue at the sustained rate
+        """
+        self.penalties += 1
+        seconds = retry_after_s or 0.0
+        self._bucket(url).pause(seconds)
+        logger.warning(f"Rate limited by {host_of(url)}, pausing {seconds:.1f}s")
+    
+    def stats(self) -> dict:
+        """Throttling counters and per-host limits."""
+        with self._lock:
+            hosts = {host: {"rate": b.rate, "burst": b.burst}
+                     for host, b in self._buckets.items()}
+        return {
+            "hosts": hosts,
+            "throttled": self.throttled,
+            "rejected": self.rejected,
+            "penalties": self.penalties,
+            "waited_s": round(self.waited_s, 3)
+        }
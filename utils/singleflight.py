@@ -0,0 +1,103 @@
+"""
+Request coalescing: concurrent calls for the same key share one execution.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    In-flight registry keyed by e.g. (source, cache_key).
+    
+    The first caller for a key runs the function; callers arriving while it
+    runs wait for and share its result (or exception) instead of repeating
+    the work. Threads and asyncio tasks can join the same flight: each flight
+    is a concurrent.futures.Future, which threads block on and coroutines
+    await through asyncio.wrap_future.
+    """
+    
+    def __init__(self):
+        self._flights: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        
+        self.leaders = 0
+        self.followers = 0
+    
+    def _join(self, key: Hashable):
+        """Return (future, is_leader)."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self.followers += 1
+                return future, False
+            
+            future = self._flights[key] = Future()
+            self.leaders += 1
+            return future, True
+    
+    def _land(self, key: Hashable, future: Future):
+        with self._lock:
+            if self._flights.get(key) is future:
+                del self._flights[key]
+    
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Run fn(*args, **kwargs) once per key at a time, from a thread.
+        
+        Returns:
+            fn's result, shared with every caller that joined the flight
+        """
+        future, leader = self._join(key)
+        if not leader:
+            return future.result()
+        
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._land(key, future)
+        
+        future.set_result(result)
+        return result
+    
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Coroutine version of do().
+        
+        A coroutine function is awaited on the caller's loop; a plain function
+        runs in a worker thread. The work runs in its own task, so cancelling
+        the leader does not cancel it for the followers.
+        """
+        future, leader = self._join(key)
+        if leader:
+            if asyncio.iscoroutinefunction(fn):
+                work = asyncio.ensure_future(fn(*args, **kwargs))
+            else:
+                work = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+            work.add_done_callback(lambda task: self._settle(key, future, task))
+        
+        return await asyncio.wrap_future(future)
+    
+    def _settle(self, key: Hashable, future: Future, task: asyncio.Task):
+        """Copy a finished leader task into the shared future."""
+        self._land(key, future)
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+    
+    def in_flight(self) -> int:
+        """Number of keys currently being executed."""
+        with self._lock:
+            return len(self._flights)
+    
+    def stats(self) -> dict:
+        """Leader/follower counters."""
+        return {"in_flight": self.in_flight(), "leaders": self.leaders, "followers": self.followers}
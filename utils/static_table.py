@@ -0,0 +1,309 @@
+"""
+Indexed, memory-mapped static tables for csv_static sources.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+from utils.instruction_plan import PLACEHOLDER_PATTERN
+
+logger = logging.getLogger(__name__)
+
+# Where converted tables are kept (one Arrow file per CSV version)
+STATIC_TABLE_DIR = os.getenv("STATIC_TABLE_DIR", "data/cache/static")
+
+# Rows returned per request at most (source "max_rows")
+STATIC_MAX_ROWS = int(os.getenv("STATIC_MAX_ROWS", "1000"))
+
+RANGE_SUFFIXES = (("_from", ">="), ("_to", "<="))
+CONTAINS_SUFFIX = "_contains"
+
+
+class StaticTable:
+    """
+    A converted CSV, memory-mapped read-only and filtered through indexes.
+    
+    Equality and list filters look rows up in per-column hash indexes,
+    "<column>_from"/"<column>_to" ranges use sorted indexes, and
+    "<column>_contains" matches substrings on the remaining rows. Indexes
+    are built on first use of a column and kept for the table's lifetime,
+    so a filter costs a few dict and numpy operations. Thread-safe.
+    """
+    
+    def __init__(self, arrow_path: str):
+        """
+        Initialize static table.
+        
+        Args:
+            arrow_path: Arrow IPC file written by StaticTableStore
+        """
+        self.path = arrow_path
+        self._mmap = pa.memory_map(arrow_path, "r")
+        self.table = pa.ipc.open_file(self._mmap).read_all()
+        self.num_rows = self.table.num_rows
+        self.columns = set(self.table.column_names)
+        
+        self._hash: Dict[str, Tuple[np.ndarray, Dict[Any, int], List[np.ndarray]]] = {}
+        self._sorted: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+    
+    def _hash_index(self, column: str) -> Tuple[np.ndarray, Dict[Any, int], List[np.ndarray]]:
+        """(dictionary code per row, value -> code, ascending rows per code)."""
+        index = self._hash.get(column)
+        if index is not None:
+            return index
+        
+        with self._lock:
+            if column not in self._hash:
+                encoded = self.table.column(column).combine_chunks().dictionary_encode()
+                codes = encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)
+                order = np.argsort(codes, kind="stable")
+                bounds = np.searchsorted(codes[order], np.arange(len(encoded.dictionary) + 1))
+                values = encoded.dictionary.to_pylist()
+                self._hash[column] = (
+                    codes,
+                    {value: code for code, value in enumerate(values)},
+                    [order[bounds[code]:bounds[code + 1]] for code in range(len(values))]
+                )
+            return self._hash[column]
+    
+    def _sorted_index(self, column: str) -> Tuple[np.ndarray, np.ndarray]:
+        """(non-null values ascending, their row numbers)."""
+        index = self._sorted.get(column)
+        if index is not None:
+            return index
+        
+        with self._lock:
+            if column not in self._sorted:
+                valid = np.flatnonzero(pc.is_valid(self.table.column(column)).to_numpy(zero_copy_only=False))
+                values = self.table.column(column).take(valid).to_numpy()
+                order = np.argsort(values, kind="stable")
+                self._sorted[column] = (values[order], valid[order])
+            return self._sorted[column]
+    
+    def _typed(self, column: str, value: Any) -> Any:
+        """An equality filter value cast to the column's type (None if it can't be)."""
+        try:
+            return pa.scalar(value).cast(self.table.schema.field(column).type).as_py()
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+            return None
+    
+    def _bound(self, column: str, value: Any) -> Tuple[pa.Scalar, Any]:
+        """A range filter value as an Arrow scalar and a numpy value of the column's type."""
+        column_type = self.table.schema.field(column).type
+        if pa.types.is_temporal(column_type):
+            return pa.scalar(str(value)).cast(column_type), np.datetime64(str(value))
+        if pa.types.is_integer(column_type) or pa.types.is_floating(column_type):
+            return pa.scalar(float(value)), float(value)
+        return pa.scalar(str(value)), str(value)
+    
+    def _step(self, key: str, value: Any) -> Optional[tuple]:
+        """(column, op, value) for one filter clause, None if no column matches."""
+        if key in self.columns:
+            return key, "in" if isinstance(value, (list, tuple)) else "==", value
+        if key.endswith(CONTAINS_SUFFIX) and key[:-len(CONTAINS_SUFFIX)] in self.columns:
+            return key[:-len(CONTAINS_SUFFIX)], "contains", value
+        for suffix, op in RANGE_SUFFIXES:
+            # e.g. date_from on the "date" column
+            if key.endswith(suffix) and key[:-len(suffix)] in self.columns:
+                return key[:-len(suffix)], op, value
+        return None
+    
+    def _plan(self, filters: Dict[str, Any]) -> Tuple[List[tuple], Dict[str, Any]]:
+        """Split filters into steps and the ones that don't apply."""
+        steps, unapplied = [], {}
+        for key, value in filters.items():
+            step = None
+            if not (isinstance(value, str) and PLACEHOLDER_PATTERN.search(value)):
+                step = self._step(key, value)
+            if step is None:
+                unapplied[key] = value
+            else:
+                steps.append(step)
+        
+        # Hash lookups narrow the rows first, substring scans go last
+        rank = {"==": 0, "in": 0, ">=": 1, "<=": 1, "contains": 2}
+        steps.sort(key=lambda step: rank[step[1]])
+        return steps, unapplied
+    
+    def select(self, filters: Dict[str, Any]) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Row numbers matching every applicable filter.
+        
+        Args:
+            filters: Interpolated "filter" clause of a source
+        
+        Returns:
+            (ascending row numbers, filters that name no column or still
+            hold an unresolved placeholder and were not applied)
+        """
+        steps, unapplied = self._plan(filters)
+        rows: Optional[np.ndarray] = None
+        
+        # Equalities first, most selective first: the smallest posting list
+        # seeds the rows, the others only compare codes of what's left
+        lookups = []
+        for column, op, value in steps:
+            if op in ("==", "in"):
+                codes, code_of, postings = self._hash_index(column)
+                keys = (self._typed(column, v) for v in (value if op == "in" else [value]))
+                wanted = [code_of[key] for key in keys if key in code_of]
+                lookups.append((sum(len(postings[code]) for code in wanted), codes, wanted, postings))
+        lookups.sort(key=lambda lookup: lookup[0])
+        
+        for _, codes, wanted, postings in lookups:
+            if rows is None:
+                if len(wanted) == 1:
+                    rows = postings[wanted[0]]
+                elif wanted:
+                    rows = np.sort(np.concatenate([postings[code] for code in wanted]))
+                else:
+                    rows = np.empty(0, dtype=np.intp)
+            elif len(wanted) == 1:
+                rows = rows[codes[rows] == wanted[0]]
+            else:
+                rows = rows[np.isin(codes[rows], wanted)]
+        
+        for column, op, value in steps:
+            if op in ("==", "in"):
+                continue
+            
+            if op in (">=", "<="):
+                scalar, bound = self._bound(column, value)
+                if rows is not None:
+                    # Few rows left: compare them directly
+                    compare = pc.greater_equal if op == ">=" else pc.less_equal
+                    keep = compare(self.table.column(column).take(rows), scalar)
+                    rows = rows[keep.fill_null(False).to_numpy(zero_copy_only=False)]
+                else:
+                    values, order = self._sorted_index(column)
+                    if op == ">=":
+                        rows = np.sort(order[np.searchsorted(values, bound, side="left"):])
+                    else:
+                        rows = np.sort(order[:np.searchsorted(values, bound, side="right")])
+            
+            else:
+                candidates = self.table.column(column) if rows is None \
+                    else self.table.column(column).take(rows)
+                hits = pc.match_substring(candidates, str(value), ignore_case=True)
+                hit_rows = np.flatnonzero(hits.fill_null(False).to_numpy(zero_copy_only=False))
+                rows = hit_rows if rows is None else rows[hit_rows]
+        
+        if rows is None:
+            rows = np.arange(self.num_rows)
+        return rows, unapplied
+    
+    def records(self, rows: np.ndarray, columns: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Rows as dicts, limited to columns (those the table has)."""
+        table = self.table
+        if columns:
+            table = table.select([c for c in columns if c in self.columns])
+        return table.take(pa.array(rows, type=pa.int64())).to_pylist()
+
+
+class StaticTableStore:
+    """
+    Converts each static CSV once and shares the loaded tables process-wide.
+    
+    The first use of a CSV writes it as an uncompressed Arrow IPC file under
+    STATIC_TABLE_DIR (tagged with the CSV's mtime and size); after that,
+    every process memory-maps the Arrow file instead of parsing the CSV.
+    Editing the CSV triggers a new conversion.
+    """
+    
+    _shared: Optional["StaticTableStore"] = None
+    _shared_lock = threading.Lock()
+    
+    def __init__(self, table_dir: str = STATIC_TABLE_DIR):
+        """
+        Initialize static table store.
+        
+        Args:
+            table_dir: Directory for converted Arrow files
+        """
+        self.table_dir = Path(table_dir)
+        self._tables: Dict[str, Tuple[Tuple[int, int], StaticTable]] = {}
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def shared(cls) -> "StaticTableStore":
+        """Process-wide store."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+    
+    def get(self, csv_path: str) -> StaticTable:
+        """
+        Loaded table for a CSV, converting it first if needed.
+        
+        Raises:
+            FileNotFoundError: The CSV doesn't exist
+        """
+        try:
+            stat = os.stat(csv_path)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Static file not found: {csv_path}") from None
+        stamp = (stat.st_mtime_ns, stat.st_size)
+        
+        cached = self._tables.get(csv_path)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        
+        with self._lock:
+            cached = self._tables.get(csv_path)
+            if cached is None or cached[0] != stamp:
+                table = StaticTable(self._convert(csv_path, stamp))
+                self._tables[csv_path] = (stamp, table)
+                logger.info(f"Loaded {csv_path}: {table.num_rows} rows")
+            return self._tables[csv_path][1]
+    
+    def _prefix(self, csv_path: str) -> str:
+        """File name prefix shared by every version of one CSV (and only that CSV)."""
+        digest = hashlib.sha1(os.path.abspath(csv_path).encode()).hexdigest()
+        return f"{Path(csv_path).stem}-{digest[:12]}"
+    
+    def _arrow_path(self, csv_path: str, stamp: Tuple[int, int]) -> Path:
+        version = hashlib.sha1(f"{stamp[0]}:{stamp[1]}".encode()).hexdigest()
+        return self.table_dir / f"{self._prefix(csv_path)}-{version[:12]}.arrow"
+    
+    def _convert(self, csv_path: str, stamp: Tuple[int, int]) -> str:
+        """Arrow file for this version of the CSV, written once."""
+        arrow_path = self._arrow_path(csv_path, stamp)
+        if arrow_path.exists():
+            return str(arrow_path)
+        
+        self.table_dir.mkdir(parents=True, exist_ok=True)
+        table = pa_csv.read_csv(csv_path)
+        
+        # Write then rename, so other processes never map a partial file
+        tmp_path = arrow_path.with_suffix(f".{os.getpid()}.tmp")
+        with pa.OSFile(str(tmp_path), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, arrow_path)
+        
+        # Older versions of this CSV are no longer needed
+        for old in self.table_dir.glob(f"{self._prefix(csv_path)}-*.arrow"):
+            if old != arrow_path:
+                try:
+                    old.unlink()
+                except OSError:
+                    pass
+        
+        logger.info(f"Converted {csv_path} -> {arrow_path} ({table.num_rows} rows)")
+        return str(arrow_path)
+    
+    def clear(self):
+        """Drop the loaded tables (converted files stay on disk)."""
+        with self._lock:
+            self._tables.clear()